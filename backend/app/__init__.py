@@ -28,6 +28,10 @@ def create_app():
 
     app = Flask(__name__, template_folder=template_dir, static_folder=static_dir)
     app.config.from_object(Config)
+
+    # JSON nhanh (orjson) cho jsonify / request.get_json, jsonify được Row của SQLAlchemy
+    from app.services.json_provider import FastJSONProvider
+    app.json = FastJSONProvider(app)
     
     # Cấu hình ngôn ngữ tiếng Việt
     app.config['BABEL_DEFAULT_LOCALE'] = 'vi'
@@ -53,11 +57,24 @@ def create_app():
         # Import model để Flask biết cấu trúc bảng
         from app.models.user import User
         from app.models.menu import DailyMenu
+        from app.models.menu_meal import MenuMeal, MenuItem
+        from app.models.dish_history import DishHistory
         from app.models.weight_log import WeightLog
+        from app.models.menu_job import MenuJob
+        from app.models.menu_claim import MenuGenerationClaim
+        from app.models.dish import Dish
         
         # Lệnh tạo bảng (Chỉ chạy khi bảng chưa có)
         db.create_all()
+        # Chỉ mục tìm kiếm thực đơn (FTS5 / tsvector tùy DATABASE_URL) - không phải model
+        from app.services.menu_search import ensure_search_index
+        ensure_search_index()
         print("✅ Database đã sẵn sàng!")
+        
+        # Nạp danh mục món mặc định cho bộ tạo thực đơn cục bộ (mode=local)
+        from app.services.dish_catalog import seed_dishes
+        if seed_dishes():
+            print("✅ Đã nạp danh mục món ăn mặc định!")
 
     # --- ĐĂNG KÝ ROUTE ---
     # 1. Trang chủ
@@ -84,4 +101,24 @@ def create_app():
     from app.admin_views import init_admin
     init_admin(app)
 
+    # 7. Metrics (Prometheus /metrics + header Server-Timing)
+    from app.services.metrics import init_metrics
+    from app.routes.metrics_routes import metrics_bp
+    init_metrics(app)
+    app.register_blueprint(metrics_bp)
+
+    # 8. Nén response (gzip/brotli theo Accept-Encoding)
+    from app.services.compression import init_compression
+    init_compression(app)
+
+    # 9. Lệnh CLI (flask pregenerate-menus, ...) + lịch tạo trước thực đơn ban đêm
+    from app.cli import register_commands
+    from app.services.prewarm import start_scheduler
+    register_commands(app)
+    start_scheduler(app)
+
+    # 10. Khởi tạo trước AI client + pool kết nối keep-alive (1 lần cho mỗi worker)
+    from app.services.ai_service import warm_up
+    warm_up()
+
     return app
\ No newline at end of file
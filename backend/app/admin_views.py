@@ -3,10 +3,12 @@ from flask_admin import Admin, AdminIndexView, expose
 from flask_admin.contrib.sqla import ModelView
 from flask_login import current_user
 from flask import redirect, url_for, request, flash
+from wtforms import TextAreaField
 from app import db
 from app.models.user import User
 from app.models.menu import DailyMenu
 from app.models.weight_log import WeightLog
+from app.models.dish import Dish
 
 
 class SecureModelView(ModelView):
@@ -132,7 +134,8 @@ class MenuAdminView(SecureModelView):
     column_default_sort = ('id', True)  # True = descending
     
     column_list = ['id', 'owner', 'date', 'total_calories', 'created_at']
-    column_searchable_list = ['content']
+    # Tìm theo món/bữa qua chỉ mục toàn văn (xem _apply_search) hoặc theo tên user
+    column_searchable_list = ['owner.username']
     column_filters = ['date']  # Chỉ lọc theo ngày thực đơn
     
     # Cho phép tìm kiếm theo tên user
@@ -155,6 +158,37 @@ class MenuAdminView(SecureModelView):
         'total_calories': 'Tổng calo',
         'created_at': 'Ngày tạo'
     }
+    
+    # Bữa/món được tách lại từ nội dung khi lưu
+    form_excluded_columns = ['meals']
+    # content là cột nén (LargeBinary) -> vẫn sửa như text
+    form_overrides = {'content': TextAreaField}
+    
+    def search_placeholder(self):
+        return 'Món ăn, tên user'
+    
+    def _apply_search(self, query, count_query, joins, count_joins, search):
+        """Thay LIKE '%...%' trên cả bảng bằng chỉ mục menu_search (không phân biệt dấu)"""
+        from app.services.menu_search import search_menu_ids
+        
+        menu_ids = search_menu_ids(search)
+        user_ids = db.session.query(User.id).filter(User.username.ilike(f"%{search.strip()}%"))
+        condition = db.or_(DailyMenu.id.in_(menu_ids), DailyMenu.user_id.in_(user_ids.scalar_subquery()))
+        query = query.filter(condition)
+        if count_query is not None:
+            count_query = count_query.filter(condition)
+        return query, count_query, joins, count_joins
+    
+    def on_model_change(self, form, model, is_created):
+        from app.services.menu_structure import build_meals
+        from app.services.menu_search import index_menu
+        model.meals = build_meals(model.content)
+        self.session.flush()
+        index_menu(model)
+    
+    def after_model_change(self, form, model, is_created):
+        from app.services.dish_history import record_menu
+        record_menu(model)
 
 
 class WeightLogAdminView(SecureModelView):
@@ -192,6 +226,37 @@ class WeightLogAdminView(SecureModelView):
     }
 
 
+class DishAdminView(SecureModelView):
+    """Admin view cho danh mục món ăn (bộ tạo thực đơn cục bộ)"""
+    
+    # Tên tab/menu
+    name = 'Món ăn'
+    
+    # Phân trang
+    page_size = 50
+    
+    column_default_sort = ('name', False)
+    column_list = ['id', 'name', 'meal_types', 'category', 'portion_size', 'unit', 'calories', 'protein', 'carbs', 'fat', 'allergens', 'is_active']
+    column_searchable_list = ['name', 'allergens']
+    column_filters = ['category', 'is_active']
+    
+    # Labels
+    column_labels = {
+        'id': 'ID',
+        'name': 'Tên món',
+        'meal_types': 'Bữa',
+        'category': 'Loại',
+        'portion_size': 'Khẩu phần',
+        'unit': 'Đơn vị',
+        'calories': 'Calo (kcal)',
+        'protein': 'Đạm (g)',
+        'carbs': 'Tinh bột (g)',
+        'fat': 'Béo (g)',
+        'allergens': 'Chất gây dị ứng',
+        'is_active': 'Đang dùng'
+    }
+
+
 def init_admin(app):
     """Initialize Flask-Admin"""
     admin = Admin(
@@ -204,5 +269,6 @@ def init_admin(app):
     admin.add_view(UserAdminView(User, db.session, name='👥 Người Dùng', endpoint='user', category='📊 Quản Lý'))
     admin.add_view(MenuAdminView(DailyMenu, db.session, name='🍽️ Thực Đơn', endpoint='dailymenu', category='📊 Quản Lý'))
     admin.add_view(WeightLogAdminView(WeightLog, db.session, name='⚖️ Cân Nặng', endpoint='weightlog', category='📊 Quản Lý'))
+    admin.add_view(DishAdminView(Dish, db.session, name='🥗 Món Ăn', endpoint='dish', category='📊 Quản Lý'))
     
     return admin
@@ -0,0 +1,295 @@
+# backend/app/cli.py
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import or_
+from app import db
+from app.models.user import User
+from app.models.menu import DailyMenu
+from app.models.weight_log import WeightLog
+
+# Lệnh `flask ...` chạy ngoài request (cron / cửa sổ batch ban đêm)
+
+
+def _missing_runs(user_id, start, end, max_days):
+    """
+    Các đoạn ngày liên tiếp chưa có thực đơn trong [start, end], mỗi đoạn tối đa max_days ngày.
+
+    Returns:
+        list: [(ngày bắt đầu, số ngày), ...]
+    """
+    existing = {
+        menu_date for (menu_date,) in db.session.query(DailyMenu.date).filter(
+            DailyMenu.user_id == user_id,
+            DailyMenu.date >= start,
+            DailyMenu.date <= end
+        )
+    }
+
+    runs = []
+    current = start
+    while current <= end:
+        if current in existing:
+            current += timedelta(days=1)
+            continue
+        run_start, length = current, 0
+        while current <= end and current not in existing and length < max_days:
+            length += 1
+            current += timedelta(days=1)
+        runs.append((run_start, length))
+    return runs
+
+
+def _select_users(usernames, active_days):
+    """User cần tạo thực đơn: theo danh sách username, hoặc user có hoạt động trong active_days ngày gần đây"""
+    query = User.query
+    if usernames:
+        query = query.filter(User.username.in_(usernames))
+    if active_days:
+        since = date.today() - timedelta(days=active_days)
+        recent_menu = db.session.query(DailyMenu.user_id).filter(DailyMenu.created_at >= since)
+        recent_weight = db.session.query(WeightLog.user_id).filter(WeightLog.recorded_at >= since)
+        query = query.filter(or_(User.id.in_(recent_menu), User.id.in_(recent_weight)))
+    return [user_id for (user_id,) in query.with_entities(User.id).order_by(User.id)]
+
+
+class Checkpoint:
+    """File JSON ghi lại user đã xong của 1 lượt chạy -> chạy lại cùng tham số sẽ tiếp tục từ chỗ dừng"""
+
+    def __init__(self, path, params):
+        self.path = path
+        self.params = params
+        self.done = set()
+        self.failed = {}
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            if saved.get('params') == params:
+                self.done = set(saved.get('done', []))
+                self.failed = saved.get('failed', {})
+            else:
+                click.echo(f"⚠️ Checkpoint {path} thuộc lượt chạy khác tham số -> bắt đầu lại từ đầu")
+
+    def mark(self, user_id, error=None):
+        with self._lock:
+            if error is None:
+                self.done.add(user_id)
+                self.failed.pop(str(user_id), None)
+            else:
+                self.failed[str(user_id)] = str(error)
+            self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        # Ghi ra file tạm rồi đổi tên để không bao giờ để lại checkpoint dở dang
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'params': self.params,
+                'done': sorted(self.done),
+                'failed': self.failed,
+                'updated_at': datetime.utcnow().isoformat()
+            }, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def _pregenerate_user(app, user_id, start, end, mode, max_attempts):
+    """Tạo các ngày còn thiếu cho 1 user. Trả về (số ngày đã tạo, số ngày lỗi)"""
+    from app.routes.menu_routes import generate_menu_for_user
+
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        if user is None:
+            return 0, 0
+
+        created = failed = 0
+        for run_start, num_days in _missing_runs(user_id, start, end, app.config.get('MENU_MAX_DAYS', 14)):
+            data = {'date': run_start.isoformat(), 'num_days': num_days}
+            if mode:
+                data['mode'] = mode
+
+            for attempt in range(1, max_attempts + 1):
+                body, status = generate_menu_for_user(user, data)
+                # Bị giới hạn tần suất / AI tạm lỗi -> chờ rồi thử lại đoạn này (ngày đã lưu sẽ được bỏ qua)
+                if (status == 429 or status >= 500) and attempt < max_attempts:
+                    time.sleep(body.get('retry_after') or 2 ** attempt)
+                    continue
+                break
+
+            summary = body.get('summary')
+            if summary:
+                created += summary.get('created', 0)
+                failed += summary.get('failed', 0)
+            elif status in (200, 201):
+                created += 1
+            else:
+                failed += num_days
+        return created, failed
+
+
+@click.command('pregenerate-menus')
+@click.option('--from', 'from_date', default=None, help='Ngày bắt đầu YYYY-MM-DD (mặc định: ngày mai)')
+@click.option('--to', 'to_date', default=None, help='Ngày kết thúc YYYY-MM-DD (mặc định: bằng --from)')
+@click.option('--user', 'usernames', multiple=True, help='Chỉ tạo cho username này (lặp lại được)')
+@click.option('--active-days', type=int, default=None, help='Chỉ user có thực đơn/cân nặng trong N ngày gần đây')
+@click.option('--mode', type=click.Choice(['batch', 'per_day', 'local']), default=None,
+              help='Chế độ tạo (mặc định: MENU_GENERATION_MODE)')
+@click.option('--workers', type=int, default=None, help='Số user xử lý song song (mặc định: PREGENERATE_WORKERS)')
+@click.option('--checkpoint', default='pregenerate_checkpoint.json', show_default=True,
+              help="File checkpoint để chạy tiếp khi bị gián đoạn ('' để tắt)")
+@click.option('--restart', is_flag=True, help='Bỏ qua checkpoint cũ, chạy lại từ đầu')
+@with_appcontext
+def pregenerate_menus(from_date, to_date, usernames, active_days, mode, workers, checkpoint, restart):
+    """Tạo trước thực đơn cho nhiều user trong 1 khoảng ngày (bỏ qua ngày đã có)."""
+    app = current_app._get_current_object()
+
+    try:
+        start = date.fromisoformat(from_date) if from_date else date.today() + timedelta(days=1)
+        end = date.fromisoformat(to_date) if to_date else start
+    except ValueError as e:
+        raise click.BadParameter(f"Ngày không hợp lệ: {e}")
+    if end < start:
+        raise click.BadParameter('--to phải sau hoặc bằng --from')
+
+    if restart and checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    params = {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'users': sorted(usernames),
+        'active_days': active_days,
+        'mode': mode
+    }
+    state = Checkpoint(checkpoint, params)
+
+    user_ids = [user_id for user_id in _select_users(usernames, active_days) if user_id not in state.done]
+    workers = workers or app.config.get('PREGENERATE_WORKERS', 4)
+    max_attempts = app.config.get('JOB_MAX_ATTEMPTS', 3)
+    click.echo(
+        f"🚀 Tạo trước thực đơn {start} → {end} cho {len(user_ids)} user "
+        f"({len(state.done)} user đã xong từ lần trước), {workers} luồng"
+    )
+
+    started = time.monotonic()
+    totals = {'created': 0, 'failed': 0, 'users_failed': 0}
+    # Gọi AI là việc chờ I/O -> dùng thread; mỗi thread có app context (và session DB) riêng
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_pregenerate_user, app, user_id, start, end, mode, max_attempts): user_id
+            for user_id in user_ids
+        }
+        for index, future in enumerate(as_completed(futures), start=1):
+            user_id = futures[future]
+            try:
+                created, failed = future.result()
+            except Exception as e:
+                totals['users_failed'] += 1
+                state.mark(user_id, e)
+                click.echo(f"❌ [{index}/{len(user_ids)}] user {user_id}: {e}")
+                continue
+
+            totals['created'] += created
+            totals['failed'] += failed
+            if failed:
+                totals['users_failed'] += 1
+                state.mark(user_id, f"{failed} ngày lỗi")
+            else:
+                state.mark(user_id)
+            click.echo(f"✅ [{index}/{len(user_ids)}] user {user_id}: tạo {created} ngày, lỗi {failed}")
+
+    click.echo(
+        f"🎉 Xong sau {time.monotonic() - started:.1f}s: tạo {totals['created']} thực đơn, "
+        f"{totals['failed']} ngày lỗi, {totals['users_failed']} user cần chạy lại"
+    )
+
+
+@click.command('backfill-menu-items')
+@click.option('--batch-size', type=int, default=200, show_default=True, help='Số thực đơn mỗi lần commit')
+@with_appcontext
+def backfill_menu_items(batch_size):
+    """Tách bữa/món (menu_meals, menu_items) cho các thực đơn tạo trước khi có 2 bảng này."""
+    from app.services.menu_structure import build_meals
+
+    total = last_id = 0
+    while True:
+        # Duyệt theo id tăng dần (thực đơn không tách được bữa nào sẽ không bị lấy lại)
+        menus = DailyMenu.query.filter(DailyMenu.id > last_id, ~DailyMenu.meals.any())\
+            .order_by(DailyMenu.id)\
+            .limit(batch_size)\
+            .all()
+        if not menus:
+            break
+        for menu in menus:
+            menu.meals = build_meals(menu.content)
+        last_id = menus[-1].id
+        db.session.commit()
+        total += len(menus)
+        click.echo(f"⏳ Đã tách {total} thực đơn...")
+    click.echo(f"🎉 Xong: tách {total} thực đơn")
+
+
+@click.command('rebuild-dish-history')
+@click.option('--user', 'usernames', multiple=True, help='Chỉ dựng lại cho username này (lặp lại được)')
+@with_appcontext
+def rebuild_dish_history(usernames):
+    """Dựng lại chỉ mục món đã dùng (dish_history) từ menu_items."""
+    from app.services.dish_history import rebuild_user_history
+
+    user_ids = _select_users(usernames, None)
+    total = 0
+    for index, user_id in enumerate(user_ids, start=1):
+        total += rebuild_user_history(user_id)
+        click.echo(f"⏳ [{index}/{len(user_ids)}] user {user_id}")
+    click.echo(f"🎉 Xong: {total} thực đơn của {len(user_ids)} user")
+
+
+@click.command('rebuild-search-index')
+@click.option('--batch-size', type=int, default=500, show_default=True, help='Số thực đơn mỗi lần commit')
+@with_appcontext
+def rebuild_search_index_command(batch_size):
+    """Ghi lại chỉ mục tìm kiếm (menu_search) cho mọi thực đơn."""
+    from app.services.menu_search import ensure_search_index, rebuild_search_index
+
+    ensure_search_index()
+    total = rebuild_search_index(batch_size, progress=lambda done: click.echo(f"⏳ Đã ghi chỉ mục {done} thực đơn..."))
+    click.echo(f"🎉 Xong: {total} thực đơn")
+
+
+@click.command('prewarm-menus')
+@click.option('--date', 'menu_date', default=None, help='Ngày cần tạo YYYY-MM-DD (mặc định: sáng kế tiếp)')
+@click.option('--budget', type=int, default=None, help='Số lời gọi AI tối đa (mặc định: PREWARM_AI_BUDGET)')
+@with_appcontext
+def prewarm_menus_command(menu_date, budget):
+    """Tạo trước thực đơn cho user mở dashboard gần đây (chạy từ cron ngoài giờ cao điểm)."""
+    from app.services.prewarm import prewarm_menus
+
+    try:
+        menu_date = date.fromisoformat(menu_date) if menu_date else None
+    except ValueError as e:
+        raise click.BadParameter(f"Ngày không hợp lệ: {e}")
+
+    started = time.monotonic()
+    stats = prewarm_menus(current_app._get_current_object(), menu_date=menu_date, budget=budget)
+    click.echo(
+        f"🎉 Tạo trước thực đơn {stats['date']} sau {time.monotonic() - started:.1f}s: "
+        f"{stats['generated']}/{stats['candidates']} user ({stats['ai_calls']} lời gọi AI, "
+        f"{stats['cached']} từ cache), lỗi {stats['failed']}, vượt ngân sách {stats['over_budget']}"
+    )
+
+
+def register_commands(app):
+    """Đăng ký các lệnh `flask ...` của ứng dụng"""
+    app.cli.add_command(pregenerate_menus)
+    app.cli.add_command(backfill_menu_items)
+    app.cli.add_command(rebuild_dish_history)
+    app.cli.add_command(rebuild_search_index_command)
+    app.cli.add_command(prewarm_menus_command)
@@ -0,0 +1,23 @@
+# backend/app/models/dish.py (Danh mục món ăn Việt dùng cho bộ tạo thực đơn cục bộ)
+from app import db
+
+class Dish(db.Model):
+    __tablename__ = 'dishes'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), unique=True, nullable=False)
+    meal_types = db.Column(db.String(50), nullable=False) # 'breakfast,lunch,dinner'
+    # 'one_dish' (món đủ bữa: phở, bún...) | 'staple' (cơm) | 'main' (món đạm)
+    # | 'side' (rau) | 'soup' | 'drink' | 'fruit'
+    category = db.Column(db.String(20), nullable=False)
+
+    # Dinh dưỡng của 1 khẩu phần chuẩn
+    portion_size = db.Column(db.Integer, nullable=False) # gram hoặc ml
+    unit = db.Column(db.String(10), nullable=False, default='g')
+    calories = db.Column(db.Integer, nullable=False) # kcal
+    protein = db.Column(db.Float, default=0) # gram
+    carbs = db.Column(db.Float, default=0) # gram
+    fat = db.Column(db.Float, default=0) # gram
+
+    allergens = db.Column(db.String(200), default='') # 'tôm,hải sản,đậu phộng'
+    is_active = db.Column(db.Boolean, default=True)
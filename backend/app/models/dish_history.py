@@ -0,0 +1,11 @@
+# backend/app/models/dish_history.py (Lịch sử món đã dùng của từng user - chỉ mục cho ràng buộc đa dạng)
+from app import db
+
+class DishHistory(db.Model):
+    __tablename__ = 'dish_history'
+
+    # 1 dòng cho mỗi (user, món, ngày thực đơn): ghi lại mỗi khi lưu thực đơn của ngày đó
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    date = db.Column(db.Date, primary_key=True) # ngày thực đơn có món này
+    name_key = db.Column(db.String(200), primary_key=True) # tên món viết thường, bỏ khoảng trắng thừa
+    name = db.Column(db.String(200), nullable=False) # tên hiển thị
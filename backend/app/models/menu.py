@@ -1,6 +1,8 @@
 # backend/app/models/menu.py (2. File menu.py (Bảng Thực đơn hàng ngày)
 from app import db
 from datetime import datetime
+from app.models.row_version import row_version_column
+from app.models.types import CompressedText
 
 class DailyMenu(db.Model):
     __tablename__ = 'daily_menus'
@@ -8,8 +10,14 @@ class DailyMenu(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     date = db.Column(db.Date, nullable=False) 
-    content = db.Column(db.Text, nullable=False) # JSON thực đơn AI tạo
+    content = db.Column(CompressedText, nullable=False) # thực đơn AI tạo (lưu nén zlib)
     total_calories = db.Column(db.Integer)
+    prewarmed = db.Column(db.Boolean, default=False) # tạo trước bởi lịch chạy ban đêm
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    version = row_version_column() # đổi mỗi lần ghi -> ETag của các API đọc
+
+    # Cấu trúc bữa/món tách sẵn lúc tạo (content giữ nguyên để tương thích ngược)
+    meals = db.relationship('MenuMeal', backref='menu', cascade='all, delete-orphan',
+                            order_by='MenuMeal.position')
 
     __table_args__ = (db.UniqueConstraint('user_id', 'date', name='unique_user_menu'),)
\ No newline at end of file
@@ -0,0 +1,12 @@
+# backend/app/models/menu_claim.py (Quyền tạo thực đơn cho 1 (user, ngày) - single-flight giữa các worker)
+from app import db
+from datetime import datetime
+
+class MenuGenerationClaim(db.Model):
+    __tablename__ = 'menu_generation_claims'
+
+    # Khóa chính (user_id, date): chỉ 1 request/worker giữ quyền tạo tại 1 thời điểm
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    owner = db.Column(db.String(100), nullable=False) # host:pid đang tạo
+    claimed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,29 @@
+# backend/app/models/menu_job.py (Hàng đợi job tạo thực đơn chạy nền)
+from app import db
+from datetime import datetime
+
+class MenuJob(db.Model):
+    __tablename__ = 'menu_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    kind = db.Column(db.String(30), nullable=False) # 'generate' | 'generate_7_days'
+    payload = db.Column(db.Text, nullable=False) # JSON tham số request
+
+    # queued -> running -> done | (queued lại để thử lại) | dead (hết lượt thử)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(100))
+
+    total_days = db.Column(db.Integer)
+    progress = db.Column(db.Text) # JSON kết quả từng ngày của lần chạy hiện tại
+    result = db.Column(db.Text) # JSON kết quả cuối cùng
+    last_error = db.Column(db.Text)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (db.Index('ix_menu_jobs_status_run_after', 'status', 'run_after'),)
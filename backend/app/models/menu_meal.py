@@ -0,0 +1,28 @@
+# backend/app/models/menu_meal.py (Bữa ăn + món ăn đã tách của từng thực đơn)
+from app import db
+
+class MenuMeal(db.Model):
+    __tablename__ = 'menu_meals'
+
+    id = db.Column(db.Integer, primary_key=True)
+    menu_id = db.Column(db.Integer, db.ForeignKey('daily_menus.id', ondelete='CASCADE'), nullable=False, index=True)
+    meal_type = db.Column(db.String(20), nullable=False) # 'breakfast' | 'lunch' | 'dinner' | 'snack'
+    title = db.Column(db.String(100), nullable=False) # tiêu đề hiển thị, vd: 'Bữa sáng 🌅'
+    position = db.Column(db.Integer, nullable=False, default=0)
+    total_calories = db.Column(db.Integer, nullable=False, default=0)
+
+    items = db.relationship('MenuItem', backref='meal', cascade='all, delete-orphan',
+                            order_by='MenuItem.position')
+
+    __table_args__ = (db.Index('ix_menu_meals_menu_id_meal_type', 'menu_id', 'meal_type'),)
+
+
+class MenuItem(db.Model):
+    __tablename__ = 'menu_items'
+
+    id = db.Column(db.Integer, primary_key=True)
+    meal_id = db.Column(db.Integer, db.ForeignKey('menu_meals.id', ondelete='CASCADE'), nullable=False, index=True)
+    name = db.Column(db.String(200), nullable=False)
+    portion = db.Column(db.String(50)) # vd: '200g', '1 chén'
+    calories = db.Column(db.Integer, nullable=False, default=0)
+    position = db.Column(db.Integer, nullable=False, default=0)
@@ -0,0 +1,12 @@
+# backend/app/models/row_version.py (Phiên bản dòng - dùng làm ETag cho các API đọc)
+import time
+from app import db
+
+def next_row_version():
+    """Phiên bản mới: micro-giây hiện tại -> luôn lớn hơn các phiên bản đã ghi trước đó"""
+    return time.time_ns() // 1000
+
+def row_version_column():
+    """Cột version tự đổi mỗi lần INSERT/UPDATE (kể cả query.update() hàng loạt)"""
+    return db.Column(db.BigInteger, nullable=False, default=next_row_version,
+                     onupdate=next_row_version, server_default='0')
@@ -0,0 +1,37 @@
+# backend/app/models/types.py (Kiểu cột tùy chỉnh)
+import zlib
+from app import db
+
+# Mức nén zlib cho dữ liệu lưu trong DB (6: cân bằng tốc độ / dung lượng)
+COMPRESSION_LEVEL = 6
+
+
+def compress_text(value):
+    return zlib.compress(value.encode('utf-8'), COMPRESSION_LEVEL)
+
+
+def decompress_text(value):
+    """bytes nén -> str; dữ liệu chưa nén (dòng cũ chưa backfill) -> giải mã UTF-8 trực tiếp"""
+    if isinstance(value, str):
+        return value
+    value = bytes(value)
+    try:
+        return zlib.decompress(value).decode('utf-8')
+    except zlib.error:
+        return value.decode('utf-8')
+
+
+class CompressedText(db.TypeDecorator):
+    """Text lưu dạng nén zlib (LargeBinary trong DB), đọc/ghi trong Python vẫn là str"""
+    impl = db.LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return decompress_text(value)
@@ -26,6 +26,7 @@ class User(UserMixin, db.Model):
     is_admin = db.Column(db.Boolean, default=False)
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_seen_at = db.Column(db.DateTime, index=True) # lần cuối mở dashboard (gọi API thực đơn)
 
     # Quan hệ
     menus = db.relationship('DailyMenu', backref='owner', lazy='dynamic')
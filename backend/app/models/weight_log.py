@@ -1,6 +1,7 @@
 # backend/app/models/weight_log.py (4. File weight_log.py (Bảng Lịch sử cân nặng))
 from app import db
 from datetime import datetime
+from app.models.row_version import row_version_column
 
 class WeightLog(db.Model):
     __tablename__ = 'weight_logs'
@@ -8,4 +9,5 @@ class WeightLog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     weight = db.Column(db.Float, nullable=False) 
-    recorded_at = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
+    recorded_at = db.Column(db.DateTime, default=datetime.utcnow)
+    version = row_version_column() # đổi mỗi lần ghi -> ETag của các API đọc
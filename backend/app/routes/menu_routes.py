@@ -1,55 +1,369 @@
 # backend/app/routes/menu_routes.py
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 from flask_login import login_required, current_user
 from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import contextvars
+import json
 import re
+import threading
+from sqlalchemy.exc import IntegrityError
 from app import db
 from app.models.menu import DailyMenu
-from app.services.ai_service import get_ai_response
+from app.models.menu_job import MenuJob
+from app.models.dish import Dish
+from app.services import job_queue, rate_limiter, single_flight
+from app.services.prewarm import touch_last_seen, record_menu_read
+from app.services.ai_cache import get_cached_ai_response, stream_cached_ai_response
+from app.services.ai_errors import AIServiceError, AIRateLimitedError
+from app.services.ai_providers import USED_DISHES_HEADER
+from app.services.menu_engine import build_menu, MenuEngineError
+from app.services.menu_parser import parse_menu, extract_total_calories
+from app.services.menu_structure import (
+    build_meals, get_or_create_meal, set_meal_items, menu_total_calories, splice_meal, insert_menus
+)
+from app.services.dish_history import recent_dishes, record_menu, record_dish_lists, variety_days
+from app.services.conditional import make_etag, watermark, not_modified, with_etag
+from app.services.menu_search import index_menu, index_new_menus, search_menus
 
 menu_bp = Blueprint('menu', __name__)
 
-def extract_total_calories(menu_content):
+@menu_bp.before_request
+def track_last_seen():
+    """Ghi nhận user đang dùng dashboard (chọn user để tạo trước thực đơn ban đêm)"""
+    if current_user.is_authenticated:
+        touch_last_seen(current_user)
+
+# Xoay vòng nguồn protein chính giữa các ngày khi tạo nhiều ngày song song
+PROTEIN_ROTATION = ['thịt gà', 'cá', 'thịt bò', 'đậu phụ', 'thịt lợn', 'tôm', 'trứng']
+
+# Dòng phân tách từng ngày trong câu trả lời gộp, vd: "===== NGÀY 2 (21/10/2025) ====="
+BATCH_DAY_HEADER_RE = re.compile(r'^[ \t=#*]*NGÀY\s+(\d+)\b[^\n]*$', re.IGNORECASE | re.MULTILINE)
+
+def build_used_dishes(dish_names, days=3):
+    """Tạo đoạn prompt liệt kê các món đã dùng gần đây (bỏ tên trùng, giữ thứ tự)"""
+    dishes_list = list(dict.fromkeys(dish_names))
+    if not dishes_list:
+        return ""
+    
+    used_dishes = f"\n\n{USED_DISHES_HEADER} (đã dùng trong {days} ngày gần đây):\n"
+    used_dishes += f"  {', '.join(dishes_list)}\n"
+    used_dishes += "\n⚡ BẮT BUỘC: Thực đơn hôm nay phải có món ăn HOÀN TOÀN KHÁC, sáng tạo và đa dạng!\n"
+    return used_dishes
+
+def build_local_menu(user_id, menu_date, target_cal, allergies, recent_names, dishes=None):
     """
-    Trích xuất tổng số calo từ nội dung thực đơn.
-    Tìm kiếm các pattern như: "Tổng calo: 1500 kcal" hoặc "Tổng: 1500kcal"
+    Tạo thực đơn 1 ngày bằng bộ giải cục bộ từ danh mục Dish (mode=local, không gọi AI).
+    
+    Args:
+        recent_names: Tên các món đã dùng gần đây (tránh lặp món)
+        dishes: Danh mục món đã tải sẵn (None -> đọc các món đang dùng từ DB)
+    
+    Returns:
+        str: Nội dung thực đơn cùng định dạng với thực đơn AI
     """
-    if not menu_content:
-        return 0
-    
-    # Tìm pattern "Tổng calo: [số] kcal" hoặc tương tự
-    patterns = [
-        r'Tổng\s+calo[:\s]+([0-9,\.]+)\s*kcal',
-        r'Tổng[:\s]+([0-9,\.]+)\s*kcal',
-        r'Calo\s+tổng[:\s]+([0-9,\.]+)',
-        r'Total[:\s]+([0-9,\.]+)\s*kcal',
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, menu_content, re.IGNORECASE)
-        if match:
-            # Lấy số và loại bỏ dấu phẩy/chấm (nếu có)
-            calories_str = match.group(1).replace(',', '').replace('.', '')
-            try:
-                return int(calories_str)
-            except ValueError:
-                continue
+    if dishes is None:
+        dishes = Dish.query.filter_by(is_active=True).all()
+    content, _ = build_menu(
+        dishes,
+        target_cal=target_cal,
+        allergies=allergies,
+        avoid_dishes=recent_names,
+        seed=f"{user_id}:{menu_date.isoformat()}"
+    )
+    return content
+
+def build_batch_prompt(dates, user_info, used_dishes=""):
+    """
+    Tạo prompt yêu cầu AI trả về thực đơn cho nhiều ngày trong 1 lần gọi.
     
-    # Nếu không tìm thấy, thử tính tổng từ các món ăn
-    calorie_matches = re.findall(r'[-\*]\s*[^\n]+?([0-9]+)\s*kcal', menu_content, re.IGNORECASE)
-    if calorie_matches:
-        total = sum(int(cal) for cal in calorie_matches)
-        return total
+    Args:
+        dates: Danh sách ngày cần tạo (theo thứ tự)
+        user_info: Các dòng "- Giới tính: ..." mô tả người dùng
+        used_dishes: Danh sách món đã dùng gần đây (từ build_used_dishes)
+    """
+    day_list = ''.join(
+        f"- NGÀY {n}: {d.strftime('%d/%m/%Y')}\n" for n, d in enumerate(dates, start=1)
+    )
+    return (
+        f"🍽️ NHIỆM VỤ: Tạo thực đơn dinh dưỡng cho {len(dates)} ngày sau:\n"
+        f"{day_list}\n"
+        f"📊 THÔNG TIN NGƯỜI DÙNG:\n"
+        f"{user_info}{used_dishes}\n\n"
+        f"🎯 YÊU CẦU THỰC ĐƠN (cho MỖI ngày):\n"
+        f"1. Tạo 3 bữa ăn chính: Bữa sáng, Bữa trưa, Bữa tối\n"
+        f"2. Mỗi món ăn phải ghi:\n"
+        f"   - Tên món ăn (món Việt Nam ưu tiên)\n"
+        f"   - Khẩu phần cụ thể (gram/ml)\n"
+        f"   - Calo ước tính cho từng món\n"
+        f"3. Cuối mỗi ngày tính TỔNG CALO cả ngày\n"
+        f"4. Thực đơn cân đối dinh dưỡng: đủ protein, tinh bột, chất béo, rau củ\n"
+        f"5. Các ngày KHÔNG được lặp lại món của nhau, phù hợp văn hóa ẩm thực Việt Nam\n"
+        f"6. Thay đổi cách chế biến và nguồn protein giữa các ngày: thịt bò, thịt lợn, gà, cá, tôm, trứng, đậu phụ\n\n"
+        f"📝 FORMAT TRẢ LỜI (BẮT BUỘC, lặp lại cho từng ngày theo đúng thứ tự):\n"
+        f"===== NGÀY [số thứ tự] ([dd/mm/yyyy]) =====\n"
+        f"Bữa sáng 🌅\n"
+        f"- [Tên món] ([gram/ml]) - [calo] kcal\n"
+        f"- [Tên món] ([gram/ml]) - [calo] kcal\n\n"
+        f"Bữa trưa 🌞\n"
+        f"- [Tên món] ([gram/ml]) - [calo] kcal\n"
+        f"- [Tên món] ([gram/ml]) - [calo] kcal\n\n"
+        f"Bữa tối 🌙\n"
+        f"- [Tên món] ([gram/ml]) - [calo] kcal\n"
+        f"- [Tên món] ([gram/ml]) - [calo] kcal\n\n"
+        f"Tổng calo: [số] kcal\n\n"
+        f"⚠️ LƯU Ý:\n"
+        f"- KHÔNG hỏi thêm thông tin\n"
+        f"- KHÔNG đưa lời khuyên hay giải thích thêm\n"
+        f"- CHỈ trả về thực đơn theo đúng format trên, đủ {len(dates)} ngày\n"
+    )
+
+def split_batch_reply(reply, dates):
+    """
+    Tách câu trả lời gộp nhiều ngày (format "===== NGÀY n =====") thành thực đơn từng ngày.
+    
+    Returns:
+        dict: {ngày: nội dung} - chỉ gồm các ngày tách được và đủ 3 bữa + tổng calo
+    """
+    menus = {}
+    if not reply:
+        return menus
     
-    return 0
+    headers = list(BATCH_DAY_HEADER_RE.finditer(reply))
+    for idx, header in enumerate(headers):
+        day_number = int(header.group(1))
+        if day_number < 1 or day_number > len(dates):
+            continue
+        
+        body_end = headers[idx + 1].start() if idx + 1 < len(headers) else len(reply)
+        content = reply[header.end():body_end].strip()
+        
+        parsed = parse_menu(content)
+        has_all_meals = {'breakfast', 'lunch', 'dinner'} <= parsed.meal_types
+        if has_all_meals and parsed.total_calories > 0:
+            menus.setdefault(dates[day_number - 1], content)
+    
+    return menus
+
+def run_ai_tasks(tasks):
+    """
+    Chạy các tác vụ gọi AI song song trên thread pool giới hạn (AI_MAX_CONCURRENCY / request).
+    
+    Args:
+        tasks: Danh sách (key, hàm không tham số)
+    
+    Yields:
+        tuple: (key, kết quả, lỗi) theo thứ tự hoàn thành
+    """
+    if not tasks:
+        return
+    
+    app = current_app._get_current_object()
+    max_workers = max(1, min(app.config.get('AI_MAX_CONCURRENCY', 3), len(tasks)))
+    
+    def run_in_context(fn):
+        with app.app_context():
+            return fn()
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Mỗi tác vụ chạy trong bản sao context hiện tại (giữ user của rate limiter)
+        futures = {
+            executor.submit(contextvars.copy_context().run, run_in_context, fn): key
+            for key, fn in tasks
+        }
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
+
+def ai_error_body(e):
+    """Body lỗi AI trả cho client (kèm retry_after khi bị giới hạn tần suất)"""
+    body = {'error': str(e)}
+    if isinstance(e, AIRateLimitedError):
+        body['retry_after'] = e.retry_after
+    return body
+
+def json_response(body, status):
+    """jsonify + header Retry-After khi body có retry_after (HTTP 429)"""
+    response = jsonify(body)
+    response.status_code = status
+    if body.get('retry_after'):
+        response.headers['Retry-After'] = str(body['retry_after'])
+    return response
+
+def enqueue_menu_job(kind, data):
+    """Đưa yêu cầu tạo thực đơn vào hàng đợi chạy nền, trả về job id ngay (HTTP 202)"""
+    payload = {key: value for key, value in data.items() if key != 'async'}
+    total_days = 7 if kind == 'generate_7_days' else payload.get('num_days', 1)
+    job = job_queue.enqueue(current_user.id, kind, payload, total_days=total_days)
+    
+    return jsonify({
+        'message': 'Đã đưa yêu cầu tạo thực đơn vào hàng đợi',
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': f'/api/menu/jobs/{job.id}'
+    }), 202
 
 @menu_bp.route('/generate', methods=['POST'])
 @login_required # Bắt buộc phải đăng nhập mới được tạo thực đơn
 def generate_menu():
     # 1. Lấy thông tin từ request body (nếu có)
     data = request.get_json() or {}
-    user = current_user
     
+    # Giới hạn số ngày mỗi lần tạo để 1 request không kéo theo quá nhiều lời gọi AI
+    max_days = current_app.config.get('MENU_MAX_DAYS', 14)
+    try:
+        num_days = int(data.get('num_days', 1))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'num_days không hợp lệ'}), 400
+    if not 1 <= num_days <= max_days:
+        return jsonify({'error': f'num_days phải từ 1 đến {max_days}'}), 400
+    data['num_days'] = num_days
+    
+    # Chế độ bất đồng bộ: đưa vào hàng đợi và trả về job id ngay
+    if data.get('async'):
+        return enqueue_menu_job('generate', data)
+    
+    body, status = generate_menu_for_user(current_user._get_current_object(), data)
+    return json_response(body, status)
+
+def save_single_menu(user_id, menu_date, ai_reply):
+    """
+    Lưu (tạo mới hoặc ghi đè) thực đơn 1 ngày và commit.
+    
+    Returns:
+        str: 'created' hoặc 'updated'
+    """
+    # Kiểm tra xem ngày đã chọn đã có thực đơn chưa?
+    existing_menu = DailyMenu.query.filter_by(user_id=user_id, date=menu_date).first()
+    
+    # Trích xuất tổng calo từ nội dung AI
+    total_cals = extract_total_calories(ai_reply)
+    
+    if existing_menu:
+        # Nếu có rồi thì cập nhật lại nội dung mới
+        existing_menu.content = ai_reply
+        existing_menu.total_calories = total_cals
+        existing_menu.prewarmed = False
+        existing_menu.meals = build_meals(ai_reply)
+        menu = existing_menu
+        day_status = 'updated'
+    else:
+        # Nếu chưa có thì tạo mới
+        new_menu = DailyMenu(
+            user_id=user_id,
+            date=menu_date,
+            content=ai_reply,
+            total_calories=total_cals,
+            meals=build_meals(ai_reply)
+        )
+        db.session.add(new_menu)
+        menu = new_menu
+        day_status = 'created'
+    
+    db.session.flush()
+    index_menu(menu)
+    db.session.commit()
+    record_menu(menu)
+    return day_status
+
+def existing_menu_dates(user_id, dates):
+    """Các ngày trong dates user đã có thực đơn - 1 câu SQL theo chỉ mục (user_id, date)"""
+    if not dates:
+        return set()
+    rows = db.session.query(DailyMenu.date).filter(
+        DailyMenu.user_id == user_id,
+        DailyMenu.date >= min(dates),
+        DailyMenu.date <= max(dates)
+    ).all()
+    return {menu_date for (menu_date,) in rows}
+
+def save_new_menus(user_id, contents):
+    """
+    Lưu thực đơn mới của nhiều ngày trong 1 lần commit (INSERT gộp, số câu SQL không
+    tăng theo số ngày) và cập nhật lịch sử món 1 lần.
+    
+    Args:
+        contents: dict {ngày: nội dung thực đơn}
+    
+    Returns:
+        tuple: (list ngày đã lưu, dict {ngày: lỗi})
+    """
+    if not contents:
+        return [], {}
+    
+    errors = {}
+    try:
+        saved = insert_menus(user_id, contents)
+        index_new_menus(user_id, contents)
+        db.session.commit()
+    except IntegrityError:
+        # Có ngày vừa được request khác lưu trước -> lưu lại từng ngày để chỉ ngày đó lỗi
+        db.session.rollback()
+        saved = {}
+        for menu_date, content in sorted(contents.items()):
+            try:
+                saved.update(insert_menus(user_id, {menu_date: content}))
+                index_new_menus(user_id, {menu_date: content})
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                errors[menu_date] = e
+    except Exception as e:
+        db.session.rollback()
+        return [], {menu_date: e for menu_date in contents}
+    
+    try:
+        record_dish_lists(user_id, list(saved.items()))
+    except Exception as e:
+        db.session.rollback()
+        print(f"⚠️ Không thể cập nhật lịch sử món của user {user_id}: {e}")
+    return sorted(saved), errors
+
+def wait_for_shared_menu(flight, user_id, menu_date):
+    """
+    Chờ request khác đang tạo thực đơn cho cùng (user, ngày) và trả về cùng kết quả.
+    
+    Returns:
+        tuple: (dict kết quả, HTTP status) - giống kết quả tạo 1 ngày, thêm 'shared': True
+    """
+    try:
+        result = flight.wait(current_app.config.get('SINGLE_FLIGHT_WAIT_SECONDS', 90))
+    except AIServiceError as e:
+        return ai_error_body(e), e.status_code
+    except TimeoutError:
+        result = None
+    except Exception as e:
+        return {'error': str(e)}, 500
+    
+    if result is not None:
+        body, status = result
+        return {**body, 'shared': True}, status
+    
+    # Request kia ở worker khác (hoặc tạo nhiều ngày) -> đọc thực đơn đã lưu
+    menu = DailyMenu.query.filter_by(user_id=user_id, date=menu_date).first()
+    if menu is None:
+        return {'error': 'Thực đơn ngày này đang được tạo bởi một yêu cầu khác, vui lòng thử lại sau'}, 409
+    return {
+        'message': f"Đã tạo thực đơn thành công cho ngày {menu_date.strftime('%d/%m/%Y')}!",
+        'date': str(menu_date),
+        'menu_content': menu.content,
+        'cached': False,
+        'shared': True
+    }, 200
+
+def sse_event(event, data):
+    """Định dạng 1 sự kiện Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def build_menu_context(user, data):
+    """
+    Cập nhật hồ sơ user từ data (nếu có) và chuẩn bị thông tin + prompt tạo thực đơn 1 ngày.
+    
+    Returns:
+        dict: Thông tin người dùng đã chuẩn hóa, ngày bắt đầu, bmr_info, key cache và prompt
+    """
     # Cập nhật thông tin user nếu có data mới từ form
     if data:
         if 'height' in data and data['height']:
@@ -91,6 +405,7 @@ def generate_menu():
     
     # Tính BMR (Basal Metabolic Rate) để đề xuất calo chính xác
     bmr_info = ""
+    target_cal = None
     if user.weight and user.height and user.age and user.gender:
         # BMR theo công thức Mifflin-St Jeor
         if user.gender.lower() == 'nam':
@@ -119,6 +434,20 @@ def generate_menu():
             target_cal = int(tdee)
             bmr_info = f"\n- Calo khuyến nghị: {target_cal} kcal/ngày (duy trì cân nặng)"
 
+    # Tham số chuẩn hóa làm key cache: cùng hồ sơ + cùng ngày -> dùng lại thực đơn đã tạo
+    # Gửi force_regenerate=true để bỏ qua cache và bắt AI tạo thực đơn mới
+    force_regenerate = bool(data.get('force_regenerate'))
+    profile_inputs = {
+        'weight': user.weight,
+        'height': user.height,
+        'age': user.age,
+        'gender': str(gender).strip().lower(),
+        'goal': str(goal).strip().lower(),
+        'activity': str(activity).strip().lower(),
+        'allergies': str(allergies).strip().lower(),
+        'bmr_info': bmr_info,
+    }
+
     # 2. Tạo câu lệnh (Prompt) gửi cho AI - Cải thiện với context tốt hơn
     prompt = (
         f"🍽️ NHIỆM VỤ: Tạo thực đơn dinh dưỡng cho ngày {start_date.strftime('%d/%m/%Y')}\n\n"
@@ -158,160 +487,396 @@ def generate_menu():
         f"- Dùng emoji phù hợp cho mỗi bữa ăn\n"
     )
 
+    return {
+        'weight': weight,
+        'height': height,
+        'age': age,
+        'gender': gender,
+        'goal': goal,
+        'activity': activity,
+        'allergies': allergies,
+        'start_date': start_date,
+        'bmr_info': bmr_info,
+        'target_cal': target_cal,
+        'force_regenerate': force_regenerate,
+        'profile_inputs': profile_inputs,
+        'prompt': prompt,
+    }
+
+@menu_bp.route('/generate-stream', methods=['POST'])
+@login_required
+def generate_menu_stream():
+    """
+    Tạo thực đơn 1 ngày và stream từng đoạn câu trả lời AI về dashboard (SSE).
+    Sự kiện: start -> chunk (nhiều lần) -> done | error
+    """
+    data = request.get_json() or {}
+    user = current_user._get_current_object()
+    ctx = build_menu_context(user, data)
+    start_date = ctx['start_date']
+    user_id = user.id
+    
+    def event_stream():
+        yield sse_event('start', {'date': str(start_date)})
+        
+        # Đã có request khác đang tạo cùng ngày (double-click, client retry) -> chờ và trả cùng kết quả
+        flight = single_flight.begin(user_id, start_date)
+        if not flight.leader:
+            body, status = wait_for_shared_menu(flight, user_id, start_date)
+            if status != 200:
+                yield sse_event('error', body)
+                return
+            yield sse_event('done', {
+                'date': body['date'],
+                'menu_content': body['menu_content'],
+                'calories': extract_total_calories(body['menu_content']),
+                'cached': body['cached'],
+                'shared': True
+            })
+            return
+        
+        with flight:
+            chunks = []
+            cached = False
+            try:
+                with rate_limiter.user_scope(user_id):
+                    for text, cached in stream_cached_ai_response(
+                        {**ctx['profile_inputs'], 'kind': 'daily', 'date': start_date.isoformat()},
+                        ctx['prompt'],
+                        force=ctx['force_regenerate']
+                    ):
+                        chunks.append(text)
+                        yield sse_event('chunk', {'text': text})
+            except AIServiceError as e:
+                # Không lưu câu trả lời dở dang/lỗi vào DB
+                flight.fail(e)
+                yield sse_event('error', ai_error_body(e))
+                return
+            except Exception as e:
+                flight.fail(e)
+                yield sse_event('error', {'error': f'Lỗi khi gọi AI: {str(e)}'})
+                return
+            
+            ai_reply = ''.join(chunks)
+            try:
+                save_single_menu(user_id, start_date, ai_reply)
+            except Exception as e:
+                db.session.rollback()
+                flight.fail(e)
+                yield sse_event('error', {'error': str(e)})
+                return
+            
+            flight.finish(({
+                'message': f"Đã tạo thực đơn thành công cho ngày {start_date.strftime('%d/%m/%Y')}!",
+                'date': str(start_date),
+                'menu_content': ai_reply,
+                'cached': cached
+            }, 200))
+            yield sse_event('done', {
+                'date': str(start_date),
+                'menu_content': ai_reply,
+                'calories': extract_total_calories(ai_reply),
+                'cached': cached
+            })
+    
+    return Response(
+        stream_with_context(event_stream()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@rate_limiter.user_scoped
+def generate_menu_for_user(user, data, progress=None):
+    """
+    Tạo thực đơn (1 hoặc nhiều ngày) cho user - dùng chung cho route và job chạy nền.
+    
+    Args:
+        user: User cần tạo thực đơn
+        data: Tham số giống body của POST /generate
+        progress: Hàm callback(ngày, trạng thái, lỗi) gọi sau mỗi ngày
+                  (trạng thái: 'created' | 'updated' | 'skipped' | 'failed')
+    
+    Returns:
+        tuple: (dict kết quả, HTTP status)
+    """
+    def report(day, status, error=None):
+        if progress:
+            progress(day, status, error)
+    
+    # 1-2. Cập nhật hồ sơ + chuẩn bị thông tin và prompt
+    ctx = build_menu_context(user, data)
+    weight, height, age, gender = ctx['weight'], ctx['height'], ctx['age'], ctx['gender']
+    goal, activity, allergies = ctx['goal'], ctx['activity'], ctx['allergies']
+    start_date, bmr_info, prompt = ctx['start_date'], ctx['bmr_info'], ctx['prompt']
+    force_regenerate, profile_inputs = ctx['force_regenerate'], ctx['profile_inputs']
+
     # 3. Lấy số ngày cần tạo (mặc định là 1)
     num_days = data.get('num_days', 1)
     
-    # 4. Gọi AI để tạo thực đơn
-    ai_reply = get_ai_response(prompt)
-
-    # 5. Lưu vào Database (Bảng daily_menus)
+    # Chế độ tạo: 'batch' (1 lời gọi AI cho cả kế hoạch), 'per_day' (1 lời gọi AI mỗi ngày)
+    # hoặc 'local' (bộ giải cục bộ từ danh mục món, không gọi AI - dùng cả cho 1 ngày)
+    mode = data.get('mode') or current_app.config.get('MENU_GENERATION_MODE', 'batch')
+    
+    # 4. Gọi AI và lưu vào Database (Bảng daily_menus)
     
     # Nếu chỉ tạo 1 ngày (cách cũ)
     if num_days == 1:
-        # Kiểm tra xem ngày đã chọn đã có thực đơn chưa?
-        existing_menu = DailyMenu.query.filter_by(user_id=user.id, date=start_date).first()
+        # Đã có request khác đang tạo cùng ngày (double-click, client retry) -> chờ và trả cùng kết quả
+        flight = single_flight.begin(user.id, start_date)
+        if not flight.leader:
+            body, status = wait_for_shared_menu(flight, user.id, start_date)
+            report(start_date, 'skipped' if status == 200 else 'failed', body.get('error'))
+            return body, status
         
-        # Trích xuất tổng calo từ nội dung AI
-        total_cals = extract_total_calories(ai_reply)
-        
-        if existing_menu:
-            # Nếu có rồi thì cập nhật lại nội dung mới
-            existing_menu.content = ai_reply
-            existing_menu.total_calories = total_cals
-            msg = f"Đã cập nhật thực đơn mới cho ngày {start_date.strftime('%d/%m/%Y')}!"
-        else:
-            # Nếu chưa có thì tạo mới
-            new_menu = DailyMenu(
-                user_id=user.id,
-                date=start_date,
-                content=ai_reply,
-                total_calories=total_cals
-            )
-            db.session.add(new_menu)
-            msg = f"Đã tạo thực đơn thành công cho ngày {start_date.strftime('%d/%m/%Y')}!"
+        with flight:
+            # Gọi AI để tạo thực đơn (qua cache) - lỗi thì trả về lỗi, không lưu gì vào DB
+            try:
+                if mode == 'local':
+                    # Bộ giải cục bộ: không gọi AI, tránh món của 3 thực đơn gần nhất
+                    ai_reply = build_local_menu(
+                        user.id, start_date, ctx['target_cal'], allergies, recent_dishes(user.id, start_date)
+                    )
+                    cached = False
+                else:
+                    ai_reply, cached = get_cached_ai_response(
+                        {**profile_inputs, 'kind': 'daily', 'date': start_date.isoformat()},
+                        prompt,
+                        force=force_regenerate
+                    )
+            except AIServiceError as e:
+                flight.fail(e)
+                report(start_date, 'failed', e)
+                return ai_error_body(e), e.status_code
+            except MenuEngineError as e:
+                flight.fail(e)
+                report(start_date, 'failed', e)
+                return {'error': str(e)}, 422
 
-        try:
-            db.session.commit()
-            return jsonify({
-                'message': msg,
-                'date': str(start_date),
-                'menu_content': ai_reply
-            }), 200
-        except Exception as e:
-            db.session.rollback()
-            return jsonify({'error': str(e)}), 500
+            try:
+                day_status = save_single_menu(user.id, start_date, ai_reply)
+                if day_status == 'updated':
+                    msg = f"Đã cập nhật thực đơn mới cho ngày {start_date.strftime('%d/%m/%Y')}!"
+                else:
+                    msg = f"Đã tạo thực đơn thành công cho ngày {start_date.strftime('%d/%m/%Y')}!"
+                result = {
+                    'message': msg,
+                    'date': str(start_date),
+                    'menu_content': ai_reply,
+                    'cached': cached
+                }, 200
+                flight.finish(result)
+                report(start_date, day_status)
+                return result
+            except Exception as e:
+                db.session.rollback()
+                flight.fail(e)
+                report(start_date, 'failed', e)
+                return {'error': str(e)}, 500
     
     # Tạo nhiều ngày
     else:
-        created_count = 0
         skipped_count = 0
         failed_count = 0
         created_dates = []
         
-        for i in range(num_days):
-            current_date = start_date + timedelta(days=i)
-            
-            # Kiểm tra xem ngày này đã có thực đơn chưa
-            existing_menu = DailyMenu.query.filter_by(user_id=user.id, date=current_date).first()
-            
-            if existing_menu:
+        # Xác định các ngày cần tạo (bỏ qua ngày đã có thực đơn)
+        plan_dates = [start_date + timedelta(days=i) for i in range(num_days)]
+        existing_dates = existing_menu_dates(user.id, plan_dates)
+        for current_date in plan_dates:
+            # Ngày đã có thực đơn (đọc sẵn cả khoảng bằng 1 câu SQL) -> bỏ qua
+            if current_date in existing_dates:
                 skipped_count += 1
-                continue
+                report(current_date, 'skipped')
+        
+        # Single-flight cho cả khoảng (claim 1 lần): ngày đang được request khác tạo thì
+        # không gọi AI lại, chờ kết quả ở cuối
+        plan = single_flight.begin_many(user.id, [d for d in plan_dates if d not in existing_dates])
+        flights = plan.flights
+        pending_days = [
+            (i, current_date) for i, current_date in enumerate(plan_dates)
+            if current_date in flights and flights[current_date].leader
+        ]
+        
+        try:
+            # Lịch sử món ăn để tránh lặp: món đã dùng trong MENU_VARIETY_DAYS ngày (chỉ mục
+            # dish_history, 1 câu SQL) + món của các ngày vừa tạo trong lượt này - thực đơn
+            # mới tạo xong được bổ sung vào đây để các ngày sau (chưa bắt đầu gọi AI) nhìn thấy.
+            days = variety_days()
+            history_names = recent_dishes(user.id, start_date, days)
+            known_menus = {}  # ngày -> [tên món] của thực đơn vừa tạo
+            known_menus_lock = threading.Lock()
             
-            # Tạo thực đơn mới cho ngày này
-            try:
-                # Lấy 3 thực đơn gần đây nhất để tránh lặp món
-                recent_menus = DailyMenu.query.filter_by(user_id=user.id)\
-                    .filter(DailyMenu.date < current_date)\
-                    .order_by(DailyMenu.date.desc())\
-                    .limit(3)\
-                    .all()
+            def used_names(before_date):
+                """Món cần tránh cho ngày before_date (ngày vừa tạo gần nhất trước)"""
+                with known_menus_lock:
+                    fresh = [name for menu_date in sorted(known_menus, reverse=True) if menu_date < before_date
+                             for name in known_menus[menu_date]]
+                return fresh + history_names
+        
+            def make_day_task(i, current_date):
+                def task():
+                    # Tạo danh sách món ăn đã dùng gần đây (tại thời điểm bắt đầu gọi AI)
+                    used_dishes = build_used_dishes(used_names(current_date), days)
+                
+                    # Các ngày được tạo song song không thấy thực đơn của nhau
+                    # -> xoay vòng nguồn protein chính theo thứ tự ngày để vẫn đa dạng
+                    main_protein = PROTEIN_ROTATION[i % len(PROTEIN_ROTATION)]
                 
-                # Tạo danh sách món ăn đã dùng gần đây
-                used_dishes = ""
-                if recent_menus:
-                    used_dishes = "\n\n🚫 TUYỆT ĐỐI KHÔNG LẶP LẠI CÁC MÓN SAU (đã dùng trong 3 ngày gần đây):\n"
-                    for menu in recent_menus:
-                        # Trích xuất tên món từ thực đơn (lấy các dòng có dấu -)
-                        lines = menu.content.split('\n')
-                        dishes_list = []
-                        for line in lines:
-                            if line.strip().startswith('-') and 'kcal' in line.lower():
-                                # Lấy tên món (phần trước dấu ngoặc)
-                                dish_name = line.split('(')[0].replace('-', '').strip()
-                                if dish_name and len(dish_name) > 3:
-                                    dishes_list.append(dish_name)
-                        
-                        if dishes_list:
-                            used_dishes += f"  Ngày {menu.date.strftime('%d/%m')}: {', '.join(dishes_list)}\n"
-                    
-                    used_dishes += "\n⚡ BẮT BUỘC: Thực đơn hôm nay phải có món ăn HOÀN TOÀN KHÁC, sáng tạo và đa dạng!\n"
+                    # Tạo prompt riêng cho từng ngày với danh sách món đã dùng
+                    daily_prompt = (
+                        f"🍽️ NHIỆM VỤ: Tạo thực đơn dinh dưỡng cho ngày {current_date.strftime('%d/%m/%Y')} (Ngày thứ {i+1})\n\n"
+                        f"📊 THÔNG TIN NGƯỜI DÙNG:\n"
+                        f"- Giới tính: {gender}\n"
+                        f"- Tuổi: {age} tuổi\n"
+                        f"- Chiều cao: {height} cm\n"
+                        f"- Cân nặng: {weight} kg\n"
+                        f"- Mục tiêu sức khỏe: {goal}\n"
+                        f"- Mức độ hoạt động: {activity}\n"
+                        f"- Dị ứng/Hạn chế: {allergies}{bmr_info}{used_dishes}\n\n"
+                        f"🎯 YÊU CẦU THỰC ĐƠN:\n"
+                        f"1. Tạo 3 bữa ăn chính: Bữa sáng, Bữa trưa, Bữa tối\n"
+                        f"2. Mỗi món ăn phải ghi:\n"
+                        f"   - Tên món ăn (món Việt Nam ưu tiên)\n"
+                        f"   - Khẩu phần cụ thể (gram/ml)\n"
+                        f"   - Calo ước tính cho từng món\n"
+                        f"3. Cuối cùng tính TỔNG CALO cả ngày\n"
+                        f"4. Thực đơn cân đối dinh dưỡng: đủ protein, tinh bột, chất béo, rau củ\n"
+                        f"5. Món ăn ĐA DẠNG, sáng tạo, phù hợp văn hóa ẩm thực Việt Nam\n"
+                        f"6. TUYỆT ĐỐI tránh các món có: {allergies}\n"
+                        f"7. Thay đổi cách chế biến: luân phiên chiên, xào, hấp, luộc, nướng, kho\n"
+                        f"8. Đa dạng nguồn protein: thịt bò, thịt lợn, gà, cá, trứng, đậu phụ\n"
+                        f"9. Nguồn protein chính của bữa trưa và bữa tối hôm nay: {main_protein}\n\n"
+                        f"📝 FORMAT TRẢ LỜI (BẮT BUỘC):\n"
+                        f"Bữa sáng 🌅\n"
+                        f"- [Tên món] ([gram/ml]) - [calo] kcal\n"
+                        f"- [Tên món] ([gram/ml]) - [calo] kcal\n\n"
+                        f"Bữa trưa 🌞\n"
+                        f"- [Tên món] ([gram/ml]) - [calo] kcal\n"
+                        f"- [Tên món] ([gram/ml]) - [calo] kcal\n\n"
+                        f"Bữa tối 🌙\n"
+                        f"- [Tên món] ([gram/ml]) - [calo] kcal\n"
+                        f"- [Tên món] ([gram/ml]) - [calo] kcal\n\n"
+                        f"Tổng calo: [số] kcal\n\n"
+                        f"⚠️ LƯU Ý:\n"
+                        f"- KHÔNG hỏi thêm thông tin\n"
+                        f"- KHÔNG đưa lời khuyên hay giải thích thêm\n"
+                        f"- CHỈ trả về thực đơn theo đúng format trên\n"
+                        f"- Dùng emoji phù hợp cho mỗi bữa ăn\n"
+                        f"- HÃY SÁNG TẠO - thực đơn này phải ĐẶC BIỆT và KHÁC BIỆT!\n"
+                    )
                 
-                # Tạo prompt riêng cho từng ngày với danh sách món đã dùng
-                daily_prompt = (
-                    f"🍽️ NHIỆM VỤ: Tạo thực đơn dinh dưỡng cho ngày {current_date.strftime('%d/%m/%Y')} (Ngày thứ {i+1})\n\n"
-                    f"📊 THÔNG TIN NGƯỜI DÙNG:\n"
+                    # Gọi AI để tạo thực đơn cho ngày này
+                    daily_ai_reply, _ = get_cached_ai_response(
+                        {**profile_inputs, 'kind': 'multi_day', 'date': current_date.isoformat(),
+                         'day_index': i, 'used_dishes': used_dishes},
+                        daily_prompt,
+                        force=force_regenerate
+                    )
+                    return daily_ai_reply
+                return task
+        
+            def remember(current_date, content):
+                """Ghi nhận món của ngày vừa tạo để các ngày sau tránh lặp (trước khi lưu DB)"""
+                with known_menus_lock:
+                    known_menus[current_date] = parse_menu(content).dish_names
+            
+            def save_days(contents):
+                """Lưu các ngày đã tạo xong trong 1 lần ghi DB, trả về số ngày lỗi"""
+                saved_dates, errors = save_new_menus(user.id, contents)
+                for current_date in saved_dates:
+                    flights[current_date].finish()
+                    created_dates.append(str(current_date))
+                    report(current_date, 'created')
+                for current_date, error in errors.items():
+                    report(current_date, 'failed', error)
+                    print(f"Lỗi lưu thực đơn ngày {current_date}: {str(error)}")
+                return len(errors)
+        
+            # Bộ giải cục bộ: không gọi AI, tạo lần lượt để ngày sau tránh món của ngày trước
+            if mode == 'local':
+                dishes = Dish.query.filter_by(is_active=True).all()
+                contents = {}
+                for i, current_date in pending_days:
+                    try:
+                        contents[current_date] = build_local_menu(
+                            user.id, current_date, ctx['target_cal'], allergies, used_names(current_date), dishes=dishes
+                        )
+                        remember(current_date, contents[current_date])
+                    except MenuEngineError as e:
+                        failed_count += 1
+                        report(current_date, 'failed', e)
+                failed_count += save_days(contents)
+                pending_days = []
+            
+            # Chế độ gộp: 1 lời gọi AI cho tất cả các ngày, ngày nào tách lỗi thì gọi riêng
+            if mode == 'batch' and len(pending_days) > 1:
+                batch_dates = [current_date for _, current_date in pending_days]
+                used_dishes = build_used_dishes(history_names, days)
+                user_info = (
                     f"- Giới tính: {gender}\n"
                     f"- Tuổi: {age} tuổi\n"
                     f"- Chiều cao: {height} cm\n"
                     f"- Cân nặng: {weight} kg\n"
                     f"- Mục tiêu sức khỏe: {goal}\n"
                     f"- Mức độ hoạt động: {activity}\n"
-                    f"- Dị ứng/Hạn chế: {allergies}{bmr_info}{used_dishes}\n\n"
-                    f"🎯 YÊU CẦU THỰC ĐƠN:\n"
-                    f"1. Tạo 3 bữa ăn chính: Bữa sáng, Bữa trưa, Bữa tối\n"
-                    f"2. Mỗi món ăn phải ghi:\n"
-                    f"   - Tên món ăn (món Việt Nam ưu tiên)\n"
-                    f"   - Khẩu phần cụ thể (gram/ml)\n"
-                    f"   - Calo ước tính cho từng món\n"
-                    f"3. Cuối cùng tính TỔNG CALO cả ngày\n"
-                    f"4. Thực đơn cân đối dinh dưỡng: đủ protein, tinh bột, chất béo, rau củ\n"
-                    f"5. Món ăn ĐA DẠNG, sáng tạo, phù hợp văn hóa ẩm thực Việt Nam\n"
-                    f"6. TUYỆT ĐỐI tránh các món có: {allergies}\n"
-                    f"7. Thay đổi cách chế biến: luân phiên chiên, xào, hấp, luộc, nướng, kho\n"
-                    f"8. Đa dạng nguồn protein: thịt bò, thịt lợn, gà, cá, trứng, đậu phụ\n\n"
-                    f"📝 FORMAT TRẢ LỜI (BẮT BUỘC):\n"
-                    f"Bữa sáng 🌅\n"
-                    f"- [Tên món] ([gram/ml]) - [calo] kcal\n"
-                    f"- [Tên món] ([gram/ml]) - [calo] kcal\n\n"
-                    f"Bữa trưa 🌞\n"
-                    f"- [Tên món] ([gram/ml]) - [calo] kcal\n"
-                    f"- [Tên món] ([gram/ml]) - [calo] kcal\n\n"
-                    f"Bữa tối 🌙\n"
-                    f"- [Tên món] ([gram/ml]) - [calo] kcal\n"
-                    f"- [Tên món] ([gram/ml]) - [calo] kcal\n\n"
-                    f"Tổng calo: [số] kcal\n\n"
-                    f"⚠️ LƯU Ý:\n"
-                    f"- KHÔNG hỏi thêm thông tin\n"
-                    f"- KHÔNG đưa lời khuyên hay giải thích thêm\n"
-                    f"- CHỈ trả về thực đơn theo đúng format trên\n"
-                    f"- Dùng emoji phù hợp cho mỗi bữa ăn\n"
-                    f"- HÃY SÁNG TẠO - thực đơn này phải ĐẶC BIỆT và KHÁC BIỆT!\n"
-                )
-                
-                # Gọi AI để tạo thực đơn cho ngày này
-                daily_ai_reply = get_ai_response(daily_prompt)
-                
-                # Trích xuất tổng calo
-                total_cals = extract_total_calories(daily_ai_reply)
-                
-                new_menu = DailyMenu(
-                    user_id=user.id,
-                    date=current_date,
-                    content=daily_ai_reply,
-                    total_calories=total_cals
+                    f"- Dị ứng/Hạn chế: {allergies}{bmr_info}"
                 )
-                db.session.add(new_menu)
-                db.session.commit()
-                
-                created_count += 1
-                created_dates.append(str(current_date))
-            except Exception as e:
-                db.session.rollback()
+                try:
+                    batch_reply, _ = get_cached_ai_response(
+                        {**profile_inputs, 'kind': 'batch', 'dates': [d.isoformat() for d in batch_dates],
+                         'used_dishes': used_dishes},
+                        build_batch_prompt(batch_dates, user_info, used_dishes),
+                        force=force_regenerate
+                    )
+                except AIRateLimitedError as e:
+                    # Bị giới hạn tần suất -> gọi riêng từng ngày cũng sẽ bị từ chối, trả 429 luôn
+                    for i, current_date in pending_days:
+                        report(current_date, 'failed', e)
+                    return ai_error_body(e), e.status_code
+                except AIServiceError as e:
+                    # Gọi gộp lỗi -> tất cả các ngày chuyển sang gọi riêng
+                    print(f"Lỗi tạo thực đơn gộp: {str(e)}")
+                    batch_reply = None
+            
+                batch_menus = split_batch_reply(batch_reply, batch_dates)
+                for current_date, content in batch_menus.items():
+                    remember(current_date, content)
+                failed_count += save_days(batch_menus)
+                pending_days = [(i, current_date) for i, current_date in pending_days if current_date not in batch_menus]
+        
+            # Gọi AI song song (giới hạn số luồng), lưu tất cả các ngày 1 lần khi xong
+            tasks = [(current_date, make_day_task(i, current_date)) for i, current_date in pending_days]
+            contents = {}
+            for current_date, daily_ai_reply, error in run_ai_tasks(tasks):
+                if error is not None:
+                    failed_count += 1
+                    report(current_date, 'failed', error)
+                    print(f"Lỗi tạo thực đơn ngày {current_date}: {str(error)}")
+                    continue
+                contents[current_date] = daily_ai_reply
+                remember(current_date, daily_ai_reply)
+            failed_count += save_days(contents)
+        finally:
+            # Nhả quyền cả khoảng (ngày chưa tạo được: request đang chờ sẽ đọc lại DB)
+            plan.close()
+        
+        # Các ngày do request khác đang tạo: chờ xong rồi tính là đã có sẵn
+        for current_date, flight in flights.items():
+            if flight.leader:
+                continue
+            body, status = wait_for_shared_menu(flight, user.id, current_date)
+            if status == 200:
+                skipped_count += 1
+                report(current_date, 'skipped')
+            else:
                 failed_count += 1
-                print(f"Lỗi tạo thực đơn ngày {current_date}: {str(e)}")
+                report(current_date, 'failed', body.get('error'))
         
-        return jsonify({
+        created_count = len(created_dates)
+        
+        created_dates.sort()
+        
+        return {
             'message': f'Đã tạo {created_count} thực đơn',
             'summary': {
                 'created': created_count,
@@ -319,22 +884,37 @@ def generate_menu():
                 'failed': failed_count,
                 'dates_created': created_dates
             }
-        }), 200
+        }, 200
+
+def menu_day_response(menu_date, missing_message):
+    """
+    Thực đơn 1 ngày của user kèm ETag; client gửi If-None-Match trùng -> 304.
+    
+    Chỉ đọc (id, version) để so ETag, nội dung chỉ được tải khi thực đơn đã đổi.
+    """
+    head = db.session.query(DailyMenu.id, DailyMenu.version, DailyMenu.prewarmed)\
+        .filter_by(user_id=current_user.id, date=menu_date).first()
+    record_menu_read(head, menu_date)
+    
+    if not head:
+        return jsonify({'message': missing_message}), 404
+    
+    etag = make_etag(head.id, head.version)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    menu = db.session.get(DailyMenu, head.id)
+    return with_etag({
+        'date': str(menu.date),
+        'content': menu.content,
+        'calories': menu.total_calories
+    }, 200, etag)
 
 @menu_bp.route('/today', methods=['GET'])
 @login_required
 def get_menu_today():
-    today = date.today()
-    menu = DailyMenu.query.filter_by(user_id=current_user.id, date=today).first()
-    
-    if menu:
-        return jsonify({
-            'date': str(menu.date),
-            'content': menu.content,
-            'calories': menu.total_calories
-        })
-    else:
-        return jsonify({'message': 'Hôm nay chưa có thực đơn nào.'}), 404
+    return menu_day_response(date.today(), 'Hôm nay chưa có thực đơn nào.')
 
 @menu_bp.route('/by-date', methods=['GET'])
 @login_required
@@ -351,16 +931,7 @@ def get_menu_by_date():
     except ValueError:
         return jsonify({'error': 'Định dạng ngày không hợp lệ. Dùng YYYY-MM-DD'}), 400
     
-    menu = DailyMenu.query.filter_by(user_id=current_user.id, date=menu_date).first()
-    
-    if menu:
-        return jsonify({
-            'date': str(menu.date),
-            'content': menu.content,
-            'calories': menu.total_calories
-        }), 200
-    else:
-        return jsonify({'message': f'Không có thực đơn cho ngày {date_str}'}), 404
+    return menu_day_response(menu_date, f'Không có thực đơn cho ngày {date_str}')
 
 @menu_bp.route('/delete/<date_str>', methods=['DELETE'])
 @login_required
@@ -390,12 +961,33 @@ def delete_menu(date_str):
 @login_required
 def generate_7_days_menu():
     """Tạo thực đơn cho 7 ngày tiếp theo"""
-    from datetime import timedelta
+    data = request.get_json() or {}
+    
+    # Chế độ bất đồng bộ: đưa vào hàng đợi và trả về job id ngay
+    if data.get('async'):
+        return enqueue_menu_job('generate_7_days', data)
+    
+    body, status = generate_7_days_for_user(current_user._get_current_object(), data)
+    return json_response(body, status)
+
+@rate_limiter.user_scoped
+def generate_7_days_for_user(user, data, progress=None):
+    """
+    Tạo thực đơn 7 ngày cho user - dùng chung cho route và job chạy nền.
     
-    user = current_user
+    Args:
+        user: User cần tạo thực đơn
+        data: Tham số giống body của POST /generate-7-days
+        progress: Hàm callback(ngày, trạng thái, lỗi) gọi sau mỗi ngày
+    
+    Returns:
+        tuple: (dict kết quả, HTTP status)
+    """
+    def report(day, status, error=None):
+        if progress:
+            progress(day, status, error)
     
     # Lấy ngày bắt đầu (mặc định là hôm nay)
-    data = request.get_json() or {}
     start_date_str = data.get('start_date')
     if start_date_str:
         start_date = date.fromisoformat(start_date_str)
@@ -411,21 +1003,37 @@ def generate_7_days_menu():
     activity = user.activity_level if user.activity_level else "Vận động vừa"
     allergies = user.allergies if user.allergies else "Không có"
     
+    # Key cache theo hồ sơ người dùng (force_regenerate=true để bỏ qua cache)
+    force_regenerate = bool(data.get('force_regenerate'))
+    profile_inputs = {
+        'weight': user.weight,
+        'height': user.height,
+        'age': user.age,
+        'gender': str(gender).strip().lower(),
+        'goal': str(goal).strip().lower(),
+        'activity': str(activity).strip().lower(),
+        'allergies': str(allergies).strip().lower(),
+    }
+    
     created_menus = []
     errors = []
     
-    # Tạo thực đơn cho 7 ngày
-    for i in range(7):
-        target_date = start_date + timedelta(days=i)
-        
-        # Kiểm tra xem ngày này đã có thực đơn chưa
-        existing_menu = DailyMenu.query.filter_by(
-            user_id=user.id, 
-            date=target_date
-        ).first()
-        
-        if existing_menu:
+    # Chuẩn bị prompt cho các ngày chưa có thực đơn
+    tasks = []
+    week_dates = [start_date + timedelta(days=i) for i in range(7)]
+    existing_dates = existing_menu_dates(user.id, week_dates)
+    for target_date in week_dates:
+        # Kiểm tra xem ngày này đã có thực đơn chưa (cả tuần đọc bằng 1 câu SQL)
+        if target_date in existing_dates:
             # Đã có rồi, bỏ qua
+            report(target_date, 'skipped')
+    
+    # Single-flight cho cả tuần (claim 1 lần): ngày đang được request khác tạo thì
+    # không gọi AI lại, chờ kết quả ở cuối
+    plan = single_flight.begin_many(user.id, [d for d in week_dates if d not in existing_dates])
+    flights = plan.flights
+    for target_date, flight in flights.items():
+        if not flight.leader:
             continue
         
         # Tạo prompt cho AI
@@ -446,38 +1054,114 @@ def generate_7_days_menu():
             f"5. Trả lời ngắn gọn, có emoji\n"
         )
         
-        try:
-            # Gọi AI
-            ai_reply = get_ai_response(prompt)
-            
-            # Lưu vào database
-            new_menu = DailyMenu(
-                user_id=user.id,
-                date=target_date,
-                content=ai_reply,
-                total_calories=0
-            )
-            db.session.add(new_menu)
-            created_menus.append(target_date.strftime('%d/%m/%Y'))
-            
-        except Exception as e:
-            errors.append(f"{target_date.strftime('%d/%m/%Y')}: {str(e)}")
+        def make_task(target_date, prompt):
+            def task():
+                # Gọi AI
+                ai_reply, _ = get_cached_ai_response(
+                    {**profile_inputs, 'kind': '7_days', 'date': target_date.isoformat()},
+                    prompt,
+                    force=force_regenerate
+                )
+                return ai_reply
+            return task
+        
+        tasks.append((target_date, make_task(target_date, prompt)))
+    
+    def save_days(contents):
+        """Lưu các ngày đã tạo xong trong 1 lần ghi DB"""
+        saved_dates, save_errors = save_new_menus(user.id, contents)
+        for target_date in saved_dates:
+            flights[target_date].finish()
+            created_menus.append(target_date)
+            report(target_date, 'created')
+        for target_date, error in save_errors.items():
+            errors.append(f"{target_date.strftime('%d/%m/%Y')}: Lỗi lưu database: {str(error)}")
+            report(target_date, 'failed', error)
     
-    # Commit tất cả
     try:
-        db.session.commit()
-        return jsonify({
-            'success': True,
-            'message': f'Đã tạo thực đơn cho {len(created_menus)} ngày',
-            'created_dates': created_menus,
-            'errors': errors
-        }), 201
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({
-            'success': False,
-            'error': 'Lỗi lưu database: ' + str(e)
-        }), 500
+        # Chế độ gộp: 1 lời gọi AI cho cả tuần, ngày nào tách lỗi thì gọi riêng
+        mode = data.get('mode') or current_app.config.get('MENU_GENERATION_MODE', 'batch')
+        if mode == 'batch' and len(tasks) > 1:
+            batch_dates = [target_date for target_date, _ in tasks]
+            user_info = (
+                f"- Giới tính: {gender}\n"
+                f"- Tuổi: {age}\n"
+                f"- Chiều cao: {height}cm\n"
+                f"- Cân nặng: {weight}kg\n"
+                f"- Mục tiêu: {goal}\n"
+                f"- Mức độ vận động: {activity}\n"
+                f"- Dị ứng/Không ăn được: {allergies}"
+            )
+            try:
+                batch_reply, _ = get_cached_ai_response(
+                    {**profile_inputs, 'kind': '7_days_batch', 'dates': [d.isoformat() for d in batch_dates]},
+                    build_batch_prompt(batch_dates, user_info),
+                    force=force_regenerate
+                )
+            except AIRateLimitedError as e:
+                # Bị giới hạn tần suất -> gọi riêng từng ngày cũng sẽ bị từ chối, trả 429 luôn
+                for target_date in batch_dates:
+                    report(target_date, 'failed', e)
+                return ai_error_body(e), e.status_code
+            except AIServiceError as e:
+                # Gọi gộp lỗi -> tất cả các ngày chuyển sang gọi riêng
+                print(f"Lỗi tạo thực đơn gộp: {str(e)}")
+                batch_reply = None
+        
+            batch_menus = split_batch_reply(batch_reply, batch_dates)
+            save_days(batch_menus)
+            tasks = [(target_date, task) for target_date, task in tasks if target_date not in batch_menus]
+    
+        # Gọi AI song song (giới hạn số luồng), lưu tất cả các ngày 1 lần khi xong
+        contents = {}
+        for target_date, ai_reply, error in run_ai_tasks(tasks):
+            if error is not None:
+                errors.append(f"{target_date.strftime('%d/%m/%Y')}: {str(error)}")
+                report(target_date, 'failed', error)
+                continue
+            contents[target_date] = ai_reply
+        save_days(contents)
+    
+    finally:
+        # Nhả quyền cả tuần (ngày chưa tạo được: request đang chờ sẽ đọc lại DB)
+        plan.close()
+    
+    # Các ngày do request khác đang tạo: chờ xong rồi coi như đã có sẵn
+    for target_date, flight in flights.items():
+        if flight.leader:
+            continue
+        body, status = wait_for_shared_menu(flight, user.id, target_date)
+        if status == 200:
+            report(target_date, 'skipped')
+        else:
+            errors.append(f"{target_date.strftime('%d/%m/%Y')}: {body.get('error')}")
+            report(target_date, 'failed', body.get('error'))
+    
+    return {
+        'success': True,
+        'message': f'Đã tạo thực đơn cho {len(created_menus)} ngày',
+        'created_dates': [d.strftime('%d/%m/%Y') for d in sorted(created_menus)],
+        'errors': errors
+    }, 201
+
+# Đăng ký handler cho worker chạy nền
+job_queue.register_handler('generate', generate_menu_for_user)
+job_queue.register_handler('generate_7_days', generate_7_days_for_user)
+
+@menu_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@login_required
+def get_menu_job(job_id):
+    """Xem trạng thái + kết quả từng ngày của job tạo thực đơn chạy nền"""
+    job = MenuJob.query.filter_by(id=job_id, user_id=current_user.id).first()
+    
+    if not job:
+        return jsonify({'error': 'Không tìm thấy job'}), 404
+    
+    # Đảm bảo worker đang chạy (vd: sau khi server khởi động lại còn job tồn đọng)
+    if job.status in ('queued', 'running'):
+        job_queue.ensure_workers(current_app._get_current_object())
+    
+    return jsonify(job_queue.job_to_dict(job)), 200
 
 @menu_bp.route('/week', methods=['GET'])
 @login_required
@@ -488,11 +1172,17 @@ def get_menu_week():
     today = date.today()
     week_ago = today - timedelta(days=6)  # Lấy 7 ngày (hôm nay + 6 ngày trước)
     
-    menus = DailyMenu.query.filter(
+    filters = (
         DailyMenu.user_id == current_user.id,
         DailyMenu.date >= week_ago,
         DailyMenu.date <= today
-    ).order_by(DailyMenu.date.desc()).all()
+    )
+    etag = make_etag(today, *watermark(DailyMenu, *filters))
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    menus = DailyMenu.query.filter(*filters).order_by(DailyMenu.date.desc()).all()
     
     result = []
     for menu in menus:
@@ -502,25 +1192,218 @@ def get_menu_week():
             'calories': menu.total_calories
         })
     
-    return jsonify({'menus': result, 'count': len(result)}), 200
+    return with_etag({'menus': result, 'count': len(result)}, 200, etag)
+
+# Số ngày tối đa mỗi lần gọi /range (đủ 1 tháng + tuần liền kề 2 bên)
+MENU_RANGE_MAX_DAYS = 93
+# shape của /range -> cột cần đọc (label = tên trường trả về, Row được jsonify thẳng)
+MENU_RANGE_SHAPES = {
+    'summary': (DailyMenu.date, DailyMenu.total_calories.label('calories')),
+    'full': (DailyMenu.date, DailyMenu.total_calories.label('calories'), DailyMenu.content),
+}
+
+@menu_bp.route('/range', methods=['GET'])
+@login_required
+def get_menu_range():
+    """
+    Lấy thực đơn trong 1 khoảng ngày bằng 1 câu SQL theo chỉ mục (user_id, date).
+    Dùng khi xem lịch: tải trước cả tuần trước/sau thay vì gọi /by-date từng ngày.
+    
+    Query params:
+        from, to: YYYY-MM-DD (gồm cả 2 đầu, tối đa MENU_RANGE_MAX_DAYS ngày)
+        shape: 'summary' (date, calories - mặc định) | 'full' (kèm content)
+    """
+    try:
+        start = date.fromisoformat(request.args.get('from', ''))
+        end = date.fromisoformat(request.args.get('to', ''))
+    except ValueError:
+        return jsonify({'error': 'Thiếu hoặc sai from/to. Dùng YYYY-MM-DD'}), 400
+    if end < start:
+        return jsonify({'error': 'to phải sau hoặc bằng from'}), 400
+    if (end - start).days + 1 > MENU_RANGE_MAX_DAYS:
+        return jsonify({'error': f'Khoảng ngày tối đa {MENU_RANGE_MAX_DAYS} ngày'}), 400
+    shape = request.args.get('shape', 'summary')
+    if shape not in MENU_RANGE_SHAPES:
+        return jsonify({'error': 'shape phải là summary hoặc full'}), 400
+    
+    filters = (
+        DailyMenu.user_id == current_user.id,
+        DailyMenu.date >= start,
+        DailyMenu.date <= end
+    )
+    etag = make_etag(*watermark(DailyMenu, *filters))
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    menus = db.session.query(*MENU_RANGE_SHAPES[shape]).filter(*filters).order_by(DailyMenu.date).all()
+    
+    return with_etag({
+        'from': str(start),
+        'to': str(end),
+        'shape': shape,
+        'menus': menus,
+        'count': len(menus)
+    }, 200, etag)
+
+# Số kết quả tối đa mỗi lần gọi /search
+MENU_SEARCH_MAX_LIMIT = 100
+
+@menu_bp.route('/search', methods=['GET'])
+@login_required
+def search_menu():
+    """
+    Tìm thực đơn của user theo món/bữa qua chỉ mục toàn văn (FTS5 / tsvector),
+    không phân biệt dấu: ?q=pho bo khớp "Phở bò", từ khóa ngắn (đang gõ dở) khớp theo tiền tố.
+    
+    Query params:
+        q: từ khóa (bắt buộc)
+        limit: số kết quả tối đa (mặc định 20, tối đa MENU_SEARCH_MAX_LIMIT)
+    """
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({'error': 'Thiếu từ khóa tìm kiếm (q)'}), 400
+    try:
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        return jsonify({'error': 'limit phải là số nguyên'}), 400
+    limit = max(1, min(limit, MENU_SEARCH_MAX_LIMIT))
+    
+    menus = search_menus(current_user.id, q, limit)
+    
+    return jsonify({
+        'query': q,
+        'menus': [
+            {'date': str(menu.date), 'content': menu.content, 'calories': menu.total_calories}
+            for menu in menus
+        ],
+        'count': len(menus)
+    }), 200
+
+# Các trường có thể chọn qua ?fields= của /all (tên trả về -> cột)
+MENU_LIST_FIELDS = {
+    'id': DailyMenu.id,
+    'date': DailyMenu.date,
+    'calories': DailyMenu.total_calories,
+    'content': DailyMenu.content,
+    'prewarmed': DailyMenu.prewarmed,
+}
+MENU_LIST_DEFAULT_FIELDS = ('date', 'content', 'calories')
+MENU_LIST_MAX_LIMIT = 500
+MENU_LIST_YIELD_PER = 200
+MENU_LIST_FORMATS = ('json', 'ndjson', 'stream')
+
+def encode_menu_cursor(menu_date, menu_id):
+    return f"{menu_date.isoformat()}_{menu_id}"
+
+def decode_menu_cursor(cursor):
+    """'YYYY-MM-DD_id' -> (date, id); sai định dạng -> ValueError"""
+    date_str, _, id_str = cursor.partition('_')
+    return date.fromisoformat(date_str), int(id_str)
 
 @menu_bp.route('/all', methods=['GET'])
 @login_required
 def get_all_menus():
-    """Lấy tất cả thực đơn của user"""
-    menus = DailyMenu.query.filter(
-        DailyMenu.user_id == current_user.id
-    ).order_by(DailyMenu.date.desc()).all()
+    """
+    Lấy thực đơn của user (mới nhất trước).
     
-    result = []
-    for menu in menus:
-        result.append({
-            'date': str(menu.date),
-            'content': menu.content,
-            'calories': menu.total_calories
-        })
+    Query params:
+        fields: Trường cần lấy, vd 'date,calories' (mặc định: date,content,calories)
+        limit: Số thực đơn mỗi trang (phân trang keyset theo (date, id)); bỏ trống -> tất cả
+        cursor: Giá trị next_cursor của trang trước
+        format: 'ndjson' -> stream mỗi dòng 1 thực đơn; 'stream' -> stream JSON như mặc định
+    """
+    fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()] or list(MENU_LIST_DEFAULT_FIELDS)
+    unknown = [f for f in fields if f not in MENU_LIST_FIELDS]
+    if unknown:
+        return jsonify({'error': f"Trường không hợp lệ: {', '.join(unknown)}"}), 400
+    
+    limit = request.args.get('limit')
+    try:
+        limit = int(limit) if limit else None
+    except ValueError:
+        return jsonify({'error': 'limit phải là số nguyên'}), 400
+    if limit is not None and not 1 <= limit <= MENU_LIST_MAX_LIMIT:
+        return jsonify({'error': f'limit phải từ 1 đến {MENU_LIST_MAX_LIMIT}'}), 400
+    try:
+        cursor = request.args.get('cursor')
+        cursor = decode_menu_cursor(cursor) if cursor else None
+    except ValueError:
+        return jsonify({'error': 'cursor không hợp lệ'}), 400
+    output = request.args.get('format', 'json')
+    if output not in MENU_LIST_FORMATS:
+        return jsonify({'error': f"format phải là một trong: {', '.join(MENU_LIST_FORMATS)}"}), 400
     
-    return jsonify({'menus': result, 'count': len(result)}), 200
+    etag = make_etag(*watermark(DailyMenu, DailyMenu.user_id == current_user.id))
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    # Chỉ đọc các cột cần (+ date, id để làm cursor), không tạo object ORM
+    columns = [MENU_LIST_FIELDS[f] for f in fields] + [DailyMenu.date, DailyMenu.id]
+    query = db.session.query(*columns).filter(DailyMenu.user_id == current_user.id)
+    if cursor:
+        cursor_date, cursor_id = cursor
+        query = query.filter(db.or_(
+            DailyMenu.date < cursor_date,
+            db.and_(DailyMenu.date == cursor_date, DailyMenu.id < cursor_id)
+        ))
+    query = query.order_by(DailyMenu.date.desc(), DailyMenu.id.desc())
+    if limit:
+        # Lấy dư 1 dòng để biết còn trang sau không
+        query = query.limit(limit + 1)
+    
+    def to_dict(row):
+        item = {}
+        for index, field in enumerate(fields):
+            value = row[index]
+            item[field] = str(value) if field == 'date' else value
+        return item
+    
+    page = {'has_more': False}
+    
+    def rows():
+        """(dict thực đơn, cursor của dòng) - đọc từng lô yield_per để bộ nhớ không tăng theo lịch sử"""
+        for count, row in enumerate(query.yield_per(MENU_LIST_YIELD_PER)):
+            if limit and count >= limit:
+                page['has_more'] = True
+                return
+            yield to_dict(row), encode_menu_cursor(row[-2], row[-1])
+    
+    dumps = current_app.json.dumps
+    
+    if output == 'ndjson':
+        def generate_ndjson():
+            last_cursor = None
+            for item, last_cursor in rows():
+                yield dumps(item) + '\n'
+            # Dòng cuối (chỉ khi còn trang sau): cursor để lấy trang tiếp theo
+            if page['has_more']:
+                yield dumps({'next_cursor': last_cursor}) + '\n'
+        response = Response(stream_with_context(generate_ndjson()), mimetype='application/x-ndjson')
+        response.set_etag(etag)
+        return response
+    
+    if output == 'stream':
+        def generate_json():
+            last_cursor, count = None, 0
+            yield '{"menus": ['
+            for item, last_cursor in rows():
+                yield (',' if count else '') + dumps(item)
+                count += 1
+            next_cursor = last_cursor if page['has_more'] else None
+            yield f'], "count": {count}, "next_cursor": {dumps(next_cursor)}}}'
+        response = Response(stream_with_context(generate_json()), mimetype='application/json')
+        response.set_etag(etag)
+        return response
+    
+    result, last_cursor = [], None
+    for item, last_cursor in rows():
+        result.append(item)
+    body = {'menus': result, 'count': len(result)}
+    if limit:
+        body['next_cursor'] = last_cursor if page['has_more'] else None
+    return with_etag(body, 200, etag)
 
 @menu_bp.route('/update-meal', methods=['PATCH'])
 @login_required
@@ -550,68 +1433,18 @@ def update_meal():
         if not menu:
             return jsonify({'error': 'Không tìm thấy thực đơn'}), 404
         
-        # Parse nội dung hiện tại
-        content_lines = menu.content.split('\n')
-        
-        # Xác định vị trí của từng bữa ăn
-        meal_headers = {
-            'breakfast': 'Bữa sáng',
-            'lunch': 'Bữa trưa', 
-            'dinner': 'Bữa tối'
-        }
-        
-        # Tìm và thay thế bữa ăn
-        new_lines = []
-        current_meal = None
-        skip_lines = False
-        
-        for line in content_lines:
-            # Kiểm tra xem có phải header của bữa ăn không
-            if any(header in line for header in meal_headers.values()):
-                # Xác định bữa ăn hiện tại
-                for meal, header in meal_headers.items():
-                    if header in line:
-                        current_meal = meal
-                        break
-                
-                # Nếu đây là bữa cần sửa
-                if current_meal == meal_type:
-                    new_lines.append(line)  # Giữ header
-                    new_lines.append(new_content)  # Thêm nội dung mới
-                    skip_lines = True
-                else:
-                    new_lines.append(line)
-                    skip_lines = False
-            elif line.strip().startswith('Tổng calo:'):
-                # Tính lại tổng calo
-                skip_lines = False
-                # Sẽ tính lại sau
-            elif skip_lines:
-                # Bỏ qua các dòng của bữa ăn cũ
-                continue
-            else:
-                new_lines.append(line)
-        
-        # Tính lại tổng calo
-        total_calories = 0
-        for line in new_lines:
-            if 'kcal' in line.lower() and '-' in line:
-                try:
-                    # Extract số calo từ dòng
-                    cal_str = line.split('-')[-1].strip()
-                    cal_str = cal_str.replace('kcal', '').strip()
-                    total_calories += int(cal_str)
-                except:
-                    pass
-        
-        # Thêm dòng tổng calo
-        new_lines.append(f"\nTổng calo: {total_calories} kcal")
+        # Thay món của bữa cần sửa (thực đơn cũ chưa có menu_meals sẽ được tách 1 lần)
+        meal = get_or_create_meal(menu, meal_type)
+        set_meal_items(meal, new_content, new_calories)
+        db.session.flush()
         
-        # Cập nhật database
-        menu.content = '\n'.join(new_lines)
-        menu.total_calories = total_calories
+        # Tính lại tổng calo bằng SQL, chỉ thay phần của bữa này trong nội dung hiển thị
+        menu.total_calories = menu_total_calories(menu.id)
+        menu.content = splice_meal(menu.content, meal, menu.total_calories)
+        index_menu(menu)
         
         db.session.commit()
+        record_menu(menu)
         
         return jsonify({
             'message': 'Cập nhật bữa ăn thành công',
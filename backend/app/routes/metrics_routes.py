@@ -0,0 +1,60 @@
+# backend/app/routes/metrics_routes.py
+from flask import Blueprint, Response, request, current_app
+from sqlalchemy import func
+from app import db
+from app.models.menu_job import MenuJob
+from app.services import metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+# Địa chỉ được phép đọc /metrics khi METRICS_ALLOW_REMOTE tắt
+LOCAL_ADDRESSES = ('127.0.0.1', '::1', 'localhost')
+
+
+def _flatten(stats, prefix=''):
+    """Làm phẳng dict thống kê lồng nhau, chỉ giữ giá trị số: {'a': {'b': 1}} -> {'a_b': 1}"""
+    values = {}
+    for key, value in stats.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            values.update(_flatten(value, f'{name}_'))
+        elif isinstance(value, bool):
+            values[name] = int(value)
+        elif isinstance(value, (int, float)):
+            values[name] = value
+    return values
+
+
+def _ai_service_stats():
+    from app.services.ai_service import get_pool_stats
+
+    stats = get_pool_stats()
+    breaker = stats.get('circuit_breaker', {})
+    stats['circuit_breaker']['open'] = breaker.get('state') == 'open'
+    return _flatten(stats)
+
+
+def _ai_cache_stats():
+    from app.services.ai_cache import get_cache
+
+    return _flatten(get_cache().stats())
+
+
+def _menu_job_counts():
+    rows = db.session.query(MenuJob.status, func.count(MenuJob.id)).group_by(MenuJob.status).all()
+    return {status: count for status, count in rows}
+
+
+metrics.gauge('ai_service_stat', 'Thống kê lời gọi AI của worker (pool, circuit breaker, rate limiter)',
+              _ai_service_stats, labels=('name',))
+metrics.gauge('ai_cache_stat', 'Thống kê cache câu trả lời AI của worker', _ai_cache_stats, labels=('name',))
+metrics.gauge('menu_jobs', 'Số job tạo thực đơn theo trạng thái', _menu_job_counts, labels=('status',))
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def export_metrics():
+    """Metrics định dạng Prometheus (chỉ cho truy cập từ máy local, trừ khi bật METRICS_ALLOW_REMOTE)"""
+    if not current_app.config.get('METRICS_ALLOW_REMOTE') and request.remote_addr not in LOCAL_ADDRESSES:
+        return Response('forbidden\n', status=403, mimetype='text/plain')
+
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
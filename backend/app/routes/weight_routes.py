@@ -2,11 +2,35 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta
+import hashlib
+import json
 from app import db
 from app.models.weight_log import WeightLog
+from app.services.ai_cache import get_cache
+from app.services.conditional import make_etag, watermark, not_modified, with_etag
 
 weight_bp = Blueprint('weight', __name__)
 
+# Các khoảng thời gian (ngày) được hỗ trợ bởi /evaluate
+EVALUATION_WINDOWS = (15, 30)
+
+def evaluation_cache_key(user_id, days):
+    """Key cache đánh giá AI theo (user, số ngày)"""
+    return get_cache().make_key({'kind': 'weight_evaluation', 'user_id': user_id, 'days': days})
+
+def weight_fingerprint(logs, goal):
+    """Dấu vân tay dữ liệu đánh giá: đổi khi bản ghi cân nặng trong khoảng hoặc mục tiêu thay đổi"""
+    digest = hashlib.sha256(goal.encode('utf-8'))
+    for log in logs:
+        digest.update(f"|{log.id}:{log.weight}:{log.recorded_at.isoformat()}".encode('utf-8'))
+    return digest.hexdigest()
+
+def invalidate_evaluations(user_id):
+    """Xóa đánh giá AI đã cache của user (gọi sau khi thêm/sửa/xóa cân nặng)"""
+    cache = get_cache()
+    for days in EVALUATION_WINDOWS:
+        cache.delete(evaluation_cache_key(user_id, days))
+
 @weight_bp.route('/log', methods=['POST'])
 @login_required
 def add_weight_log():
@@ -63,6 +87,7 @@ def add_weight_log():
             current_user.weight = weight
         
         db.session.commit()
+        invalidate_evaluations(current_user.id)
         
         # Tính BMI nếu có chiều cao
         bmi = None
@@ -88,11 +113,20 @@ def get_weight_history():
     
     # Lấy logs trong khoảng thời gian
     from_date = datetime.utcnow() - timedelta(days=days)
-    
-    logs = WeightLog.query.filter(
+    filters = (
         WeightLog.user_id == current_user.id,
         WeightLog.recorded_at >= from_date
-    ).order_by(WeightLog.recorded_at.asc()).all()
+    )
+    
+    # Bản ghi trong khoảng không đổi -> 304, không tải lại lịch sử
+    etag = make_etag(*watermark(WeightLog, *filters))
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    # Chỉ đọc 3 cột cần trả về; Row được jsonify thẳng (recorded_at -> chuỗi ISO)
+    logs = db.session.query(WeightLog.id, WeightLog.weight, WeightLog.recorded_at)\
+        .filter(*filters).order_by(WeightLog.recorded_at.asc()).all()
     
     # Lọc để chỉ lấy 1 bản ghi cuối cùng mỗi ngày (tránh trùng lặp)
     daily_logs = {}
@@ -103,18 +137,11 @@ def get_weight_history():
             daily_logs[date_key] = log
     
     # Format dữ liệu cho chart - frontend expects 'history' key
-    history = []
-    for date_key in sorted(daily_logs.keys()):
-        log = daily_logs[date_key]
-        history.append({
-            'id': log.id,
-            'weight': log.weight,
-            'recorded_at': log.recorded_at.isoformat()
-        })
+    history = [daily_logs[date_key] for date_key in sorted(daily_logs)]
     
-    return jsonify({
+    return with_etag({
         'history': history
-    }), 200
+    }, 200, etag)
 
 @weight_bp.route('/latest', methods=['GET'])
 @login_required
@@ -122,6 +149,15 @@ def get_latest_weight():
     """Lấy cân nặng theo ngày hoặc mới nhất"""
     date_str = request.args.get('date')
     
+    # Kết quả phụ thuộc bản ghi cân nặng, chiều cao/cân nặng trong hồ sơ và ngày hiện tại (mốc 30 ngày)
+    etag = make_etag(
+        current_user.height, current_user.weight, datetime.utcnow().date(),
+        *watermark(WeightLog, WeightLog.user_id == current_user.id)
+    )
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
     if date_str:
         # Lấy cân nặng của ngày cụ thể
         try:
@@ -133,12 +169,12 @@ def get_latest_weight():
             ).order_by(WeightLog.recorded_at.desc()).first()
             
             if not log:
-                return jsonify({
+                return with_etag({
                     'current_weight': None,
                     'bmi': None,
                     'change': 0,
                     'message': 'Chưa có dữ liệu cho ngày này'
-                }), 200
+                }, 200, etag)
             
             # Tính BMI
             bmi = None
@@ -157,12 +193,12 @@ def get_latest_weight():
             if old_log:
                 change = round(log.weight - old_log.weight, 1)
             
-            return jsonify({
+            return with_etag({
                 'current_weight': log.weight,
                 'bmi': bmi,
                 'change': change,
                 'recorded_at': log.recorded_at.isoformat()
-            }), 200
+            }, 200, etag)
         except ValueError:
             return jsonify({'error': 'Định dạng ngày không hợp lệ'}), 400
     
@@ -172,11 +208,11 @@ def get_latest_weight():
     ).order_by(WeightLog.recorded_at.desc()).first()
     
     if not latest:
-        return jsonify({
+        return with_etag({
             'current_weight': current_user.weight,
             'bmi': None,
             'change': 0
-        }), 200
+        }, 200, etag)
     
     # Tính BMI
     bmi = None
@@ -195,12 +231,12 @@ def get_latest_weight():
     if old_log:
         change = round(latest.weight - old_log.weight, 1)
     
-    return jsonify({
+    return with_etag({
         'current_weight': latest.weight,
         'bmi': bmi,
         'change': change,
         'recorded_at': latest.recorded_at.isoformat()
-    }), 200
+    }, 200, etag)
 
 @weight_bp.route('/evaluate', methods=['GET'])
 @login_required
@@ -209,7 +245,7 @@ def evaluate_progress():
     days = request.args.get('days', 30, type=int)
     
     # Chỉ cho phép 15 hoặc 30 ngày
-    if days not in [15, 30]:
+    if days not in EVALUATION_WINDOWS:
         days = 30
     
     # Lấy dữ liệu cân nặng trong khoảng thời gian
@@ -251,11 +287,39 @@ def evaluate_progress():
     min_weight = min(weights)
     volatility = max_weight - min_weight
     
-    # Tạo prompt cho AI
-    from app.services.ai_service import get_ai_response
+    summary = {
+        'start_weight': round(start_weight, 1),
+        'current_weight': round(end_weight, 1),
+        'change': round(weight_change, 1),
+        'change_percent': round(weight_change_percent, 1),
+        'avg_per_week': round(avg_change_per_week, 1),
+        'trend': 'down' if weight_change < -0.5 else 'up' if weight_change > 0.5 else 'stable'
+    }
     
     goal = current_user.dietary_preferences or "cải thiện sức khỏe"
     
+    # Dữ liệu cân nặng + mục tiêu không đổi -> dùng lại đánh giá đã cache, không gọi AI
+    cache = get_cache()
+    cache_key = evaluation_cache_key(current_user.id, days)
+    fingerprint = weight_fingerprint(logs, goal)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        cached = json.loads(cached)
+        if cached.get('fingerprint') == fingerprint:
+            return jsonify({
+                'success': True,
+                'evaluation': cached['evaluation'],
+                'days': days,
+                'data_points': len(logs),
+                'summary': summary,
+                'cached': True
+            }), 200
+    
+    # Tạo prompt cho AI
+    from app.services.ai_service import get_ai_response
+    from app.services.ai_errors import AIServiceError, AIRateLimitedError
+    from app.services import rate_limiter
+    
     # Phân tích xu hướng thật
     if "giảm cân" in goal.lower() or "giảm béo" in goal.lower():
         target_trend = "giảm"
@@ -319,23 +383,29 @@ def evaluate_progress():
 Hãy đánh giá TRUNG THỰC:"""
 
     try:
-        evaluation = get_ai_response(prompt)
+        with rate_limiter.user_scope(current_user.id):
+            evaluation = get_ai_response(prompt).strip()
+        
+        cache.set(cache_key, json.dumps({'fingerprint': fingerprint, 'evaluation': evaluation}, ensure_ascii=False))
         
         return jsonify({
             'success': True,
-            'evaluation': evaluation.strip(),
+            'evaluation': evaluation,
             'days': days,
             'data_points': len(logs),
-            'summary': {
-                'start_weight': round(start_weight, 1),
-                'current_weight': round(end_weight, 1),
-                'change': round(weight_change, 1),
-                'change_percent': round(weight_change_percent, 1),
-                'avg_per_week': round(avg_change_per_week, 1),
-                'trend': 'down' if weight_change < -0.5 else 'up' if weight_change > 0.5 else 'stable'
-            }
+            'summary': summary,
+            'cached': False
         }), 200
         
+    except AIServiceError as e:
+        response = jsonify({
+            'success': False,
+            'error': f'Không thể tạo đánh giá: {str(e)}'
+        })
+        response.status_code = e.status_code
+        if isinstance(e, AIRateLimitedError):
+            response.headers['Retry-After'] = str(e.retry_after)
+        return response
     except Exception as e:
         return jsonify({
             'success': False,
@@ -354,6 +424,7 @@ def delete_weight_log(log_id):
     try:
         db.session.delete(log)
         db.session.commit()
+        invalidate_evaluations(current_user.id)
         return jsonify({'message': 'Đã xóa thành công'}), 200
     except Exception as e:
         db.session.rollback()
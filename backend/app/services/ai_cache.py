@@ -0,0 +1,229 @@
+# backend/app/services/ai_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from app.services.ai_service import get_ai_response, stream_ai_response, get_model_id
+
+
+class AIResponseCache:
+    """
+    Cache câu trả lời AI 2 tầng:
+    - Tầng RAM: LRU + TTL, riêng cho mỗi worker
+    - Tầng đĩa: SQLite, dùng chung giữa các worker và còn sau khi khởi động lại
+    """
+
+    def __init__(self, max_entries=512, ttl_seconds=21600, disk_path=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_path = disk_path
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'bypassed': 0,
+            'stores': 0,
+            'evictions': 0,
+        }
+        if self.disk_path:
+            self._init_disk()
+
+    @staticmethod
+    def make_key(inputs: dict) -> str:
+        """Tạo key cache từ hash chuẩn hóa của các tham số tạo prompt"""
+        canonical = json.dumps(inputs, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    # --- TẦNG ĐĨA (SQLite) ---
+    def _connect(self):
+        return sqlite3.connect(self.disk_path, timeout=5)
+
+    def _init_disk(self):
+        directory = os.path.dirname(self.disk_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS ai_cache ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)'
+            )
+
+    def _disk_get(self, key, now):
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    'SELECT value, created_at FROM ai_cache WHERE key = ?', (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"⚠️ Lỗi đọc cache đĩa: {e}")
+            return None, None
+        if row and now - row[1] < self.ttl_seconds:
+            return row[0], row[1]
+        return None, None
+
+    def _disk_set(self, key, value, now):
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO ai_cache (key, value, created_at) VALUES (?, ?, ?)',
+                    (key, value, now)
+                )
+                # Dọn các bản ghi đã hết hạn
+                conn.execute('DELETE FROM ai_cache WHERE created_at < ?', (now - self.ttl_seconds,))
+        except sqlite3.Error as e:
+            print(f"⚠️ Lỗi ghi cache đĩa: {e}")
+
+    # --- API CHÍNH ---
+    def get(self, key):
+        """Lấy giá trị còn hạn trong cache (RAM trước, sau đó đĩa). Trả về None nếu miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if now - created_at < self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self._stats['hits'] += 1
+                    self._stats['memory_hits'] += 1
+                    return value
+                del self._memory[key]
+
+        if self.disk_path:
+            value, created_at = self._disk_get(key, now)
+            if value is not None:
+                with self._lock:
+                    self._stats['hits'] += 1
+                    self._stats['disk_hits'] += 1
+                    self._remember(key, value, created_at)
+                return value
+
+        with self._lock:
+            self._stats['misses'] += 1
+        return None
+
+    def set(self, key, value):
+        """Lưu giá trị vào cả 2 tầng cache"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            self._stats['stores'] += 1
+        if self.disk_path:
+            self._disk_set(key, value, now)
+
+    def delete(self, key):
+        """Xóa 1 key khỏi cả 2 tầng cache (dùng khi dữ liệu gốc thay đổi)"""
+        with self._lock:
+            self._memory.pop(key, None)
+        if self.disk_path:
+            try:
+                with self._connect() as conn:
+                    conn.execute('DELETE FROM ai_cache WHERE key = ?', (key,))
+            except sqlite3.Error as e:
+                print(f"⚠️ Lỗi xóa cache đĩa: {e}")
+
+    def _remember(self, key, value, created_at):
+        # Gọi khi đang giữ self._lock
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def record_bypass(self):
+        with self._lock:
+            self._stats['bypassed'] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'memory_entries': len(self._memory),
+                'hit_ratio': round(self._stats['hits'] / lookups, 4) if lookups else 0.0,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> AIResponseCache:
+    """Lấy cache dùng chung của process (khởi tạo theo cấu hình app ở lần gọi đầu)"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                config = current_app.config
+                _cache = AIResponseCache(
+                    max_entries=config.get('AI_CACHE_MAX_ENTRIES', 512),
+                    ttl_seconds=config.get('AI_CACHE_TTL', 21600),
+                    disk_path=config.get('AI_CACHE_PATH') if config.get('AI_CACHE_DISK_ENABLED', True) else None
+                )
+    return _cache
+
+
+def get_cached_ai_response(inputs: dict, prompt: str, force: bool = False):
+    """
+    Gọi AI thông qua cache.
+
+    Args:
+        inputs: Các tham số tạo prompt (hồ sơ người dùng, ngày, ...) dùng làm key
+        prompt: Prompt gửi tới AI khi cache miss
+        force: True để bỏ qua cache và luôn gọi AI (kết quả mới vẫn được lưu lại)
+
+    Returns:
+        tuple: (câu trả lời AI, True nếu lấy từ cache)
+
+    Raises:
+        AIServiceError: Lỗi khi gọi AI (lỗi không bao giờ được lưu vào cache)
+    """
+    cache = get_cache()
+    key = cache.make_key({**inputs, 'model': get_model_id()})
+
+    if force:
+        cache.record_bypass()
+    else:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached, True
+
+    reply = get_ai_response(prompt)
+    cache.set(key, reply)
+    return reply, False
+
+
+def stream_cached_ai_response(inputs: dict, prompt: str, force: bool = False):
+    """
+    Giống get_cached_ai_response nhưng trả về từng đoạn text (streaming).
+    Cache hit -> trả nguyên câu trả lời trong 1 đoạn; cache miss -> stream từ AI
+    và lưu câu trả lời đầy đủ vào cache khi kết thúc.
+
+    Yields:
+        tuple: (đoạn text, True nếu lấy từ cache)
+    """
+    cache = get_cache()
+    key = cache.make_key({**inputs, 'model': get_model_id()})
+
+    if force:
+        cache.record_bypass()
+    else:
+        cached = cache.get(key)
+        if cached is not None:
+            yield cached, True
+            return
+
+    chunks = []
+    for text in stream_ai_response(prompt):
+        chunks.append(text)
+        yield text, False
+
+    reply = ''.join(chunks)
+    if reply:
+        cache.set(key, reply)
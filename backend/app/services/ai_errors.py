@@ -0,0 +1,40 @@
+# backend/app/services/ai_errors.py
+
+# --- LỖI CÓ KIỂU ---
+# Caller bắt các lỗi này và KHÔNG lưu gì vào DB khi gặp lỗi
+class AIServiceError(Exception):
+    """Lỗi khi gọi AI"""
+    status_code = 502
+
+
+class AITimeoutError(AIServiceError):
+    """Hết thời gian chờ (1 lần gọi hoặc tổng thời gian)"""
+    status_code = 504
+
+
+class AITransientError(AIServiceError):
+    """Lỗi tạm thời từ backend AI (429, 5xx, mất kết nối) - thử lại được"""
+    status_code = 502
+
+
+class AIUnavailableError(AIServiceError):
+    """Circuit breaker đang mở - AI tạm thời không khả dụng"""
+    status_code = 503
+
+
+class AIRateLimitedError(AIServiceError):
+    """Vượt giới hạn tần suất gọi AI (toàn cục hoặc theo user)"""
+    status_code = 429
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AIEmptyResponseError(AIServiceError):
+    """AI trả về nội dung rỗng hoặc bị chặn"""
+    status_code = 502
+
+
+# Lỗi tạm thời -> thử lại được
+TRANSIENT_ERRORS = (AITransientError, AITimeoutError)
@@ -0,0 +1,386 @@
+# backend/app/services/ai_providers.py
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+from app.services.ai_errors import (
+    AIServiceError, AITimeoutError, AITransientError, AIEmptyResponseError
+)
+
+# Các backend AI mà ai_service có thể dùng (chọn qua Config.AI_PROVIDER):
+# - 'gemini': gọi Google Gemini qua REST (cần GEMINI_API_KEY + mạng)
+# - 'local': sinh thực đơn tiếng Việt tất định, không cần mạng (dev/test/load-test)
+
+
+class AIProvider:
+    """Interface chung của các backend AI"""
+
+    name = 'base'
+    model_name = ''
+
+    def generate(self, prompt: str, timeout: float) -> str:
+        """Gửi prompt và trả về toàn bộ câu trả lời (ném lỗi AIServiceError khi lỗi)"""
+        raise NotImplementedError
+
+    def stream(self, prompt: str, timeout: float):
+        """Trả về câu trả lời theo từng đoạn. Mặc định: 1 đoạn duy nhất"""
+        yield self.generate(prompt, timeout)
+
+    def warm_up(self):
+        """Khởi tạo trước tài nguyên (client, kết nối, ...) cho worker hiện tại"""
+
+    def stats(self) -> dict:
+        return {}
+
+
+# ============================================================
+# GEMINI
+# ============================================================
+
+class GeminiProvider(AIProvider):
+    """
+    Gọi Gemini qua REST. Mỗi worker (pid) giữ 1 model + 1 HTTP session keep-alive,
+    tạo 1 lần và dùng lại cho mọi request. Sau khi fork (gunicorn) pid đổi nên
+    registry tự tạo lại, tránh dùng chung socket giữa các process.
+    """
+
+    name = 'gemini'
+
+    def __init__(self, api_key, model_name='models/gemma-3-1b-it', pool_size=10):
+        if not api_key:
+            raise AIServiceError("❌ Lỗi: Không tìm thấy GEMINI_API_KEY trong file .env")
+
+        # Import ở đây để app vẫn import được khi không dùng Gemini / chưa cài SDK
+        import google.generativeai as genai
+        from google.api_core import exceptions as google_exceptions
+        import requests
+
+        self._genai = genai
+        self._requests = requests
+        self._transient_errors = (
+            google_exceptions.TooManyRequests,
+            google_exceptions.InternalServerError,
+            google_exceptions.BadGateway,
+            google_exceptions.ServiceUnavailable,
+            google_exceptions.GatewayTimeout,
+            requests.exceptions.ConnectionError,
+        )
+
+        # Cấu hình Gemini API
+        genai.configure(api_key=api_key, transport='rest')
+
+        self.model_name = model_name
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._pid = None
+        self._model = None
+        self._adapter = None
+        self._stats = {'setups': 0, 'setup_seconds': 0.0, 'calls': 0, 'reused_calls': 0, 'in_flight': 0}
+
+    def _mount_http_pool(self, client):
+        """Gắn HTTPAdapter có pool keep-alive vào session REST của client Gemini"""
+        from requests.adapters import HTTPAdapter
+
+        transport = getattr(client, '_transport', None)
+        session = getattr(transport, '_session', None)
+        if session is None:
+            return None
+
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.pool_size,
+            max_retries=0
+        )
+        session.mount('https://', adapter)
+        return adapter
+
+    def get_model(self):
+        """Lấy model Gemini dùng chung của process hiện tại (thread-safe)"""
+        pid = os.getpid()
+        if self._pid == pid and self._model is not None:
+            return self._model
+
+        with self._lock:
+            if self._pid != pid or self._model is None:
+                from google.generativeai import client as genai_client
+
+                started = time.perf_counter()
+                # Tạo model + client riêng (không dùng client mặc định toàn cục của SDK)
+                model = self._genai.GenerativeModel(self.model_name)
+                client = genai_client._client_manager.make_client('generative')
+                self._adapter = self._mount_http_pool(client)
+                model._client = client
+                self._model = model
+                self._pid = pid
+                self._stats['setup_seconds'] += time.perf_counter() - started
+                self._stats['setups'] += 1
+            return self._model
+
+    def warm_up(self):
+        self.get_model()
+
+    def _begin_call(self):
+        """Lấy model và ghi nhận 1 lời gọi (dùng lại client đã tạo hay phải tạo mới)"""
+        setups_before = self._stats['setups']
+        model = self.get_model()
+        with self._lock:
+            self._stats['calls'] += 1
+            if self._stats['setups'] == setups_before:
+                self._stats['reused_calls'] += 1
+            self._stats['in_flight'] += 1
+        return model
+
+    def _end_call(self):
+        with self._lock:
+            self._stats['in_flight'] -= 1
+
+    def _translate_error(self, e, timeout):
+        if isinstance(e, self._requests.exceptions.Timeout):
+            return AITimeoutError(f"Lỗi khi gọi AI: quá {timeout:.0f}s không phản hồi")
+        if isinstance(e, self._transient_errors):
+            return AITransientError(f"Lỗi khi gọi AI: {str(e)}")
+        return AIServiceError(f"Lỗi khi gọi AI: {str(e)}")
+
+    def generate(self, prompt, timeout):
+        model = self._begin_call()
+        try:
+            response = model.generate_content(prompt, request_options={'timeout': timeout})
+        except Exception as e:
+            raise self._translate_error(e, timeout) from e
+        finally:
+            self._end_call()
+
+        try:
+            return response.text
+        except ValueError as e:
+            raise AIEmptyResponseError(f"Lỗi khi gọi AI: câu trả lời bị chặn hoặc rỗng ({e})") from e
+
+    def stream(self, prompt, timeout):
+        model = self._begin_call()
+        try:
+            response = model.generate_content(prompt, stream=True, request_options={'timeout': timeout})
+            for chunk in response:
+                try:
+                    text = chunk.text
+                except ValueError:
+                    # Chunk không có nội dung text (vd: chỉ có metadata)
+                    continue
+                if text:
+                    yield text
+        except AIServiceError:
+            raise
+        except Exception as e:
+            raise self._translate_error(e, timeout) from e
+        finally:
+            self._end_call()
+
+    def _open_connections(self):
+        """Đếm số kết nối keep-alive đang mở (rảnh + đang dùng) trong pool của worker hiện tại"""
+        adapter = self._adapter if self._pid == os.getpid() else None
+        if adapter is None:
+            return 0
+
+        idle = 0
+        for key in list(adapter.poolmanager.pools.keys()):
+            pool = adapter.poolmanager.pools.get(key)
+            if pool is None or pool.pool is None:
+                continue
+            idle += sum(1 for conn in list(pool.pool.queue) if conn is not None and conn.sock is not None)
+        return idle + self._stats['in_flight']
+
+    def stats(self):
+        with self._lock:
+            calls = self._stats['calls']
+            setups = self._stats['setups']
+            reused = self._stats['reused_calls']
+            avg_setup = self._stats['setup_seconds'] / setups if setups else 0.0
+            return {
+                'pool_size': self.pool_size,
+                'open_connections': self._open_connections(),
+                'setups': setups,
+                'setup_seconds': self._stats['setup_seconds'],
+                'reuse_ratio': round(reused / calls, 4) if calls else 0.0,
+                'setup_time_saved_ms': round(reused * avg_setup * 1000, 2),
+            }
+
+
+# ============================================================
+# LOCAL (OFFLINE, TẤT ĐỊNH)
+# ============================================================
+
+# (tên món, khẩu phần chuẩn, đơn vị, kcal của khẩu phần chuẩn)
+LOCAL_DISHES = {
+    'breakfast': [
+        ('Phở bò', 400, 'g', 450), ('Bún bò Huế', 450, 'g', 480), ('Bánh mì trứng ốp la', 180, 'g', 380),
+        ('Xôi gà', 200, 'g', 420), ('Cháo yến mạch sữa chua', 250, 'g', 280), ('Bánh cuốn chả lụa', 250, 'g', 350),
+        ('Hủ tiếu Nam Vang', 400, 'g', 430), ('Bún riêu cua', 400, 'g', 400), ('Cháo gà hành gừng', 350, 'g', 300),
+        ('Bánh bao nhân thịt', 150, 'g', 330), ('Khoai lang luộc', 200, 'g', 170), ('Trứng gà luộc', 100, 'g', 155),
+        ('Sữa đậu nành không đường', 250, 'ml', 110), ('Sữa chua không đường', 100, 'g', 60), ('Chuối', 120, 'g', 105),
+    ],
+    'lunch': [
+        ('Cơm gạo lứt', 200, 'g', 220), ('Cơm trắng', 200, 'g', 260), ('Cá kho tộ', 150, 'g', 250),
+        ('Thịt bò xào bông cải', 200, 'g', 280), ('Gà luộc lá chanh', 150, 'g', 240), ('Đậu phụ sốt cà chua', 200, 'g', 190),
+        ('Thịt heo luộc', 150, 'g', 270), ('Tôm rim mặn ngọt', 150, 'g', 210), ('Canh chua cá lóc', 350, 'ml', 180),
+        ('Canh bí đỏ thịt bằm', 300, 'ml', 150), ('Rau muống xào tỏi', 150, 'g', 90), ('Cải ngọt luộc', 150, 'g', 40),
+        ('Bún chả Hà Nội', 350, 'g', 520), ('Cơm tấm sườn nướng', 350, 'g', 600), ('Gỏi cuốn tôm thịt', 200, 'g', 230),
+    ],
+    'dinner': [
+        ('Cá hấp gừng', 200, 'g', 220), ('Ức gà nướng mật ong', 150, 'g', 250), ('Đậu phụ non hấp nấm', 200, 'g', 160),
+        ('Bò lúc lắc', 180, 'g', 330), ('Mực xào rau cần', 200, 'g', 200), ('Trứng chiên cà chua', 150, 'g', 220),
+        ('Canh rau ngót thịt bằm', 300, 'ml', 120), ('Canh cải thảo nấu tôm', 300, 'ml', 110), ('Salad rau trộn dầu giấm', 150, 'g', 90),
+        ('Cơm gạo lứt', 150, 'g', 165), ('Bún gạo lứt trộn', 250, 'g', 300), ('Miến gà', 400, 'g', 380),
+        ('Su su xào tỏi', 150, 'g', 70), ('Đậu bắp luộc', 150, 'g', 50), ('Cá thu sốt cà', 180, 'g', 290),
+    ],
+}
+
+# Tỉ lệ calo từng bữa
+LOCAL_MEAL_SPLIT = (
+    ('breakfast', 'Bữa sáng 🌅', 0.25),
+    ('lunch', 'Bữa trưa 🌞', 0.40),
+    ('dinner', 'Bữa tối 🌙', 0.35),
+)
+
+_TARGET_CAL_RE = re.compile(r'Calo khuyến nghị:\s*(\d+)')
+_ALLERGY_RE = re.compile(r'Dị ứng[^:\n]*:\s*([^\n]*)')
+_BATCH_DAY_RE = re.compile(r'^- NGÀY (\d+): (\d{2}/\d{2}/\d{4})', re.MULTILINE)
+# Đoạn "món đã dùng" trong prompt (menu_routes.build_used_dishes): dòng tiêu đề rồi 1 dòng thụt lề "  a, b, c"
+USED_DISHES_HEADER = '🚫 TUYỆT ĐỐI KHÔNG LẶP LẠI CÁC MÓN SAU'
+_USED_DISHES_RE = re.compile(rf'^{re.escape(USED_DISHES_HEADER)}[^\n]*\n[ \t]+(.+)$', re.MULTILINE)
+
+
+class LocalMenuProvider(AIProvider):
+    """
+    Backend offline: sinh thực đơn tiếng Việt tất định (cùng prompt -> cùng câu trả lời)
+    đúng format mà extract_total_calories đọc được, có độ trễ giả lập để load-test.
+    """
+
+    name = 'local'
+    model_name = 'local-menu-v1'
+
+    def __init__(self, latency_ms=0, jitter_ms=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self._calls = 0
+        self._lock = threading.Lock()
+
+    def _simulate_latency(self, rng, timeout):
+        delay = (self.latency_ms + rng.uniform(0, self.jitter_ms)) / 1000.0
+        if delay > timeout:
+            time.sleep(timeout)
+            raise AITimeoutError(f"Lỗi khi gọi AI: quá {timeout:.0f}s không phản hồi")
+        time.sleep(delay)
+
+    @staticmethod
+    def _rng(prompt):
+        seed = int(hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16], 16)
+        return random.Random(seed)
+
+    def generate(self, prompt, timeout):
+        rng = self._rng(prompt)
+        with self._lock:
+            self._calls += 1
+        self._simulate_latency(rng, timeout)
+
+        if 'Đánh giá' in prompt or 'ĐÁNH GIÁ' in prompt:
+            return self._evaluation(prompt, rng)
+
+        batch_days = _BATCH_DAY_RE.findall(prompt)
+        if batch_days:
+            used = set()
+            parts = []
+            for number, day_str in batch_days:
+                menu = self._menu(prompt, rng, used)
+                parts.append(f"===== NGÀY {number} ({day_str}) =====\n{menu}")
+            return '\n\n'.join(parts)
+
+        return self._menu(prompt, rng, set())
+
+    def stream(self, prompt, timeout):
+        text = self.generate(prompt, timeout)
+        for line in text.splitlines(keepends=True):
+            yield line
+
+    def _menu(self, prompt, rng, used):
+        """Sinh thực đơn 3 bữa, tránh món dị ứng/món đã dùng, khớp calo khuyến nghị"""
+        target_match = _TARGET_CAL_RE.search(prompt)
+        target_cal = int(target_match.group(1)) if target_match else 1800
+
+        allergy_match = _ALLERGY_RE.search(prompt)
+        allergies = allergy_match.group(1).lower() if allergy_match else ''
+        allergy_words = [w.strip() for w in re.split(r'[,;/]', allergies) if w.strip() and w.strip() != 'không có']
+
+        for line in _USED_DISHES_RE.findall(prompt):
+            used.update(name.strip() for name in line.split(','))
+
+        lines = []
+        total = 0
+        for meal_key, header, ratio in LOCAL_MEAL_SPLIT:
+            pool = [
+                dish for dish in LOCAL_DISHES[meal_key]
+                if not any(word in dish[0].lower() for word in allergy_words)
+            ]
+            if len(pool) < 2:
+                pool = list(LOCAL_DISHES[meal_key])
+            candidates = [dish for dish in pool if dish[0] not in used]
+            if len(candidates) < 2:
+                # Gộp nhiều ngày đã dùng gần hết món của bữa -> lấy lại từ cả danh mục
+                candidates = pool
+            picks = rng.sample(candidates, 2)
+            used.update(dish[0] for dish in picks)
+
+            meal_target = target_cal * ratio
+            factor = meal_target / sum(dish[3] for dish in picks)
+            lines.append(header)
+            for name, portion, unit, kcal in picks:
+                grams = int(round(portion * factor / 10.0)) * 10
+                cal = int(round(kcal * factor))
+                total += cal
+                lines.append(f"- {name} ({grams}{unit}) - {cal} kcal")
+            lines.append('')
+
+        lines.append(f"Tổng calo: {total} kcal")
+        return '\n'.join(lines)
+
+    def _evaluation(self, prompt, rng):
+        status = re.search(r'Kết quả:\s*([^\n]*)', prompt)
+        status_text = status.group(1).strip() if status else 'ỔN'
+        if status_text.startswith('KHÔNG ĐẠT'):
+            opener = '⚠️ Kết quả đang đi ngược mục tiêu của bạn'
+        elif status_text.startswith(('TỐT', 'XUẤT SẮC')):
+            opener = '🎉 Bạn đang tiến bộ đúng hướng'
+        else:
+            opener = '💪 Bạn đang tiến bộ nhưng còn chậm'
+        advice = rng.choice([
+            'Hãy giữ khẩu phần ổn định và ưu tiên rau xanh, đạm nạc trong mỗi bữa.',
+            'Hãy ghi lại bữa ăn mỗi ngày và tăng thêm 20 phút đi bộ nhanh.',
+            'Hãy hạn chế đồ ngọt, nước có ga và ăn tối trước 20 giờ.',
+        ])
+        return (
+            f"{opener} ({status_text}). "
+            f"Nguyên nhân chính thường nằm ở lượng calo nạp vào và mức độ vận động hằng ngày. "
+            f"{advice} "
+            f"Cứ kiên trì từng ngày, bạn sẽ thấy thay đổi rõ rệt!"
+        )
+
+    def stats(self):
+        with self._lock:
+            return {'generated': self._calls, 'latency_ms': self.latency_ms, 'jitter_ms': self.jitter_ms}
+
+
+def create_provider(config) -> AIProvider:
+    """Tạo backend AI theo cấu hình (dict-like: app.config hoặc thuộc tính của Config)"""
+    name = (config.get('AI_PROVIDER') or 'gemini').lower()
+    if name == 'local':
+        return LocalMenuProvider(
+            latency_ms=config.get('AI_LOCAL_LATENCY_MS', 0),
+            jitter_ms=config.get('AI_LOCAL_LATENCY_JITTER_MS', 0)
+        )
+    if name == 'gemini':
+        return GeminiProvider(
+            api_key=config.get('GEMINI_API_KEY'),
+            model_name=config.get('GEMINI_MODEL', 'models/gemma-3-1b-it'),
+            pool_size=config.get('AI_HTTP_POOL_SIZE', 10)
+        )
+    raise AIServiceError(f"AI_PROVIDER không hợp lệ: {name}")
@@ -1,34 +1,379 @@
 # backend/app/services/ai_service.py
 import os
-import google.generativeai as genai
-from dotenv import load_dotenv
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from flask import current_app, has_app_context
+from config import Config
+from app.services.ai_errors import (
+    AIServiceError, AITimeoutError, AIUnavailableError, AIEmptyResponseError,
+    TRANSIENT_ERRORS
+)
+from app.services.ai_providers import create_provider
+from app.services import rate_limiter, metrics
 
-# Load API Key từ .env
-load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
+# Backend AI (gemini/local) được chọn qua Config.AI_PROVIDER, xem ai_providers.py.
+# Module này chỉ lo phần chung: timeout, thử lại, hedged request, circuit breaker, thống kê.
 
-if not api_key:
-    raise ValueError("❌ Lỗi: Không tìm thấy GEMINI_API_KEY trong file .env")
+# Thời gian chờ tối đa cho 1 lần gọi và tổng thời gian cho cả lời gọi (gồm các lần thử lại)
+AI_CALL_TIMEOUT = float(os.getenv('AI_CALL_TIMEOUT', '30'))
+AI_TOTAL_BUDGET = float(os.getenv('AI_TOTAL_BUDGET', '60'))
 
-# Cấu hình Gemini API
-genai.configure(api_key=api_key, transport='rest')
+# Thử lại khi gặp lỗi tạm thời (429, 5xx, timeout, mất kết nối) với backoff lũy thừa + jitter
+AI_MAX_RETRIES = int(os.getenv('AI_MAX_RETRIES', '2'))
+AI_RETRY_BASE_DELAY = float(os.getenv('AI_RETRY_BASE_DELAY', '0.5'))
+AI_RETRY_MAX_DELAY = float(os.getenv('AI_RETRY_MAX_DELAY', '8'))
 
-# Khởi tạo model
-MODEL_NAME = 'models/gemma-3-1b-it'
+# Hedged request: nếu lần gọi chậm hơn p95 thì gửi thêm 1 bản sao, lấy kết quả về trước
+AI_HEDGE_ENABLED = os.getenv('AI_HEDGE_ENABLED', '0') == '1'
+AI_HEDGE_MIN_DELAY = float(os.getenv('AI_HEDGE_MIN_DELAY', '2'))
 
-def get_ai_response(prompt: str) -> str:
+# Circuit breaker: sau N lần lỗi liên tiếp thì từ chối ngay trong một khoảng thời gian
+AI_BREAKER_THRESHOLD = int(os.getenv('AI_BREAKER_THRESHOLD', '5'))
+AI_BREAKER_RESET_SECONDS = float(os.getenv('AI_BREAKER_RESET_SECONDS', '30'))
+
+# --- BACKEND AI DÙNG CHUNG TRONG PROCESS ---
+_registry_lock = threading.Lock()
+_providers = {}
+_stats = {
+    'calls': 0,
+    'in_flight': 0,
+    'retries': 0,
+    'hedged_calls': 0,
+}
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker đơn giản (thread-safe):
+    - closed: cho gọi bình thường, đếm lỗi liên tiếp
+    - open: từ chối ngay cho đến khi hết reset_seconds
+    - half_open: cho 1 lời gọi thử, thành công -> closed, lỗi -> open lại
+    """
+
+    def __init__(self, failure_threshold, reset_seconds):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = 'half_open'
+                self._probe_in_flight = False
+            if self.state == 'half_open' and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+    def snapshot(self):
+        with self._lock:
+            return {'state': self.state, 'consecutive_failures': self.failures}
+
+
+_breaker = CircuitBreaker(AI_BREAKER_THRESHOLD, AI_BREAKER_RESET_SECONDS)
+
+# Độ trễ các lần gọi thành công gần đây, dùng để tính p95 cho hedged request
+_latencies = deque(maxlen=200)
+_hedge_executor = ThreadPoolExecutor(max_workers=Config.AI_HTTP_POOL_SIZE, thread_name_prefix='ai-hedge')
+
+
+def _hedge_delay():
+    """Ngưỡng gửi bản sao: p95 độ trễ gần đây (tối thiểu AI_HEDGE_MIN_DELAY)"""
+    with _registry_lock:
+        samples = sorted(_latencies)
+    if len(samples) < 20:
+        return max(AI_HEDGE_MIN_DELAY, AI_CALL_TIMEOUT / 2)
+    return max(AI_HEDGE_MIN_DELAY, samples[int(len(samples) * 0.95) - 1])
+
+
+def _provider_config():
+    """Cấu hình backend AI: app.config nếu đang trong app context, ngược lại lấy từ Config"""
+    if has_app_context():
+        return current_app.config
+    return {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+
+
+def get_provider():
+    """
+    Lấy backend AI dùng chung của process hiện tại (tạo ở lần gọi đầu).
+
+    Returns:
+        AIProvider: Backend theo cấu hình AI_PROVIDER
+
+    Raises:
+        AIServiceError: Cấu hình không hợp lệ (vd: thiếu GEMINI_API_KEY)
+    """
+    config = _provider_config()
+    name = (config.get('AI_PROVIDER') or 'gemini').lower()
+    provider = _providers.get(name)
+    if provider is not None:
+        return provider
+
+    with _registry_lock:
+        provider = _providers.get(name)
+        if provider is None:
+            provider = create_provider(config)
+            _providers[name] = provider
+        return provider
+
+
+def get_model_id() -> str:
+    """Định danh backend + model đang dùng (vd: 'gemini:models/gemma-3-1b-it'), dùng cho key cache"""
+    provider = get_provider()
+    return f"{provider.name}:{provider.model_name}"
+
+
+def warm_up():
+    """Khởi tạo trước backend AI cho worker hiện tại (gọi 1 lần khi tạo app)"""
+    try:
+        get_provider().warm_up()
+    except Exception as e:
+        print(f"⚠️ Không thể khởi tạo trước AI client: {e}")
+
+
+def get_pool_stats() -> dict:
+    """
+    Thống kê lời gọi AI của worker hiện tại.
+
+    Returns:
+        dict: Backend đang dùng, số lời gọi, số lần thử lại, trạng thái circuit breaker
+              và thống kê riêng của backend (pool kết nối, thời gian setup, ...)
+    """
+    provider = get_provider()
+    provider_stats = provider.stats()
+    with _registry_lock:
+        return {
+            'pid': os.getpid(),
+            'provider': provider.name,
+            'model': provider.model_name,
+            'in_flight': _stats['in_flight'],
+            'calls': _stats['calls'],
+            'retries': _stats['retries'],
+            'hedged_calls': _stats['hedged_calls'],
+            'circuit_breaker': _breaker.snapshot(),
+            'rate_limiter': rate_limiter.get_limiter().stats(),
+            **provider_stats,
+        }
+
+
+def _start_call():
+    """Lấy backend dùng chung và ghi nhận 1 lời gọi AI bắt đầu"""
+    provider = get_provider()
+    with _registry_lock:
+        _stats['calls'] += 1
+        _stats['in_flight'] += 1
+    return provider
+
+
+def _end_call():
+    with _registry_lock:
+        _stats['in_flight'] -= 1
+
+
+def _single_attempt(prompt, timeout):
+    """1 lần gọi backend AI với timeout, trả về text hoặc ném lỗi có kiểu"""
+    provider = _start_call()
+    started = time.perf_counter()
+    try:
+        text = provider.generate(prompt, timeout)
+    finally:
+        _end_call()
+
+    if not text or not text.strip():
+        raise AIEmptyResponseError("Lỗi khi gọi AI: câu trả lời rỗng")
+
+    with _registry_lock:
+        _latencies.append(time.perf_counter() - started)
+    return text
+
+
+def _hedged_attempt(prompt, timeout):
+    """Gửi lần gọi chính, nếu chậm hơn ngưỡng p95 thì gửi thêm 1 bản sao và lấy kết quả về trước"""
+    started = time.monotonic()
+    futures = [_hedge_executor.submit(_single_attempt, prompt, timeout)]
+    done, _ = wait(futures, timeout=min(_hedge_delay(), timeout))
+    if not done:
+        with _registry_lock:
+            _stats['hedged_calls'] += 1
+        futures.append(_hedge_executor.submit(_single_attempt, prompt, timeout))
+
+    last_error = None
+    pending = set(futures)
+    while pending:
+        remaining = timeout - (time.monotonic() - started)
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                return future.result()
+            except Exception as e:
+                last_error = e
+    if last_error is not None:
+        raise last_error
+    raise AITimeoutError(f"Lỗi khi gọi AI: quá {timeout:.0f}s không phản hồi")
+
+
+def get_ai_response(prompt: str, timeout: float = None, budget: float = None) -> str:
     """
-    Gửi câu hỏi đến Gemini AI và nhận câu trả lời
-    
+    Gửi câu hỏi đến AI và nhận câu trả lời
+
+    Có timeout cho từng lần gọi + tổng thời gian, thử lại lỗi tạm thời với backoff
+    lũy thừa có jitter, hedged request (tùy chọn) và circuit breaker.
+
     Args:
         prompt: Câu hỏi hoặc yêu cầu gửi tới AI
-        
+        timeout: Thời gian chờ tối đa cho 1 lần gọi (giây), mặc định AI_CALL_TIMEOUT
+        budget: Tổng thời gian tối đa kể cả thử lại (giây), mặc định AI_TOTAL_BUDGET
+
     Returns:
         str: Câu trả lời từ AI
+
+    Raises:
+        AIRateLimitedError: Vượt giới hạn tần suất gọi AI (có retry_after)
+        AIUnavailableError: Circuit breaker đang mở
+        AITimeoutError: Hết thời gian chờ
+        AIServiceError: Các lỗi khác khi gọi AI
+    """
+    started = time.perf_counter()
+    outcome = 'error'
+    text = None
+    try:
+        text = _call_with_retries(prompt, timeout, budget)
+        outcome = 'ok'
+        return text
+    except AIServiceError as e:
+        outcome = type(e).__name__
+        raise
+    finally:
+        metrics.observe_ai_call(
+            _provider_label(), 'blocking', outcome, time.perf_counter() - started,
+            len(prompt), len(text) if text else None
+        )
+
+
+def _provider_label():
+    try:
+        return get_provider().name
+    except AIServiceError:
+        return 'unconfigured'
+
+
+def _call_with_retries(prompt, timeout, budget):
+    """Thân của get_ai_response: rate limit -> circuit breaker -> gọi + thử lại"""
+    # Chờ lượt theo token bucket trước khi tính thời gian chờ của lời gọi
+    rate_limiter.acquire()
+
+    timeout = timeout or AI_CALL_TIMEOUT
+    deadline = time.monotonic() + (budget or AI_TOTAL_BUDGET)
+
+    if not _breaker.allow():
+        raise AIUnavailableError("Lỗi khi gọi AI: dịch vụ AI tạm thời không khả dụng, vui lòng thử lại sau")
+
+    attempt = 0
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            _breaker.record_failure()
+            raise AITimeoutError("Lỗi khi gọi AI: hết tổng thời gian chờ")
+
+        try:
+            if AI_HEDGE_ENABLED:
+                text = _hedged_attempt(prompt, min(timeout, remaining))
+            else:
+                text = _single_attempt(prompt, min(timeout, remaining))
+            _breaker.record_success()
+            return text
+        except AIEmptyResponseError:
+            # Upstream vẫn hoạt động, chỉ là câu trả lời không dùng được
+            _breaker.record_success()
+            raise
+        except TRANSIENT_ERRORS as e:
+            attempt += 1
+            delay = random.uniform(0, min(AI_RETRY_MAX_DELAY, AI_RETRY_BASE_DELAY * (2 ** attempt)))
+            if attempt > AI_MAX_RETRIES or time.monotonic() + delay >= deadline:
+                _breaker.record_failure()
+                if isinstance(e, AIServiceError):
+                    raise
+                raise AIServiceError(f"Lỗi khi gọi AI: {str(e)}") from e
+            with _registry_lock:
+                _stats['retries'] += 1
+            time.sleep(delay)
+        except AIServiceError:
+            _breaker.record_failure()
+            raise
+        except Exception as e:
+            # Lỗi không tạm thời (sai key, sai request, ...) -> không thử lại
+            _breaker.record_failure()
+            raise AIServiceError(f"Lỗi khi gọi AI: {str(e)}") from e
+
+
+def stream_ai_response(prompt: str):
     """
+    Gửi câu hỏi đến AI và nhận câu trả lời theo từng đoạn (streaming)
+
+    Args:
+        prompt: Câu hỏi hoặc yêu cầu gửi tới AI
+
+    Yields:
+        str: Từng đoạn text ngay khi AI sinh ra
+
+    Raises:
+        AIServiceError: Lỗi khi gọi AI (không trả về chuỗi lỗi để tránh lưu nhầm vào DB)
+    """
+    rate_limiter.acquire()
+
+    if not _breaker.allow():
+        raise AIUnavailableError("Lỗi khi gọi AI: dịch vụ AI tạm thời không khả dụng, vui lòng thử lại sau")
+
+    provider = _start_call()
+    started = False
+    call_started = time.perf_counter()
+    outcome = 'error'
+    response_chars = 0
     try:
-        model = genai.GenerativeModel(MODEL_NAME)
-        response = model.generate_content(prompt)
-        return response.text
+        for text in provider.stream(prompt, AI_CALL_TIMEOUT):
+            if not started:
+                started = True
+                _breaker.record_success()
+            response_chars += len(text)
+            yield text
+        outcome = 'ok'
+    except AIServiceError as e:
+        outcome = type(e).__name__
+        if not started:
+            _breaker.record_failure()
+        raise
     except Exception as e:
-        return f"❌ Lỗi khi gọi AI: {str(e)}"
+        if not started:
+            _breaker.record_failure()
+        raise AIServiceError(f"Lỗi khi gọi AI: {str(e)}") from e
+    finally:
+        _end_call()
+        metrics.observe_ai_call(
+            provider.name, 'stream', outcome, time.perf_counter() - call_started,
+            len(prompt), response_chars
+        )
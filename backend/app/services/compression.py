@@ -0,0 +1,96 @@
+# backend/app/services/compression.py
+import gzip
+import threading
+from collections import OrderedDict
+from flask import request
+
+try:
+    import brotli  # tùy chọn: pip install brotli
+except ImportError:
+    brotli = None
+
+# Nén response (brotli nếu có thư viện và trình duyệt hỗ trợ, không thì gzip) cho JSON/text/static
+# lớn hơn COMPRESS_MIN_SIZE. Response streaming (SSE, ndjson) được gửi nguyên để không giữ lại dữ liệu.
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/javascript', 'text/html', 'text/css',
+    'text/plain', 'text/javascript', 'image/svg+xml',
+}
+# File tĩnh nén sẵn: (đường dẫn, ETag, encoding) -> bytes đã nén
+STATIC_CACHE_MAX_ENTRIES = 256
+
+_static_cache = OrderedDict()
+_static_cache_lock = threading.Lock()
+
+
+def choose_encoding():
+    """Encoding tốt nhất client chấp nhận: 'br' | 'gzip' | None"""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding, level):
+    if encoding == 'br':
+        # Mức brotli 0-11; quy đổi từ mức gzip 1-9
+        return brotli.compress(data, quality=min(11, level + 1))
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _cached_static(key, build):
+    with _static_cache_lock:
+        if key in _static_cache:
+            _static_cache.move_to_end(key)
+            return _static_cache[key]
+    data = build()
+    with _static_cache_lock:
+        _static_cache[key] = data
+        while len(_static_cache) > STATIC_CACHE_MAX_ENTRIES:
+            _static_cache.popitem(last=False)
+    return data
+
+
+def init_compression(app):
+    """Gắn hook nén response theo Accept-Encoding"""
+    if not app.config.get('COMPRESS_ENABLED', True):
+        return
+
+    @app.after_request
+    def _compress_response(response):
+        if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+        response.vary.add('Accept-Encoding')
+
+        if response.status_code != 200 or 'Content-Encoding' in response.headers:
+            return response
+        is_static = response.direct_passthrough and request.endpoint == 'static'
+        if response.is_streamed and not is_static:
+            return response
+        length = response.content_length
+        if length is not None and length < app.config.get('COMPRESS_MIN_SIZE', 1024):
+            return response
+        encoding = choose_encoding()
+        if encoding is None:
+            return response
+
+        level = app.config.get('COMPRESS_LEVEL', 6)
+        etag, weak = response.get_etag()
+        if is_static:
+            response.direct_passthrough = False
+            source = response.response
+            data = _cached_static((request.path, etag, encoding),
+                                  lambda: compress(response.get_data(), encoding, level))
+            response.set_data(data)
+            if hasattr(source, 'close'):
+                source.close()
+        else:
+            response.set_data(compress(response.get_data(), encoding, level))
+
+        response.headers['Content-Encoding'] = encoding
+        # Bản nén khác từng byte với bản gốc -> ETag yếu (If-None-Match vẫn so khớp được)
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
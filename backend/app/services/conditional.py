@@ -0,0 +1,44 @@
+# backend/app/services/conditional.py
+import hashlib
+from flask import current_app, request, jsonify
+from app import db
+
+# ETag + 304 Not Modified cho các API đọc (thực đơn, cân nặng) mà dashboard gọi lại mỗi lần refresh.
+# ETag tính từ "mốc nước" rẻ: (số dòng, id lớn nhất, version lớn nhất) của các dòng liên quan -
+# 1 câu SQL chỉ đọc chỉ mục/cột nhỏ, không tải nội dung. version đổi ở mọi INSERT/UPDATE
+# (app/models/row_version.py), số dòng đổi khi xóa.
+
+
+def make_etag(*parts):
+    """ETag mạnh từ các thành phần (khác nhau giữa các URL nhờ request.full_path)"""
+    raw = '|'.join(str(part) for part in (request.full_path,) + parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def watermark(model, *filters):
+    """(số dòng, id lớn nhất, version lớn nhất) của các dòng thỏa filters - 1 câu SQL"""
+    return db.session.query(
+        db.func.count(model.id),
+        db.func.max(model.id),
+        db.func.max(model.version)
+    ).filter(*filters).one()
+
+
+def not_modified(etag):
+    """Response 304 nếu client đã có đúng bản này (If-None-Match), ngược lại None"""
+    # So khớp yếu (RFC 9110): response đã nén gửi ETag dạng W/"..."
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return None
+
+
+def with_etag(body, status, etag):
+    """jsonify + ETag; trình duyệt luôn hỏi lại (no-cache) nhưng được trả 304 khi không đổi"""
+    response = jsonify(body)
+    response.status_code = status
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,84 @@
+# backend/app/services/dish_catalog.py
+from app import db
+from app.models.dish import Dish
+
+# Danh mục món ăn Việt mặc định (giá trị dinh dưỡng ước tính cho 1 khẩu phần chuẩn)
+# (tên, bữa, loại, khẩu phần, đơn vị, kcal, đạm g, tinh bột g, béo g, chất gây dị ứng)
+DEFAULT_DISHES = [
+    # --- Bữa sáng: món đủ bữa ---
+    ('Phở bò', 'breakfast', 'one_dish', 400, 'g', 450, 25, 60, 10, 'thịt bò'),
+    ('Phở gà', 'breakfast', 'one_dish', 400, 'g', 420, 24, 58, 9, ''),
+    ('Bún bò Huế', 'breakfast', 'one_dish', 450, 'g', 480, 26, 62, 14, 'thịt bò,mắm ruốc'),
+    ('Bún riêu cua', 'breakfast', 'one_dish', 400, 'g', 400, 20, 55, 10, 'cua,hải sản'),
+    ('Hủ tiếu Nam Vang', 'breakfast', 'one_dish', 400, 'g', 430, 22, 60, 10, 'tôm,hải sản'),
+    ('Bánh mì trứng ốp la', 'breakfast', 'one_dish', 180, 'g', 380, 15, 45, 15, 'trứng,gluten'),
+    ('Xôi gà', 'breakfast', 'one_dish', 200, 'g', 420, 18, 65, 10, ''),
+    ('Bánh cuốn chả lụa', 'breakfast', 'one_dish', 250, 'g', 350, 14, 55, 8, ''),
+    ('Cháo gà hành gừng', 'breakfast', 'one_dish', 350, 'g', 300, 18, 45, 5, ''),
+    ('Cháo yến mạch sữa chua', 'breakfast', 'one_dish', 250, 'g', 280, 10, 45, 6, 'sữa,gluten'),
+    ('Bánh bao nhân thịt', 'breakfast', 'one_dish', 150, 'g', 330, 12, 48, 10, 'gluten,trứng'),
+    ('Miến gà', 'breakfast,dinner', 'one_dish', 400, 'g', 380, 22, 55, 7, ''),
+    # --- Bữa sáng: món kèm ---
+    ('Khoai lang luộc', 'breakfast', 'side', 200, 'g', 170, 3, 40, 0, ''),
+    ('Trứng gà luộc', 'breakfast', 'side', 100, 'g', 155, 13, 1, 11, 'trứng'),
+    ('Sữa đậu nành không đường', 'breakfast', 'drink', 250, 'ml', 110, 8, 8, 5, 'đậu nành'),
+    ('Sữa chua không đường', 'breakfast,dinner', 'drink', 100, 'g', 60, 4, 5, 3, 'sữa'),
+    ('Chuối', 'breakfast,lunch', 'fruit', 120, 'g', 105, 1, 27, 0, ''),
+    ('Đu đủ', 'breakfast,lunch,dinner', 'fruit', 200, 'g', 85, 1, 22, 0, ''),
+    ('Cam', 'breakfast,lunch,dinner', 'fruit', 180, 'g', 85, 2, 21, 0, ''),
+    # --- Tinh bột ---
+    ('Cơm trắng', 'lunch,dinner', 'staple', 200, 'g', 260, 5, 57, 1, ''),
+    ('Cơm gạo lứt', 'lunch,dinner', 'staple', 200, 'g', 220, 5, 46, 2, ''),
+    ('Bún tươi', 'lunch,dinner', 'staple', 200, 'g', 220, 3, 50, 0, ''),
+    # --- Món đạm ---
+    ('Cá kho tộ', 'lunch,dinner', 'main', 150, 'g', 250, 26, 6, 13, 'cá'),
+    ('Cá hấp gừng', 'lunch,dinner', 'main', 200, 'g', 220, 34, 3, 7, 'cá'),
+    ('Cá thu sốt cà', 'lunch,dinner', 'main', 180, 'g', 290, 30, 8, 15, 'cá'),
+    ('Thịt bò xào bông cải', 'lunch,dinner', 'main', 200, 'g', 280, 28, 10, 14, 'thịt bò'),
+    ('Bò lúc lắc', 'lunch,dinner', 'main', 180, 'g', 330, 30, 8, 19, 'thịt bò'),
+    ('Gà luộc lá chanh', 'lunch,dinner', 'main', 150, 'g', 240, 35, 0, 11, ''),
+    ('Ức gà nướng mật ong', 'lunch,dinner', 'main', 150, 'g', 250, 38, 8, 6, ''),
+    ('Thịt heo luộc', 'lunch,dinner', 'main', 150, 'g', 270, 27, 0, 18, 'thịt lợn'),
+    ('Thịt kho trứng', 'lunch,dinner', 'main', 180, 'g', 360, 25, 6, 26, 'thịt lợn,trứng'),
+    ('Tôm rim mặn ngọt', 'lunch,dinner', 'main', 150, 'g', 210, 30, 8, 6, 'tôm,hải sản'),
+    ('Mực xào rau cần', 'lunch,dinner', 'main', 200, 'g', 200, 26, 8, 7, 'mực,hải sản'),
+    ('Đậu phụ sốt cà chua', 'lunch,dinner', 'main', 200, 'g', 190, 14, 10, 11, 'đậu nành'),
+    ('Đậu phụ non hấp nấm', 'lunch,dinner', 'main', 200, 'g', 160, 13, 8, 8, 'đậu nành'),
+    ('Trứng chiên cà chua', 'lunch,dinner', 'main', 150, 'g', 220, 13, 6, 16, 'trứng'),
+    # --- Rau ---
+    ('Rau muống xào tỏi', 'lunch,dinner', 'side', 150, 'g', 90, 4, 8, 5, ''),
+    ('Cải ngọt luộc', 'lunch,dinner', 'side', 150, 'g', 40, 3, 6, 0, ''),
+    ('Su su xào tỏi', 'lunch,dinner', 'side', 150, 'g', 70, 2, 9, 3, ''),
+    ('Đậu bắp luộc', 'lunch,dinner', 'side', 150, 'g', 50, 3, 10, 0, ''),
+    ('Salad rau trộn dầu giấm', 'lunch,dinner', 'side', 150, 'g', 90, 2, 7, 6, ''),
+    ('Gỏi cuốn tôm thịt', 'lunch', 'side', 200, 'g', 230, 14, 30, 5, 'tôm,hải sản,đậu phộng'),
+    # --- Canh ---
+    ('Canh chua cá lóc', 'lunch,dinner', 'soup', 350, 'ml', 180, 18, 12, 6, 'cá'),
+    ('Canh bí đỏ thịt bằm', 'lunch,dinner', 'soup', 300, 'ml', 150, 10, 14, 6, 'thịt lợn'),
+    ('Canh rau ngót thịt bằm', 'lunch,dinner', 'soup', 300, 'ml', 120, 10, 6, 6, 'thịt lợn'),
+    ('Canh cải thảo nấu tôm', 'lunch,dinner', 'soup', 300, 'ml', 110, 12, 6, 4, 'tôm,hải sản'),
+    ('Canh mồng tơi nấu đậu phụ', 'lunch,dinner', 'soup', 300, 'ml', 100, 8, 6, 5, 'đậu nành'),
+]
+
+
+def seed_dishes():
+    """Nạp danh mục món mặc định nếu bảng dishes còn trống. Trả về số món đã thêm"""
+    if db.session.query(Dish.id).first() is not None:
+        return 0
+
+    for name, meals, category, portion, unit, kcal, protein, carbs, fat, allergens in DEFAULT_DISHES:
+        db.session.add(Dish(
+            name=name,
+            meal_types=meals,
+            category=category,
+            portion_size=portion,
+            unit=unit,
+            calories=kcal,
+            protein=protein,
+            carbs=carbs,
+            fat=fat,
+            allergens=allergens,
+            is_active=True
+        ))
+    db.session.commit()
+    return len(DEFAULT_DISHES)
@@ -0,0 +1,110 @@
+# backend/app/services/dish_history.py
+from datetime import timedelta
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.dish_history import DishHistory
+from app.models.menu import DailyMenu
+
+# Chỉ mục "món đã dùng gần đây" của từng user (bảng dish_history, 1 dòng / (user, ngày, món)).
+# Ghi lại mỗi khi lưu thực đơn (dùng bữa/món đã tách sẵn, không parse lại text), đọc bằng
+# 1 câu SQL theo khóa chính (user_id, date, ...) với cửa sổ MENU_VARIETY_DAYS ngày trước ngày cần tạo.
+# Món của thực đơn bị xóa vẫn được tính -> gợi ý đa dạng chặt hơn một chút;
+# `flask rebuild-dish-history` dựng lại chính xác từ menu_items.
+
+
+def name_key(name):
+    return ' '.join(name.lower().split())[:200]
+
+
+def variety_days():
+    return current_app.config.get('MENU_VARIETY_DAYS', 3)
+
+
+def record_dishes(user_id, menu_date, names):
+    """Cập nhật lịch sử món cho 1 thực đơn đã lưu (commit riêng, thử lại 1 lần nếu trùng khóa)"""
+    record_dish_lists(user_id, [(menu_date, names)])
+
+
+def record_dish_lists(user_id, entries):
+    """
+    Ghi lịch sử món cho nhiều thực đơn của 1 user (thay món cũ của các ngày đó): 1 DELETE + 1 INSERT + 1 commit.
+
+    Args:
+        entries: [(ngày thực đơn, [tên món])] - đủ món của thực đơn ngày đó
+    """
+    rows = {}  # (ngày, key) -> tên
+    for menu_date, names in entries:
+        for name in names:
+            rows.setdefault((menu_date, name_key(name)), name)
+    dates = sorted({menu_date for menu_date, _ in entries})
+    if not dates:
+        return
+
+    for attempt in range(2):
+        try:
+            DishHistory.query.filter(
+                DishHistory.user_id == user_id,
+                DishHistory.date.in_(dates)
+            ).delete(synchronize_session=False)
+            if rows:
+                db.session.execute(DishHistory.__table__.insert(), [
+                    {'user_id': user_id, 'date': menu_date, 'name_key': key, 'name': name}
+                    for (menu_date, key), name in rows.items()
+                ])
+            db.session.commit()
+            return
+        except IntegrityError:
+            # Request khác của cùng user vừa ghi cùng ngày -> ghi lại
+            db.session.rollback()
+            if attempt:
+                raise
+
+
+def record_menu(menu):
+    """Cập nhật lịch sử từ bữa/món đã tách của thực đơn"""
+    record_menus([menu])
+
+
+def record_menus(menus):
+    """Cập nhật lịch sử từ nhiều thực đơn (1 lần ghi cho mỗi user)"""
+    by_user = {}
+    for menu in menus:
+        names = [item.name for meal in menu.meals for item in meal.items]
+        by_user.setdefault(menu.user_id, []).append((menu.date, names))
+    for user_id, entries in by_user.items():
+        try:
+            record_dish_lists(user_id, entries)
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️ Không thể cập nhật lịch sử món của user {user_id}: {e}")
+
+
+def recent_dishes(user_id, around_date, days=None):
+    """
+    Món user đã dùng (hoặc đã lên thực đơn) trong `days` ngày ngay trước around_date - 1 câu SQL.
+    Thực đơn từ around_date trở đi (vd: đã tạo trước cho tuần sau) không tính.
+
+    Returns:
+        list: Tên món, dùng gần nhất trước
+    """
+    days = variety_days() if days is None else days
+    since = around_date - timedelta(days=days)
+    last_used = db.func.max(DishHistory.date)
+    rows = db.session.query(db.func.min(DishHistory.name), last_used)\
+        .filter(DishHistory.user_id == user_id,
+                DishHistory.date >= since,
+                DishHistory.date < around_date)\
+        .group_by(DishHistory.name_key)\
+        .order_by(last_used.desc(), DishHistory.name_key)\
+        .all()
+    return [name for name, _ in rows]
+
+
+def rebuild_user_history(user_id):
+    """Dựng lại lịch sử món của 1 user từ menu_items"""
+    DishHistory.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+    db.session.commit()
+    menus = DailyMenu.query.filter_by(user_id=user_id).order_by(DailyMenu.date).all()
+    record_menus(menus)
+    return len(menus)
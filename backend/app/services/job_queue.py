@@ -0,0 +1,190 @@
+# backend/app/services/job_queue.py
+import json
+import os
+import random
+import socket
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import or_, and_
+from app import db
+from app.models.menu_job import MenuJob
+from app.models.user import User
+
+# Hàng đợi job chạy nền lưu trong bảng menu_jobs (không cần broker bên ngoài).
+# Mỗi process có 1 nhóm worker thread lấy job bằng UPDATE có điều kiện nên
+# nhiều worker/process trên cùng máy không chạy trùng 1 job.
+
+_handlers = {}
+_workers = []
+_workers_lock = threading.Lock()
+_wakeup = threading.Event()
+
+
+def register_handler(kind, handler):
+    """Đăng ký hàm xử lý cho 1 loại job: handler(user, data, progress) -> (dict, status)"""
+    _handlers[kind] = handler
+
+
+def enqueue(user_id, kind, payload, total_days=None, max_attempts=None):
+    """Tạo job mới ở trạng thái 'queued' và đánh thức worker"""
+    from flask import current_app
+
+    job = MenuJob(
+        user_id=user_id,
+        kind=kind,
+        payload=json.dumps(payload, ensure_ascii=False),
+        status='queued',
+        max_attempts=max_attempts or current_app.config.get('JOB_MAX_ATTEMPTS', 3),
+        total_days=total_days,
+        run_after=datetime.utcnow()
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    ensure_workers(current_app._get_current_object())
+    _wakeup.set()
+    return job
+
+
+def ensure_workers(app):
+    """Khởi động nhóm worker thread của process hiện tại (nếu chưa chạy)"""
+    with _workers_lock:
+        alive = [t for t in _workers if t.is_alive() and t.pid == os.getpid()]
+        missing = app.config.get('JOB_WORKERS', 2) - len(alive)
+        for _ in range(max(0, missing)):
+            worker_id = f"{socket.gethostname()}:{os.getpid()}:{len(alive) + 1}"
+            thread = threading.Thread(target=_worker_loop, args=(app, worker_id), daemon=True)
+            thread.pid = os.getpid()
+            thread.start()
+            alive.append(thread)
+        _workers[:] = alive
+
+
+def _worker_loop(app, worker_id):
+    poll_interval = app.config.get('JOB_POLL_INTERVAL', 2)
+    while True:
+        job_id = None
+        with app.app_context():
+            try:
+                job_id = _claim_next(app, worker_id)
+                if job_id:
+                    _run_job(job_id)
+            except Exception as e:
+                db.session.rollback()
+                print(f"❌ Lỗi worker {worker_id}: {e}")
+        if not job_id:
+            _wakeup.wait(poll_interval)
+            _wakeup.clear()
+
+
+def _claim_next(app, worker_id):
+    """Nhận 1 job sẵn sàng chạy (hoặc job 'running' bị bỏ dở quá lâu). Trả về id hoặc None"""
+    now = datetime.utcnow()
+    stale_before = now - timedelta(seconds=app.config.get('JOB_STALE_SECONDS', 600))
+    claimable = or_(
+        and_(MenuJob.status == 'queued', MenuJob.run_after <= now),
+        and_(MenuJob.status == 'running', MenuJob.updated_at < stale_before)
+    )
+
+    candidates = db.session.query(MenuJob.id).filter(claimable)\
+        .order_by(MenuJob.run_after.asc(), MenuJob.id.asc())\
+        .limit(5)\
+        .all()
+    for (job_id,) in candidates:
+        claimed = MenuJob.query.filter(MenuJob.id == job_id, claimable).update({
+            'status': 'running',
+            'locked_by': worker_id,
+            'attempts': MenuJob.attempts + 1,
+            'progress': None,
+            'updated_at': now
+        }, synchronize_session=False)
+        db.session.commit()
+        if claimed == 1:
+            return job_id
+    return None
+
+
+def _retry_delay(app, attempts):
+    base = app.config.get('JOB_RETRY_BASE_SECONDS', 5)
+    return base * (2 ** (attempts - 1)) + random.uniform(0, base)
+
+
+def _run_job(job_id):
+    from flask import current_app
+
+    job = db.session.get(MenuJob, job_id)
+    user = db.session.get(User, job.user_id)
+    handler = _handlers.get(job.kind)
+    days = []
+
+    def progress(day, status, error=None):
+        days.append({'date': str(day), 'status': status, 'error': str(error) if error else None})
+        job.progress = json.dumps(days, ensure_ascii=False)
+        job.updated_at = datetime.utcnow()
+        db.session.commit()
+
+    body = None
+    retry_after = 0
+    try:
+        if handler is None:
+            raise ValueError(f"Không có handler cho loại job '{job.kind}'")
+        if user is None:
+            raise ValueError(f"Không tìm thấy user {job.user_id}")
+
+        body, status = handler(user, json.loads(job.payload), progress=progress)
+        summary = body.get('summary') or {}
+        if status >= 500 or status == 429:
+            error = body.get('error') or f'HTTP {status}'
+            retry_after = body.get('retry_after') or 0
+        elif summary.get('failed') or body.get('errors'):
+            error = 'Một số ngày tạo thực đơn thất bại'
+        else:
+            error = None
+    except Exception as e:
+        db.session.rollback()
+        error = str(e)
+
+    job = db.session.get(MenuJob, job_id)
+    now = datetime.utcnow()
+    job.updated_at = now
+    job.progress = json.dumps(days, ensure_ascii=False)
+    job.result = json.dumps(body, ensure_ascii=False) if body is not None else None
+    if error is None:
+        job.status = 'done'
+        job.last_error = None
+        job.finished_at = now
+    elif job.attempts >= job.max_attempts:
+        # Hết lượt thử -> dead letter, giữ lại lỗi để kiểm tra
+        job.status = 'dead'
+        job.last_error = error
+        job.finished_at = now
+    else:
+        job.status = 'queued'
+        job.last_error = error
+        # Bị giới hạn tần suất -> chờ ít nhất Retry-After trước khi chạy lại
+        delay = max(_retry_delay(current_app, job.attempts), retry_after)
+        job.run_after = now + timedelta(seconds=delay)
+    job.locked_by = None
+    db.session.commit()
+
+
+def job_to_dict(job):
+    """Định dạng job cho API polling trạng thái"""
+    days = json.loads(job.progress) if job.progress else []
+    return {
+        'job_id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'progress': {
+            'done': len(days),
+            'total': job.total_days
+        },
+        'days': days,
+        'result': json.loads(job.result) if job.result else None,
+        'error': job.last_error,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'updated_at': job.updated_at.isoformat() if job.updated_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None
+    }
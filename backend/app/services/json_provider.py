@@ -0,0 +1,77 @@
+# backend/app/services/json_provider.py
+import dataclasses
+import decimal
+import uuid
+from datetime import date
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy.engine import Row
+
+try:
+    import orjson  # pip install orjson - không có thì dùng json của stdlib
+except ImportError:
+    orjson = None
+
+# JSON provider của app (app.json): encode bằng orjson (C, nhanh hơn json stdlib nhiều lần),
+# date/datetime -> chuỗi ISO, Row của SQLAlchemy -> object theo tên cột (label), nên route có thể
+# jsonify thẳng kết quả db.session.query(...).all() mà không dựng dict trung gian.
+# Benchmark: python benchmarks/json_bench.py
+
+
+# (metadata của kết quả gần nhất, tên cột): các Row cùng 1 kết quả dùng chung tên cột,
+# Row._fields/_asdict() dựng lại danh sách tên ở mỗi lần gọi nên chậm hơn nhiều
+_row_fields = (None, ())
+
+
+def row_to_dict(row):
+    global _row_fields
+    parent, fields = _row_fields
+    if parent is not row._parent:
+        fields = row._fields
+        _row_fields = (row._parent, fields)
+    return dict(zip(fields, row))
+
+
+def to_json_value(obj):
+    """Giá trị không có sẵn trong JSON -> kiểu JSON (dùng cho cả orjson và json stdlib)"""
+    if isinstance(obj, Row):
+        return row_to_dict(obj)
+    if isinstance(obj, date):
+        return obj.isoformat()
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """DefaultJSONProvider dùng orjson; tham số riêng của json.dumps (indent, cls, ...) -> stdlib"""
+
+    default = staticmethod(to_json_value)
+
+    def dumps_bytes(self, obj, pretty=False):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumps_bytes(obj, pretty) + b'\n', mimetype=self.mimetype)
@@ -0,0 +1,175 @@
+# backend/app/services/menu_engine.py
+import itertools
+import random
+import re
+
+# Bộ tạo thực đơn cục bộ (không gọi AI): chọn món từ danh mục Dish cho 3 bữa sao cho
+# tổng calo sát calo mục tiêu, tránh món gây dị ứng và món đã ăn gần đây.
+# Kết quả có cùng định dạng text với thực đơn AI (lưu vào DailyMenu.content).
+
+# (bữa, tiêu đề, tỉ lệ calo)
+MEAL_PLAN = (
+    ('breakfast', 'Bữa sáng 🌅', 0.25),
+    ('lunch', 'Bữa trưa 🌞', 0.40),
+    ('dinner', 'Bữa tối 🌙', 0.35),
+)
+
+# Cấu trúc 1 bữa hợp lệ: mỗi phần tử là tập loại món được chọn cho 1 vị trí
+MEAL_TEMPLATES = {
+    'breakfast': (
+        (('one_dish',), ('drink', 'fruit', 'side')),
+    ),
+    'lunch': (
+        (('staple',), ('main',), ('side', 'soup')),
+        (('one_dish',), ('main',), ('side', 'soup')),
+    ),
+    'dinner': (
+        (('staple',), ('main',), ('side', 'soup')),
+        (('one_dish',), ('side', 'soup', 'fruit', 'drink')),
+    ),
+}
+
+# Món được co giãn khẩu phần để khớp calo (tinh bột/món đủ bữa), các món khác giữ khẩu phần chuẩn
+SCALABLE_CATEGORIES = ('staple', 'one_dish')
+MIN_FACTOR, MAX_FACTOR, FACTOR_STEP = 0.5, 2.0, 0.25
+
+# Tỉ lệ năng lượng từ đạm tối thiểu mong muốn của mỗi bữa
+MIN_PROTEIN_RATIO = 0.15
+
+# Điểm phạt cho mỗi món đã ăn gần đây (vẫn chọn được nếu danh mục không còn món khác)
+REPEAT_PENALTY = 0.1
+
+DEFAULT_TARGET_CAL = 2000
+NO_ALLERGY_WORDS = ('không có', 'không', 'khong co', 'none', '')
+
+
+class MenuEngineError(Exception):
+    """Không ghép được thực đơn (danh mục trống hoặc dị ứng loại hết món)"""
+
+
+def parse_allergies(allergies):
+    """'Tôm, đậu phộng' -> ['tôm', 'đậu phộng'] (bỏ 'Không có')"""
+    words = [word.strip().lower() for word in re.split(r'[,;/\n]', allergies or '')]
+    return [word for word in words if word not in NO_ALLERGY_WORDS]
+
+
+def _tokens(value):
+    return tuple(re.findall(r'\w+', value.lower()))
+
+
+def _has_phrase(tokens, phrase):
+    """phrase (tuple từ) xuất hiện liền nhau trong tokens - so nguyên từ, 'cá' không khớp 'các'"""
+    size = len(phrase)
+    return size > 0 and any(tokens[i:i + size] == phrase for i in range(len(tokens) - size + 1))
+
+
+def _is_allergic(dish, allergy_words):
+    name = _tokens(dish.name)
+    allergens = [_tokens(a) for a in (dish.allergens or '').split(',') if a.strip()]
+    for word in allergy_words:
+        word = _tokens(word)
+        if _has_phrase(name, word) or any(
+            _has_phrase(allergen, word) or _has_phrase(word, allergen) for allergen in allergens
+        ):
+            return True
+    return False
+
+
+def _portion(dish, factor):
+    """Khẩu phần đã làm tròn 10g/ml và dinh dưỡng tương ứng"""
+    amount = max(10, int(round(dish.portion_size * factor / 10.0)) * 10)
+    ratio = amount / dish.portion_size
+    return amount, int(round(dish.calories * ratio)), (dish.protein or 0) * ratio
+
+
+def _best_meal(meal_key, candidates, target, rng, avoid=frozenset()):
+    """Chọn tổ hợp món + khẩu phần có điểm tốt nhất cho 1 bữa. Trả về [(dish, lượng, kcal)]"""
+    by_category = {}
+    for dish in candidates:
+        by_category.setdefault(dish.category, []).append(dish)
+
+    best, best_score = None, None
+    for template in MEAL_TEMPLATES[meal_key]:
+        slots = [[dish for category in slot for dish in by_category.get(category, [])] for slot in template]
+        if not all(slots):
+            continue
+
+        for combo in itertools.product(*slots):
+            if len({dish.id for dish in combo}) < len(combo):
+                continue
+
+            fixed = [dish for dish in combo if dish.category not in SCALABLE_CATEGORIES]
+            scalable = [dish for dish in combo if dish.category in SCALABLE_CATEGORIES]
+            fixed_kcal = sum(dish.calories for dish in fixed)
+            scalable_kcal = sum(dish.calories for dish in scalable)
+
+            # Hệ số khẩu phần cho món tinh bột để tổng calo bữa khớp mục tiêu
+            factor = 1.0
+            if scalable_kcal:
+                factor = (target - fixed_kcal) / scalable_kcal
+                factor = min(MAX_FACTOR, max(MIN_FACTOR, round(factor / FACTOR_STEP) * FACTOR_STEP))
+
+            items = [(dish, *_portion(dish, factor if dish in scalable else 1.0)) for dish in combo]
+            kcal = sum(item[2] for item in items)
+            protein = sum(item[3] for item in items)
+
+            score = abs(kcal - target) / target
+            if kcal and protein * 4 / kcal < MIN_PROTEIN_RATIO:
+                score += 0.05
+            score += REPEAT_PENALTY * sum(1 for dish in combo if dish.name.lower() in avoid)
+            # Nhiễu nhỏ để các ngày khác nhau không luôn ra cùng 1 tổ hợp
+            score += rng.random() * 0.03
+
+            if best_score is None or score < best_score:
+                best, best_score = [(dish, amount, cal) for dish, amount, cal, _ in items], score
+    return best
+
+
+def build_menu(dishes, target_cal=None, allergies='', avoid_dishes=(), seed=None):
+    """
+    Ghép thực đơn 3 bữa từ danh mục món.
+
+    Args:
+        dishes: Danh sách Dish (đang hoạt động)
+        target_cal: Calo mục tiêu cả ngày (None -> DEFAULT_TARGET_CAL)
+        allergies: Chuỗi dị ứng của user (vd: 'tôm, đậu phộng')
+        avoid_dishes: Tên các món đã ăn gần đây (tránh lặp lại nếu còn món khác)
+        seed: Giá trị khởi tạo ngẫu nhiên (cùng seed -> cùng thực đơn)
+
+    Returns:
+        tuple: (nội dung thực đơn dạng text, tổng calo)
+
+    Raises:
+        MenuEngineError: Không đủ món phù hợp để ghép thực đơn
+    """
+    target_cal = target_cal or DEFAULT_TARGET_CAL
+    rng = random.Random(seed)
+    allergy_words = parse_allergies(allergies)
+    avoid = {name.strip().lower() for name in avoid_dishes}
+
+    safe = [dish for dish in dishes if not _is_allergic(dish, allergy_words)]
+    used = set()
+    lines = []
+    total = 0
+
+    for index, (meal_key, header, ratio) in enumerate(MEAL_PLAN):
+        # Bữa cuối nhận phần calo còn lại để tổng cả ngày sát mục tiêu
+        if index == len(MEAL_PLAN) - 1:
+            target = max(100, target_cal - total)
+        else:
+            target = target_cal * ratio
+
+        meal_dishes = [dish for dish in safe if meal_key in dish.meal_types.split(',') and dish.id not in used]
+        meal = _best_meal(meal_key, meal_dishes, target, rng, avoid)
+        if not meal:
+            raise MenuEngineError(f"Không đủ món phù hợp trong danh mục để tạo {header}")
+
+        lines.append(header)
+        for dish, amount, cal in meal:
+            used.add(dish.id)
+            total += cal
+            lines.append(f"- {dish.name} ({amount}{dish.unit}) - {cal} kcal")
+        lines.append('')
+
+    lines.append(f"Tổng calo: {total} kcal")
+    return '\n'.join(lines), total
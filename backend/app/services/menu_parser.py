@@ -0,0 +1,212 @@
+# backend/app/services/menu_parser.py
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Tuple
+
+# Bộ đọc thực đơn dạng text (AI / bộ giải cục bộ / người dùng sửa) - duyệt 1 lượt qua
+# các dòng với regex biên dịch sẵn, trả về kết quả có kiểu: bữa, món, calo từng món, tổng.
+# Dùng chung cho: tính tổng calo, tách bữa/món lúc lưu (menu_structure), sửa bữa.
+# Benchmark: python benchmarks/menu_parser_bench.py
+
+# (meal_type, từ khóa tiêu đề viết thường)
+MEAL_KEYWORDS = (
+    ('breakfast', 'bữa sáng'),
+    ('lunch', 'bữa trưa'),
+    ('dinner', 'bữa tối'),
+    ('snack', 'bữa phụ'),
+)
+
+BULLETS = ('-', '*', '•', '+')
+
+# "- Phở bò (400g) - 450 kcal" / "* **Phở bò** (400g): 450 kcal"
+_ITEM_RE = re.compile(
+    r'^[-*•+][ \t]*(?P<name>[^(\n]+?)[ \t]*(?:\((?P<portion>[^)\n]*)\))?[ \t]*[-–:][^\n]*?(?P<kcal>\d[\d.,]*)[ \t]*kcal',
+    re.IGNORECASE
+)
+# Số calo cuối cùng trên dòng (dòng món không đúng format)
+_KCAL_RE = re.compile(r'(\d[\d.,]*)[ \t]*kcal', re.IGNORECASE)
+# Dòng tổng: ưu tiên theo thứ tự nhãn (tổng calo > tổng > calo tổng > total)
+_TOTAL_RE = re.compile(
+    r'(?P<label>tổng\s+calo|calo\s+tổng|tổng|total)[:\s*]+(?P<value>\d[\d,\.]*)[ \t]*(?P<unit>kcal)?',
+    re.IGNORECASE
+)
+_TOTAL_PRIORITY = {'tổng calo': 0, 'tổng': 1, 'calo tổng': 2, 'total': 3}
+# Nhãn cần có chữ 'kcal' sau số mới được tính là dòng tổng
+_TOTAL_NEEDS_UNIT = ('tổng calo', 'tổng', 'total')
+_SPACES_RE = re.compile(r'\s+')
+
+
+@dataclass(frozen=True)
+class ParsedDish:
+    name: str
+    portion: Optional[str]
+    calories: int
+
+
+@dataclass(frozen=True)
+class ParsedMeal:
+    meal_type: str  # 'breakfast' | 'lunch' | 'dinner' | 'snack'
+    title: str
+    dishes: Tuple[ParsedDish, ...]
+
+    @property
+    def calories(self) -> int:
+        return sum(dish.calories for dish in self.dishes)
+
+
+@dataclass(frozen=True)
+class ParsedMenu:
+    meals: Tuple[ParsedMeal, ...]
+    loose_dishes: Tuple[ParsedDish, ...]  # món nằm trước tiêu đề bữa đầu tiên
+    stated_total: Optional[int]  # tổng calo AI ghi ở dòng "Tổng calo: N kcal"
+
+    @property
+    def dishes(self) -> Tuple[ParsedDish, ...]:
+        return self.loose_dishes + tuple(dish for meal in self.meals for dish in meal.dishes)
+
+    @property
+    def dish_names(self):
+        return [dish.name for dish in self.dishes]
+
+    @property
+    def meal_types(self):
+        return {meal.meal_type for meal in self.meals}
+
+    @property
+    def total_calories(self) -> int:
+        """Tổng calo ghi trong thực đơn, không có thì cộng calo các món"""
+        if self.stated_total is not None:
+            return self.stated_total
+        return sum(dish.calories for dish in self.dishes)
+
+
+def _to_int(number):
+    try:
+        return int(number.replace(',', '').replace('.', ''))
+    except ValueError:
+        return 0
+
+
+def _meal_type(lowered):
+    for meal_type, keyword in MEAL_KEYWORDS:
+        if keyword in lowered:
+            return meal_type
+    return None
+
+
+def _parse_dish(line):
+    """1 dòng món (đã strip, bắt đầu bằng gạch đầu dòng và có 'kcal') -> ParsedDish hoặc None"""
+    match = _ITEM_RE.match(line)
+    if match:
+        name, portion, kcal = match.group('name'), match.group('portion'), match.group('kcal')
+    else:
+        # Format lệch (vd: "- Phở bò (400g, 450 kcal)"): tên trước '(' + số calo cuối dòng
+        kcal_matches = _KCAL_RE.findall(line)
+        if not kcal_matches:
+            return None
+        name, _, rest = line.lstrip(''.join(BULLETS) + ' \t').partition('(')
+        portion = rest.split(')')[0].split(',')[0] if rest else None
+        name = name.split(' - ')[0].split(':')[0]
+        kcal = kcal_matches[-1]
+
+    name = _SPACES_RE.sub(' ', name.replace('**', '').replace('__', '')).strip(' -–:*')
+    if len(name) < 2 or name.lower().startswith(('tổng', 'total')):
+        return None
+    portion = portion.strip() if portion else None
+    return ParsedDish(name=name[:200], portion=(portion or None) and portion[:50], calories=_to_int(kcal))
+
+
+def match_meal_header(line):
+    """
+    Dòng tiêu đề bữa (đã strip) -> (meal_type, tiêu đề) hoặc None.
+    Có từ khóa bữa, không phải dòng món và không phải dòng tổng ("Tổng calo bữa sáng: ...").
+    """
+    lowered = line.lower()
+    if 'bữa' not in lowered or (line.startswith(BULLETS) and 'kcal' in lowered):
+        return None
+    if lowered.lstrip('#* \t').startswith(('tổng', 'total')):
+        return None
+    meal_type = _meal_type(lowered)
+    if not meal_type:
+        return None
+    return meal_type, line.replace('**', '').strip('#* \t:')[:100]
+
+
+def match_total(line):
+    """Dòng tổng calo (đã strip) -> (độ ưu tiên, match có nhóm 'value') hoặc None"""
+    lowered = line.lower()
+    if 'tổng' not in lowered and 'total' not in lowered:
+        return None
+    match = _TOTAL_RE.search(line)
+    if not match:
+        return None
+    label = _SPACES_RE.sub(' ', match.group('label').lower())
+    if not match.group('unit') and label in _TOTAL_NEEDS_UNIT:
+        return None
+    return _TOTAL_PRIORITY[label], match
+
+
+@lru_cache(maxsize=256)
+def parse_menu(content) -> ParsedMenu:
+    """
+    Đọc thực đơn text trong 1 lượt.
+
+    Args:
+        content: Nội dung thực đơn (None/rỗng -> thực đơn rỗng)
+
+    Returns:
+        ParsedMenu: bữa (theo thứ tự xuất hiện), món ngoài bữa và tổng calo ghi trong text
+    """
+    meals = []
+    loose = []
+    current_type = current_title = None
+    current_dishes = []
+    best_total = None  # (độ ưu tiên, giá trị)
+
+    for raw_line in (content or '').split('\n'):
+        line = raw_line.strip()
+        if not line:
+            continue
+        lowered = line.lower()
+
+        header = match_meal_header(line)
+        if header:
+            if current_type:
+                meals.append(ParsedMeal(current_type, current_title, tuple(current_dishes)))
+            (current_type, current_title), current_dishes = header, []
+            continue
+
+        # Dòng tổng calo (chỉ giữ dòng có độ ưu tiên cao nhất, xuất hiện đầu tiên)
+        total = match_total(line)
+        if total:
+            priority, match = total
+            if best_total is None or priority < best_total[0]:
+                best_total = (priority, _to_int(match.group('value')))
+            continue
+
+        if line.startswith(BULLETS) and 'kcal' in lowered:
+            dish = _parse_dish(line)
+            if dish is not None:
+                (current_dishes if current_type else loose).append(dish)
+
+    if current_type:
+        meals.append(ParsedMeal(current_type, current_title, tuple(current_dishes)))
+    return ParsedMenu(
+        meals=tuple(meals),
+        loose_dishes=tuple(loose),
+        stated_total=best_total[1] if best_total else None
+    )
+
+
+def parse_dishes(text):
+    """Các món trong 1 đoạn text (vd: nội dung 1 bữa người dùng sửa) - bỏ qua tiêu đề bữa"""
+    return list(parse_menu(text).dishes)
+
+
+def extract_total_calories(menu_content) -> int:
+    """
+    Trích xuất tổng số calo từ nội dung thực đơn.
+    Ưu tiên các dòng như "Tổng calo: 1500 kcal" hoặc "Tổng: 1500kcal", không có thì cộng calo các món.
+    """
+    return parse_menu(menu_content).total_calories
@@ -0,0 +1,183 @@
+# backend/app/services/menu_search.py
+import re
+import unicodedata
+from flask import current_app
+from sqlalchemy import text
+from app import db
+from app.models.menu import DailyMenu
+
+# Chỉ mục tìm kiếm toàn văn cho thực đơn (bảng menu_search, 1 dòng / thực đơn):
+# - SQLite: bảng ảo FTS5 (rowid = id thực đơn), cột owner chứa token u<user_id> để lọc theo user
+#   ngay trong chỉ mục; trigger xóa dòng chỉ mục khi xóa thực đơn
+# - PostgreSQL: cột tsvector + chỉ mục GIN, chỉ mục (user_id, date), khóa ngoại ON DELETE CASCADE
+# Nội dung được bỏ dấu tiếng Việt trước khi ghi và trước khi tìm ("phở bò" ~ "pho bo" ~ "PHO").
+# Từ khóa ngắn (<= PREFIX_MAX_LEN ký tự, đang gõ dở) khớp theo tiền tố qua chỉ mục tiền tố của FTS5,
+# từ khóa dài hơn (gần như luôn là 1 âm tiết trọn vẹn) khớp nguyên từ - tiền tố dài ngoài chỉ mục
+# buộc FTS5 gộp doclist của cả bảng (~50ms với từ phổ biến trên 1 triệu thực đơn).
+# Thực đơn cũ: chạy `flask rebuild-search-index` sau khi nâng cấp.
+
+SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS menu_search USING fts5("
+    "body, owner, date UNINDEXED, prefix='2 3 4')",  # prefix: khớp với PREFIX_MAX_LEN
+    "CREATE TRIGGER IF NOT EXISTS daily_menus_search_delete AFTER DELETE ON daily_menus "
+    "BEGIN DELETE FROM menu_search WHERE rowid = old.id; END",
+)
+POSTGRES_DDL = (
+    "CREATE TABLE IF NOT EXISTS menu_search ("
+    "menu_id INTEGER PRIMARY KEY REFERENCES daily_menus(id) ON DELETE CASCADE, "
+    "user_id INTEGER NOT NULL, date DATE NOT NULL, body TEXT NOT NULL, tsv TSVECTOR NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS ix_menu_search_tsv ON menu_search USING GIN (tsv)",
+    "CREATE INDEX IF NOT EXISTS ix_menu_search_user_date ON menu_search (user_id, date)",
+)
+
+# Số từ khóa tối đa / câu tìm (bỏ phần thừa)
+MAX_TERMS = 8
+# Từ khóa dài tối đa bao nhiêu ký tự thì khớp theo tiền tố
+PREFIX_MAX_LEN = 4
+
+_WORD = re.compile(r'\w+')
+
+
+def normalize(value):
+    """Chữ thường, bỏ dấu tiếng Việt (đ -> d), chỉ giữ các từ: 'Phở Bò (1 tô)' -> 'pho bo 1 to'"""
+    value = unicodedata.normalize('NFD', value or '').replace('đ', 'd').replace('Đ', 'd')
+    value = ''.join(ch for ch in value if not unicodedata.combining(ch)).lower()
+    return ' '.join(_WORD.findall(value))
+
+
+def owner_token(user_id):
+    return f"u{user_id}"
+
+
+def search_terms(q):
+    """Từ khóa (đã bỏ dấu) của câu tìm - rỗng nếu không có từ nào"""
+    return normalize(q).split()[:MAX_TERMS]
+
+
+def _dialect():
+    return db.session.get_bind().dialect.name
+
+
+def ensure_search_index():
+    """Tạo bảng chỉ mục nếu chưa có (gọi lúc khởi động, sau db.create_all())"""
+    ddl = POSTGRES_DDL if _dialect() == 'postgresql' else SQLITE_DDL
+    for statement in ddl:
+        db.session.execute(text(statement))
+    db.session.commit()
+
+
+def index_rows(rows):
+    """
+    Ghi (hoặc ghi đè) chỉ mục của nhiều thực đơn. Không commit - gọi trước commit của thực đơn.
+
+    Args:
+        rows: [(id thực đơn, user_id, ngày, nội dung)]
+    """
+    params = [
+        {'menu_id': menu_id, 'user_id': user_id, 'owner': owner_token(user_id),
+         'date': str(menu_date), 'body': normalize(content)}
+        for menu_id, user_id, menu_date, content in rows
+    ]
+    if not params:
+        return
+    if _dialect() == 'postgresql':
+        db.session.execute(text(
+            "INSERT INTO menu_search (menu_id, user_id, date, body, tsv) "
+            "VALUES (:menu_id, :user_id, CAST(:date AS DATE), :body, to_tsvector('simple', :body)) "
+            "ON CONFLICT (menu_id) DO UPDATE SET user_id = EXCLUDED.user_id, date = EXCLUDED.date, "
+            "body = EXCLUDED.body, tsv = EXCLUDED.tsv"
+        ), params)
+    else:
+        db.session.execute(text("DELETE FROM menu_search WHERE rowid = :menu_id"), params)
+        db.session.execute(text(
+            "INSERT INTO menu_search (rowid, body, owner, date) VALUES (:menu_id, :body, :owner, :date)"
+        ), params)
+
+
+def index_menu(menu):
+    """Ghi chỉ mục của 1 thực đơn (cần có id -> flush trước). Không commit."""
+    index_rows([(menu.id, menu.user_id, menu.date, menu.content)])
+
+
+def index_new_menus(user_id, contents):
+    """Ghi chỉ mục cho các thực đơn vừa INSERT gộp (insert_menus). Không commit."""
+    if not contents:
+        return
+    menu_ids = dict(
+        db.session.query(DailyMenu.date, DailyMenu.id)
+        .filter(DailyMenu.user_id == user_id, DailyMenu.date.in_(list(contents)))
+    )
+    index_rows([
+        (menu_ids[menu_date], user_id, menu_date, content)
+        for menu_date, content in contents.items() if menu_date in menu_ids
+    ])
+
+
+def _match_ids(terms, user_id, limit):
+    """id thực đơn khớp mọi từ khóa: của 1 user mới nhất theo ngày, hoặc tất cả theo id giảm dần"""
+    params = {'limit': limit, 'user_id': user_id}
+    if _dialect() == 'postgresql':
+        # Từ khóa chỉ gồm chữ/số (đã normalize) -> ghép thẳng vào to_tsquery được
+        params['query'] = ' & '.join(f"{term}:*" if len(term) <= PREFIX_MAX_LEN else term for term in terms)
+        if user_id is not None:
+            sql = ("SELECT menu_id FROM menu_search WHERE user_id = :user_id AND tsv @@ to_tsquery('simple', :query) "
+                   "ORDER BY date DESC LIMIT :limit")
+        else:
+            sql = "SELECT menu_id FROM menu_search WHERE tsv @@ to_tsquery('simple', :query) ORDER BY menu_id DESC LIMIT :limit"
+    else:
+        params['query'] = ' AND '.join(
+            f'body : "{term}"' + ('*' if len(term) <= PREFIX_MAX_LEN else '') for term in terms
+        )
+        if user_id is not None:
+            params['query'] = f'owner : "{owner_token(user_id)}" AND {params["query"]}'
+            order = 'date DESC'
+        else:
+            order = 'rowid DESC'
+        sql = f"SELECT rowid FROM menu_search WHERE menu_search MATCH :query ORDER BY {order} LIMIT :limit"
+    return [menu_id for (menu_id,) in db.session.execute(text(sql), params)]
+
+
+def search_menus(user_id, q, limit=20):
+    """
+    Tìm thực đơn của 1 user theo từ khóa (không phân biệt dấu, từ khóa ngắn khớp tiền tố).
+
+    Returns:
+        list: DailyMenu mới nhất trước ([] nếu câu tìm không có từ nào)
+    """
+    terms = search_terms(q)
+    if not terms:
+        return []
+    menu_ids = _match_ids(terms, user_id, limit)
+    if not menu_ids:
+        return []
+    return DailyMenu.query.filter(DailyMenu.id.in_(menu_ids))\
+        .order_by(DailyMenu.date.desc())\
+        .all()
+
+
+def search_menu_ids(q, limit=None):
+    """id thực đơn (mọi user) khớp từ khóa, mới nhất trước - dùng cho ô tìm kiếm của admin"""
+    terms = search_terms(q)
+    if not terms:
+        return []
+    return _match_ids(terms, None, limit or current_app.config.get('MENU_SEARCH_ADMIN_LIMIT', 1000))
+
+
+def rebuild_search_index(batch_size=500, progress=None):
+    """Ghi lại chỉ mục cho mọi thực đơn theo lô (keyset theo id), commit mỗi lô"""
+    total = last_id = 0
+    while True:
+        rows = db.session.query(DailyMenu.id, DailyMenu.user_id, DailyMenu.date, DailyMenu.content)\
+            .filter(DailyMenu.id > last_id)\
+            .order_by(DailyMenu.id)\
+            .limit(batch_size)\
+            .all()
+        if not rows:
+            break
+        index_rows(rows)
+        db.session.commit()
+        last_id = rows[-1].id
+        total += len(rows)
+        if progress:
+            progress(total)
+    return total
@@ -0,0 +1,212 @@
+# backend/app/services/menu_structure.py
+from sqlalchemy import func, insert
+from app import db
+from app.models.menu import DailyMenu
+from app.models.menu_meal import MenuMeal, MenuItem
+from app.services.menu_parser import parse_menu, parse_dishes, match_meal_header, match_total, ParsedDish, BULLETS
+
+# Tách thực đơn dạng text (AI/bộ giải cục bộ) thành bữa + món 1 lần lúc lưu, lưu vào
+# menu_meals / menu_items. Sửa bữa, tính tổng calo, lịch sử món đều chạy bằng SQL;
+# DailyMenu.content chỉ còn là bản hiển thị (giữ nguyên để tương thích ngược) - sửa bữa
+# chỉ thay các dòng món của bữa đó, mọi dòng khác (món không tách được, lưu ý...) giữ nguyên.
+
+# (meal_type, tiêu đề mặc định) - thứ tự hiển thị
+MEAL_TITLES = (
+    ('breakfast', 'Bữa sáng 🌅'),
+    ('lunch', 'Bữa trưa 🌞'),
+    ('dinner', 'Bữa tối 🌙'),
+    ('snack', 'Bữa phụ 🍎'),
+)
+
+
+def _menu_items(dishes):
+    return [
+        MenuItem(name=dish.name, portion=dish.portion, calories=dish.calories, position=position)
+        for position, dish in enumerate(dishes)
+    ]
+
+
+def build_meals(content):
+    """
+    Tách nội dung thực đơn thành danh sách MenuMeal (kèm MenuItem) chưa lưu.
+
+    Returns:
+        list: MenuMeal theo thứ tự xuất hiện (món nằm ngoài bữa nào bị bỏ qua)
+    """
+    return [
+        MenuMeal(
+            meal_type=meal.meal_type,
+            title=meal.title,
+            position=position,
+            total_calories=meal.calories,
+            items=_menu_items(meal.dishes)
+        )
+        for position, meal in enumerate(parse_menu(content).meals)
+    ]
+
+
+def set_meal_items(meal, text, calories=None):
+    """
+    Thay toàn bộ món của 1 bữa bằng nội dung mới.
+
+    Args:
+        text: Các dòng món '- tên (khẩu phần) - N kcal'
+        calories: Tổng calo bữa do client gửi (dùng khi không tách được món nào)
+    """
+    dishes = parse_dishes(text)
+    if not dishes:
+        # Nội dung tự do không theo format -> giữ thành 1 món
+        dishes = [ParsedDish(name=text.strip()[:200], portion=None, calories=int(calories or 0))]
+    meal.items = _menu_items(dishes)
+    meal.total_calories = sum(dish.calories for dish in dishes)
+
+
+def ensure_meals(menu):
+    """Thực đơn cũ (trước khi có menu_meals) -> tách 1 lần và lưu lại"""
+    if not menu.meals:
+        menu.meals = build_meals(menu.content)
+    return menu.meals
+
+
+def get_or_create_meal(menu, meal_type):
+    for meal in ensure_meals(menu):
+        if meal.meal_type == meal_type:
+            return meal
+
+    title = dict(MEAL_TITLES)[meal_type]
+    order = [key for key, _ in MEAL_TITLES]
+    meal = MenuMeal(meal_type=meal_type, title=title, total_calories=0)
+    menu.meals.append(meal)
+    # Giữ thứ tự sáng -> trưa -> tối
+    menu.meals.sort(key=lambda m: order.index(m.meal_type) if m.meal_type in order else len(order))
+    for position, m in enumerate(menu.meals):
+        m.position = position
+    return meal
+
+
+def insert_menus(user_id, contents):
+    """
+    Thêm thực đơn mới của nhiều ngày bằng INSERT gộp (daily_menus, menu_meals, menu_items):
+    số câu SQL cố định (3 INSERT nhiều dòng + 2 SELECT id) dù bao nhiêu ngày/món. Không commit.
+
+    Args:
+        contents: dict {ngày: nội dung thực đơn} - các ngày chưa có thực đơn
+
+    Returns:
+        dict: {ngày: [tên món]} của các thực đơn vừa thêm
+    """
+    parsed = {menu_date: parse_menu(content) for menu_date, content in contents.items()}
+    if not parsed:
+        return {}
+
+    db.session.execute(insert(DailyMenu), [
+        {'user_id': user_id, 'date': menu_date, 'content': content,
+         'total_calories': parsed[menu_date].total_calories, 'prewarmed': False}
+        for menu_date, content in contents.items()
+    ])
+    menu_ids = dict(
+        db.session.query(DailyMenu.date, DailyMenu.id)
+        .filter(DailyMenu.user_id == user_id, DailyMenu.date.in_(list(parsed)))
+    )
+
+    meal_rows = [
+        {'menu_id': menu_ids[menu_date], 'meal_type': meal.meal_type, 'title': meal.title,
+         'position': position, 'total_calories': meal.calories}
+        for menu_date, menu in parsed.items()
+        for position, meal in enumerate(menu.meals)
+    ]
+    if meal_rows:
+        db.session.execute(insert(MenuMeal), meal_rows)
+        meal_ids = {
+            (menu_id, position): meal_id for menu_id, position, meal_id in
+            db.session.query(MenuMeal.menu_id, MenuMeal.position, MenuMeal.id)
+            .filter(MenuMeal.menu_id.in_(list(menu_ids.values())))
+        }
+        item_rows = [
+            {'meal_id': meal_ids[(menu_ids[menu_date], meal_position)], 'name': dish.name,
+             'portion': dish.portion, 'calories': dish.calories, 'position': position}
+            for menu_date, menu in parsed.items()
+            for meal_position, meal in enumerate(menu.meals)
+            for position, dish in enumerate(meal.dishes)
+        ]
+        if item_rows:
+            db.session.execute(insert(MenuItem), item_rows)
+
+    return {
+        menu_date: [dish.name for meal in menu.meals for dish in meal.dishes]
+        for menu_date, menu in parsed.items()
+    }
+
+
+def menu_total_calories(menu_id):
+    """Tổng calo của thực đơn tính bằng SQL từ menu_items"""
+    return db.session.query(func.coalesce(func.sum(MenuItem.calories), 0))\
+        .join(MenuMeal, MenuItem.meal_id == MenuMeal.id)\
+        .filter(MenuMeal.menu_id == menu_id)\
+        .scalar()
+
+
+def _item_line(item):
+    portion = f" ({item.portion})" if item.portion else ""
+    return f"- {item.name}{portion} - {item.calories} kcal"
+
+
+def splice_meal(content, meal, total_calories):
+    """
+    Ghi món mới của 1 bữa vào DailyMenu.content: bỏ các dòng gạch đầu dòng trong phần của bữa đó,
+    chèn món mới ngay sau tiêu đề bữa và sửa số ở dòng tổng calo. Các dòng khác giữ nguyên.
+    Bữa chưa có trong nội dung -> chèn cả phần bữa trước bữa sau nó (hoặc trước dòng tổng calo).
+
+    Args:
+        meal: MenuMeal vừa sửa (meal_type, title, items)
+        total_calories: Tổng calo mới của thực đơn
+    """
+    order = [key for key, _ in MEAL_TITLES]
+    rank = order.index(meal.meal_type) if meal.meal_type in order else len(order)
+    item_lines = [_item_line(item) for item in meal.items]
+
+    lines = []
+    current_type = None
+    found = False
+    next_meal_at = None  # vị trí tiêu đề bữa đầu tiên đứng sau bữa cần sửa
+    total = None  # (độ ưu tiên, vị trí dòng, match)
+
+    for raw_line in (content or '').split('\n'):
+        line = raw_line.strip()
+        header = match_meal_header(line)
+        if header:
+            current_type = header[0]
+            if current_type == meal.meal_type:
+                found = True
+                lines.append(raw_line)
+                lines.extend(item_lines)
+                continue
+            if next_meal_at is None and current_type in order and order.index(current_type) > rank:
+                next_meal_at = len(lines)
+        else:
+            match = match_total(line)
+            if match:
+                if total is None or match[0] < total[0]:
+                    total = (match[0], len(lines), match[1])
+            elif current_type == meal.meal_type and line.startswith(BULLETS):
+                continue
+        lines.append(raw_line)
+
+    # Dòng tổng calo mà parse_menu đọc (độ ưu tiên cao nhất, xuất hiện đầu tiên)
+    if total:
+        _, index, match = total
+        raw_line = lines[index]
+        offset = len(raw_line) - len(raw_line.lstrip())
+        start, end = match.span('value')
+        lines[index] = f"{raw_line[:offset + start]}{total_calories}{raw_line[offset + end:]}"
+
+    if not found:
+        section = [meal.title, *item_lines, '']
+        at = next_meal_at if next_meal_at is not None else (total[1] if total else len(lines))
+        lines[at:at] = section
+    return '\n'.join(lines)
+
+
+def menu_dish_names(menu):
+    """Tên các món của 1 thực đơn (từ cấu trúc đã tách, không parse lại text)"""
+    return [item.name for meal in menu.meals for item in meal.items]
@@ -0,0 +1,278 @@
+# backend/app/services/metrics.py
+import bisect
+import contextvars
+import threading
+import time
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Bộ đo metrics nhỏ gọn (không cần thư viện ngoài), xuất theo định dạng text của Prometheus.
+# Số liệu nằm trong RAM của từng worker - khi chạy nhiều worker, Prometheus scrape từng worker.
+
+# Mốc bucket mặc định (giây) cho độ trễ
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Mốc bucket cho kích thước prompt/câu trả lời (ký tự)
+SIZE_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+# Mốc bucket cho số câu SQL mỗi request
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Bộ đếm chỉ tăng, có nhãn"""
+
+    type_name = 'counter'
+
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, _format_labels(self.label_names, key), value
+
+
+class Histogram:
+    """Histogram có nhãn (bucket cộng dồn + _sum + _count)"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name, description, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items()]
+        names = self.label_names + ('le',)
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f'{self.name}_bucket', _format_labels(names, key + (_format_value(bound),)), cumulative
+            yield f'{self.name}_bucket', _format_labels(names, key + ('+Inf',)), count
+            yield f'{self.name}_sum', _format_labels(self.label_names, key), total
+            yield f'{self.name}_count', _format_labels(self.label_names, key), count
+
+
+class Gauge:
+    """Giá trị tức thời, đọc qua hàm callback lúc xuất metrics: callback() -> {(nhãn...): giá trị}"""
+
+    type_name = 'gauge'
+
+    def __init__(self, name, description, callback, labels=()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(labels)
+        self.callback = callback
+
+    def samples(self):
+        try:
+            values = self.callback()
+        except Exception as e:
+            print(f"⚠️ Lỗi đọc metric {self.name}: {e}")
+            return
+        for key, value in values.items():
+            if value is None:
+                continue
+            key = key if isinstance(key, tuple) else (key,)
+            yield self.name, _format_labels(self.label_names, key), value
+
+
+_registry = []
+
+
+def _register(metric):
+    _registry.append(metric)
+    return metric
+
+
+def counter(name, description, labels=()):
+    return _register(Counter(name, description, labels))
+
+
+def histogram(name, description, labels=(), buckets=LATENCY_BUCKETS):
+    return _register(Histogram(name, description, labels, buckets))
+
+
+def gauge(name, description, callback, labels=()):
+    return _register(Gauge(name, description, callback, labels))
+
+
+def render() -> str:
+    """Xuất toàn bộ metrics theo định dạng text của Prometheus (version 0.0.4)"""
+    lines = []
+    for metric in _registry:
+        lines.append(f'# HELP {metric.name} {metric.description}')
+        lines.append(f'# TYPE {metric.name} {metric.type_name}')
+        for name, labels, value in metric.samples():
+            lines.append(f'{name}{labels} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+# --- METRICS CHÍNH ---
+HTTP_REQUEST_SECONDS = histogram(
+    'http_request_duration_seconds', 'Thời gian xử lý request theo endpoint',
+    labels=('endpoint', 'method', 'status')
+)
+HTTP_REQUEST_DB_QUERIES = histogram(
+    'http_request_db_queries', 'Số câu SQL mỗi request theo endpoint',
+    labels=('endpoint',), buckets=COUNT_BUCKETS
+)
+HTTP_REQUEST_DB_SECONDS = histogram(
+    'http_request_db_duration_seconds', 'Tổng thời gian SQL mỗi request theo endpoint',
+    labels=('endpoint',)
+)
+DB_QUERY_SECONDS = histogram(
+    'db_query_duration_seconds', 'Thời gian từng câu SQL', labels=('statement',)
+)
+AI_CALL_SECONDS = histogram(
+    'ai_call_duration_seconds', 'Thời gian 1 lời gọi AI (gồm thử lại)',
+    labels=('provider', 'mode', 'outcome')
+)
+AI_PROMPT_CHARS = histogram(
+    'ai_prompt_chars', 'Độ dài prompt gửi tới AI (ký tự)', labels=('provider',), buckets=SIZE_BUCKETS
+)
+AI_RESPONSE_CHARS = histogram(
+    'ai_response_chars', 'Độ dài câu trả lời của AI (ký tự)', labels=('provider',), buckets=SIZE_BUCKETS
+)
+
+
+class AITiming:
+    """Tổng thời gian/số lời gọi AI của 1 request - cộng dồn được từ nhiều thread"""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self.seconds += seconds
+            self.calls += 1
+
+
+# AITiming của request hiện tại. Dùng contextvar thay vì g vì các lời gọi AI song song
+# (run_ai_tasks) chạy trong thread chỉ có app context, với bản sao contextvars của request.
+_request_ai_timing = contextvars.ContextVar('metrics_ai_timing', default=None)
+
+
+# --- GHI NHẬN TỪ CÁC MODULE KHÁC ---
+def observe_ai_call(provider, mode, outcome, seconds, prompt_chars, response_chars=None):
+    """Ghi nhận 1 lời gọi AI (gọi từ ai_service). mode: 'blocking' | 'stream'"""
+    AI_CALL_SECONDS.observe(seconds, provider=provider, mode=mode, outcome=outcome)
+    AI_PROMPT_CHARS.observe(prompt_chars, provider=provider)
+    if response_chars is not None:
+        AI_RESPONSE_CHARS.observe(response_chars, provider=provider)
+    timing = _request_ai_timing.get()
+    if timing is not None:
+        timing.add(seconds)
+
+
+def _statement_kind(statement):
+    return statement.lstrip().split(None, 1)[0].upper() if statement and statement.strip() else 'OTHER'
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('metrics_query_started')
+    if not started:
+        return
+    seconds = time.perf_counter() - started.pop()
+    DB_QUERY_SECONDS.observe(seconds, statement=_statement_kind(statement))
+    if has_request_context() and 'metrics_started' in g:
+        g.metrics_db_seconds += seconds
+        g.metrics_db_queries += 1
+
+
+# --- TÍCH HỢP VỚI FLASK ---
+def init_metrics(app):
+    """Đo thời gian mọi request, số câu SQL và gắn header Server-Timing"""
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+        g.metrics_db_seconds = 0.0
+        g.metrics_db_queries = 0
+        g.metrics_ai = AITiming()
+        g.metrics_ai_token = _request_ai_timing.set(g.metrics_ai)
+
+    @app.after_request
+    def _record_request(response):
+        if 'metrics_started' not in g:
+            return response
+        total = time.perf_counter() - g.metrics_started
+        endpoint = request.endpoint or 'not_found'
+
+        HTTP_REQUEST_SECONDS.observe(total, endpoint=endpoint, method=request.method, status=response.status_code)
+        HTTP_REQUEST_DB_QUERIES.observe(g.metrics_db_queries, endpoint=endpoint)
+        HTTP_REQUEST_DB_SECONDS.observe(g.metrics_db_seconds, endpoint=endpoint)
+
+        # Response streaming (SSE): thời gian thật chưa biết lúc này, chỉ gửi phần đã đo
+        timings = [
+            f'app;dur={total * 1000:.1f}',
+            f'db;dur={g.metrics_db_seconds * 1000:.1f};desc="{g.metrics_db_queries} queries"',
+        ]
+        if g.metrics_ai.calls:
+            timings.append(f'ai;dur={g.metrics_ai.seconds * 1000:.1f};desc="{g.metrics_ai.calls} calls"')
+        response.headers['Server-Timing'] = ', '.join(timings)
+        return response
+
+    @app.teardown_request
+    def _clear_ai_timing(exc):
+        token = g.pop('metrics_ai_token', None)
+        if token is not None:
+            try:
+                _request_ai_timing.reset(token)
+            except ValueError:
+                # teardown chạy trong context khác với before_request (vd: response streaming)
+                _request_ai_timing.set(None)
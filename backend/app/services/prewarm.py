@@ -0,0 +1,156 @@
+# backend/app/services/prewarm.py
+import threading
+import time
+from datetime import date, datetime, timedelta
+from app import db
+from app.models.user import User
+from app.models.menu import DailyMenu
+from app.services import metrics
+
+# Tạo trước thực đơn ngoài giờ cao điểm cho user hay mở dashboard, để buổi sáng
+# /api/menu/today trả ngay thực đơn đã lưu thay vì chờ AI.
+# Chạy bằng thread lịch trong process (PREWARM_ENABLED=1 - chỉ bật ở 1 process)
+# hoặc từ cron/sidecar bằng lệnh `flask prewarm-menus`.
+
+# Chỉ ghi last_seen_at tối đa 1 lần trong khoảng này (tránh UPDATE ở mọi request)
+LAST_SEEN_RESOLUTION = timedelta(minutes=15)
+
+MENU_PREWARM = metrics.counter(
+    'menu_prewarm_total', 'Số thực đơn tạo trước theo kết quả', labels=('outcome',)
+)
+MENU_TODAY_READS = metrics.counter(
+    'menu_today_reads_total',
+    'Lượt đọc thực đơn hôm nay theo nguồn (prewarmed / on_demand / missing) - tỉ lệ trúng tạo trước',
+    labels=('source',)
+)
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def touch_last_seen(user):
+    """Ghi nhận user vừa mở dashboard (dùng để chọn user cần tạo trước)"""
+    now = datetime.utcnow()
+    if user.last_seen_at and now - user.last_seen_at < LAST_SEEN_RESOLUTION:
+        return
+    try:
+        User.query.filter_by(id=user.id).update({'last_seen_at': now}, synchronize_session=False)
+        db.session.commit()
+        user.last_seen_at = now
+    except Exception as e:
+        db.session.rollback()
+        print(f"⚠️ Không thể cập nhật last_seen_at của user {user.id}: {e}")
+
+
+def record_menu_read(menu, menu_date):
+    """Đếm lượt đọc thực đơn của hôm nay theo nguồn để tính tỉ lệ trúng tạo trước"""
+    if menu_date != date.today():
+        return
+    if menu is None:
+        source = 'missing'
+    elif menu.prewarmed:
+        source = 'prewarmed'
+    else:
+        source = 'on_demand'
+    MENU_TODAY_READS.inc(source=source)
+
+
+def target_date(now=None):
+    """Ngày của buổi sáng kế tiếp: chạy sau trưa -> ngày mai, chạy lúc rạng sáng -> hôm nay"""
+    now = now or datetime.now()
+    return now.date() + timedelta(days=1) if now.hour >= 12 else now.date()
+
+
+def find_candidates(menu_date, active_days, limit=None):
+    """User có mở dashboard trong active_days ngày gần đây và chưa có thực đơn cho menu_date"""
+    since = datetime.utcnow() - timedelta(days=active_days)
+    has_menu = db.session.query(DailyMenu.user_id).filter(DailyMenu.date == menu_date)
+    query = User.query.filter(User.last_seen_at >= since, ~User.id.in_(has_menu))\
+        .order_by(User.last_seen_at.desc())
+    if limit:
+        query = query.limit(limit)
+    return query.all()
+
+
+def prewarm_menus(app, menu_date=None, budget=None):
+    """
+    Tạo trước thực đơn 1 ngày cho các user đang hoạt động, dừng khi hết ngân sách lời gọi AI.
+
+    Args:
+        menu_date: Ngày cần tạo (None -> target_date())
+        budget: Số lời gọi AI tối đa (None -> PREWARM_AI_BUDGET); thực đơn lấy từ cache không tính
+
+    Returns:
+        dict: Thống kê lượt chạy
+    """
+    from app.routes.menu_routes import generate_menu_for_user
+
+    menu_date = menu_date or target_date()
+    budget = app.config.get('PREWARM_AI_BUDGET', 200) if budget is None else budget
+    candidates = find_candidates(menu_date, app.config.get('PREWARM_ACTIVE_DAYS', 3))
+    stats = {'date': str(menu_date), 'candidates': len(candidates), 'generated': 0,
+             'cached': 0, 'failed': 0, 'over_budget': 0, 'ai_calls': 0}
+
+    for index, user in enumerate(candidates):
+        if stats['ai_calls'] >= budget:
+            stats['over_budget'] = len(candidates) - index
+            MENU_PREWARM.inc(stats['over_budget'], outcome='over_budget')
+            break
+
+        body, status = generate_menu_for_user(user, {'date': menu_date.isoformat(), 'num_days': 1})
+        if status == 429 and body.get('retry_after'):
+            # Giới hạn tần suất: chờ rồi thử lại 1 lần (lượt chạy ban đêm không vội)
+            time.sleep(body['retry_after'])
+            body, status = generate_menu_for_user(user, {'date': menu_date.isoformat(), 'num_days': 1})
+
+        if status != 200:
+            stats['failed'] += 1
+            MENU_PREWARM.inc(outcome='failed')
+            print(f"⚠️ Tạo trước thực đơn {menu_date} cho user {user.id} lỗi: {body.get('error')}")
+            continue
+
+        if body.get('cached'):
+            stats['cached'] += 1
+        elif not body.get('shared'):
+            stats['ai_calls'] += 1
+        DailyMenu.query.filter_by(user_id=user.id, date=menu_date)\
+            .update({'prewarmed': True}, synchronize_session=False)
+        db.session.commit()
+        stats['generated'] += 1
+        MENU_PREWARM.inc(outcome='generated')
+
+    return stats
+
+
+def _seconds_until(hour):
+    now = datetime.now()
+    next_run = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+
+def _scheduler_loop(app):
+    hour = app.config.get('PREWARM_HOUR', 2)
+    while True:
+        time.sleep(_seconds_until(hour))
+        with app.app_context():
+            try:
+                started = time.monotonic()
+                stats = prewarm_menus(app)
+                print(f"✅ Đã tạo trước thực đơn ({time.monotonic() - started:.0f}s): {stats}")
+            except Exception as e:
+                db.session.rollback()
+                print(f"❌ Lỗi lịch tạo trước thực đơn: {e}")
+
+
+def start_scheduler(app):
+    """Khởi động thread lịch tạo trước thực đơn hằng đêm (nếu bật PREWARM_ENABLED)"""
+    global _scheduler
+    if not app.config.get('PREWARM_ENABLED'):
+        return
+    with _scheduler_lock:
+        if _scheduler is not None and _scheduler.is_alive():
+            return
+        _scheduler = threading.Thread(target=_scheduler_loop, args=(app,), daemon=True)
+        _scheduler.start()
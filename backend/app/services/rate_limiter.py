@@ -0,0 +1,176 @@
+# backend/app/services/rate_limiter.py
+import contextvars
+import functools
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from flask import current_app, has_app_context
+from config import Config
+from app.services.ai_errors import AIRateLimitedError
+
+# Giới hạn tần suất gọi AI bằng token bucket (trong process, mỗi worker 1 bộ bucket):
+# - 1 bucket toàn cục: bảo vệ quota của upstream
+# - 1 bucket cho mỗi user: 1 người không chiếm hết quota của người khác
+# Thiếu token -> chờ trong hàng đợi có giới hạn (số người chờ + thời gian chờ tối đa),
+# vượt giới hạn -> từ chối ngay với AIRateLimitedError (HTTP 429 + Retry-After).
+# Chỉ lời gọi AI thật mới tốn token; cache hit không bị giới hạn.
+
+# User đang được phục vụ (đặt bởi user_scope/@user_scoped, None -> chỉ áp bucket toàn cục)
+_current_user_id = contextvars.ContextVar('ai_rate_user_id', default=None)
+
+
+class TokenBucket:
+    """Token bucket: tối đa `capacity` token, nạp lại `rate` token/giây. Không tự khóa"""
+
+    def __init__(self, capacity, rate):
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, now):
+        """Số giây cần chờ để có 1 token (0 nếu có sẵn)"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        if self.rate <= 0:
+            return math.inf
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        # Cho phép âm: token được "đặt trước" cho người đang chờ
+        self.tokens -= 1
+
+
+class RateLimiter:
+    """Bucket toàn cục + bucket theo user, có hàng đợi chờ giới hạn"""
+
+    def __init__(self, global_per_minute, global_burst, user_per_minute, user_burst,
+                 max_wait=10.0, max_waiters=20, max_users=10000):
+        self.global_bucket = TokenBucket(global_burst, global_per_minute / 60.0)
+        self.user_per_minute = user_per_minute
+        self.user_burst = user_burst
+        self.max_wait = max_wait
+        self.max_waiters = max_waiters
+        self.max_users = max_users
+        self._user_buckets = OrderedDict()
+        self._waiters = 0
+        self._lock = threading.Lock()
+        self._stats = {'allowed': 0, 'delayed': 0, 'rejected': 0, 'wait_seconds': 0.0}
+
+    def _user_bucket(self, user_id):
+        # Gọi khi đang giữ self._lock
+        bucket = self._user_buckets.get(user_id)
+        if bucket is None:
+            bucket = TokenBucket(self.user_burst, self.user_per_minute / 60.0)
+            self._user_buckets[user_id] = bucket
+            while len(self._user_buckets) > self.max_users:
+                self._user_buckets.popitem(last=False)
+        self._user_buckets.move_to_end(user_id)
+        return bucket
+
+    def acquire(self, user_id=None):
+        """
+        Lấy 1 lượt gọi AI, chờ nếu cần (trong giới hạn max_wait/max_waiters).
+
+        Args:
+            user_id: User gọi AI (None -> chỉ áp bucket toàn cục)
+
+        Raises:
+            AIRateLimitedError: Phải chờ quá lâu hoặc hàng đợi đã đầy
+        """
+        with self._lock:
+            now = time.monotonic()
+            buckets = [self.global_bucket]
+            if user_id is not None:
+                buckets.append(self._user_bucket(user_id))
+            wait = max(bucket.wait_time(now) for bucket in buckets)
+
+            if wait > 0 and (wait > self.max_wait or self._waiters >= self.max_waiters):
+                self._stats['rejected'] += 1
+                retry_after = max(1, math.ceil(wait)) if wait != math.inf else 60
+                raise AIRateLimitedError(
+                    f"Bạn đang gửi quá nhiều yêu cầu tới AI, vui lòng thử lại sau {retry_after} giây",
+                    retry_after=retry_after
+                )
+
+            # Đặt trước token trên tất cả bucket rồi mới chờ
+            for bucket in buckets:
+                bucket.take()
+            self._stats['allowed'] += 1
+            if wait > 0:
+                self._waiters += 1
+                self._stats['delayed'] += 1
+                self._stats['wait_seconds'] += wait
+
+        if wait > 0:
+            try:
+                time.sleep(wait)
+            finally:
+                with self._lock:
+                    self._waiters -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                'waiting': self._waiters,
+                'tracked_users': len(self._user_buckets),
+                'global_tokens': round(self.global_bucket.tokens, 2),
+            }
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> RateLimiter:
+    """Lấy rate limiter dùng chung của process (khởi tạo theo cấu hình ở lần gọi đầu)"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                config = current_app.config if has_app_context() else {
+                    key: getattr(Config, key) for key in dir(Config) if key.isupper()
+                }
+                _limiter = RateLimiter(
+                    global_per_minute=config.get('AI_RATE_GLOBAL_PER_MINUTE', 60),
+                    global_burst=config.get('AI_RATE_GLOBAL_BURST', 20),
+                    user_per_minute=config.get('AI_RATE_USER_PER_MINUTE', 6),
+                    user_burst=config.get('AI_RATE_USER_BURST', 10),
+                    max_wait=config.get('AI_RATE_MAX_WAIT', 10),
+                    max_waiters=config.get('AI_RATE_MAX_WAITERS', 20)
+                )
+    return _limiter
+
+
+def acquire():
+    """Lấy 1 lượt gọi AI cho user hiện tại (xem user_scope). Gọi ngay trước khi gọi AI thật"""
+    if has_app_context() and not current_app.config.get('AI_RATE_LIMIT_ENABLED', True):
+        return
+    get_limiter().acquire(_current_user_id.get())
+
+
+@contextmanager
+def user_scope(user_id):
+    """Tính các lời gọi AI bên trong khối `with` vào bucket của user_id"""
+    token = _current_user_id.set(user_id)
+    try:
+        yield
+    finally:
+        _current_user_id.reset(token)
+
+
+def user_scoped(fn):
+    """Decorator cho hàm nhận `user` làm tham số đầu: lời gọi AI bên trong tính cho user đó"""
+    @functools.wraps(fn)
+    def wrapper(user, *args, **kwargs):
+        with user_scope(user.id):
+            return fn(user, *args, **kwargs)
+    return wrapper
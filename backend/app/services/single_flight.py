@@ -0,0 +1,311 @@
+# backend/app/services/single_flight.py
+import os
+import socket
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.menu_claim import MenuGenerationClaim
+
+# Single-flight cho việc tạo thực đơn theo (user_id, ngày):
+# - Trong 1 process: map (user_id, ngày) -> Future, request đến sau chờ Future của request đầu
+# - Giữa các worker/process: giữ quyền bằng 1 dòng trong bảng menu_generation_claims
+#   (khóa chính user_id + date), worker khác thấy dòng đó thì chờ đến khi nó bị xóa
+# Request chờ nhận đúng kết quả của request đang chạy (cùng process) hoặc đọc lại
+# thực đơn đã lưu trong DB (khác process).
+# Tạo nhiều ngày (begin_many): claim cả kế hoạch bằng 1 INSERT nhiều dòng + 1 SELECT,
+# nhả bằng 1 DELETE khi kế hoạch kết thúc (worker khác chờ đến lúc đó).
+
+_flights = {}
+_lock = threading.Lock()
+
+
+def _owner_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class Flight:
+    """
+    1 lượt tạo thực đơn cho (user_id, ngày).
+
+    leader=True: request này được quyền gọi AI, phải gọi finish()/fail() (hoặc dùng `with`)
+    leader=False: request khác đang tạo, gọi wait() để lấy kết quả
+    """
+
+    def __init__(self, key, future, leader, claimed=False):
+        self.key = key
+        self.leader = leader
+        self._future = future
+        self._claimed = claimed
+        self._done = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self._done:
+            self.fail(exc if isinstance(exc, Exception) else RuntimeError("Tạo thực đơn bị gián đoạn"))
+        return False
+
+    def finish(self, result=None):
+        """Leader xong: chia sẻ kết quả cho các request đang chờ và nhả quyền (None -> người chờ đọc DB)"""
+        self._close(result=result)
+
+    def fail(self, error):
+        """Leader lỗi: các request đang chờ (cùng process) nhận cùng lỗi"""
+        self._close(error=error)
+
+    def _close(self, result=None, error=None):
+        if self._done:
+            return
+        self._done = True
+        if self._claimed:
+            _release_claim(*self.key)
+        with _lock:
+            if _flights.get(self.key) is self._future:
+                del _flights[self.key]
+        if error is not None:
+            self._future.set_exception(error)
+        else:
+            self._future.set_result(result)
+
+    def wait(self, timeout):
+        """
+        Chờ request đang tạo xong.
+
+        Returns:
+            Kết quả leader truyền vào finish(), hoặc None nếu leader ở process khác
+            (hoặc không có kết quả) -> caller đọc lại DB
+
+        Raises:
+            TimeoutError: Quá thời gian chờ
+            Exception: Lỗi của leader (cùng process)
+        """
+        if self._claimed is None:
+            # Leader ở process khác: process này đại diện chờ dòng claim bị xóa
+            # rồi báo cho các request khác trong process (đang chờ Future)
+            try:
+                _wait_claim_released(*self.key, timeout=timeout)
+            finally:
+                self._claimed = False
+                self._close(result=None)
+        return self._future.result(timeout=timeout)
+
+
+def begin(user_id, menu_date) -> Flight:
+    """
+    Bắt đầu (hoặc tham gia) lượt tạo thực đơn cho (user_id, menu_date).
+
+    Returns:
+        Flight: leader=True nếu request này được quyền tạo
+    """
+    key = (user_id, menu_date)
+    with _lock:
+        future = _flights.get(key)
+        if future is not None:
+            return Flight(key, future, leader=False)
+        future = Future()
+        _flights[key] = future
+
+    try:
+        claimed = _claim(user_id, menu_date)
+    except Exception as e:
+        with _lock:
+            _flights.pop(key, None)
+        future.set_exception(e)
+        raise
+
+    if claimed:
+        return Flight(key, future, leader=True, claimed=True)
+    # Worker khác đang giữ quyền -> chờ (claimed=None đánh dấu phải poll DB)
+    return Flight(key, future, leader=False, claimed=None)
+
+
+class FlightPlan:
+    """
+    Lượt tạo thực đơn nhiều ngày của 1 user: flights = {ngày: Flight} (như begin() từng ngày)
+    nhưng claim giữa các worker được giữ cho cả kế hoạch và nhả 1 lần trong close().
+    Dùng `with` (hoặc gọi close()): ngày leader chưa xong -> finish() (người chờ đọc lại DB).
+    """
+
+    def __init__(self, user_id, flights, claimed_dates):
+        self.user_id = user_id
+        self.flights = flights
+        self._claimed_dates = claimed_dates
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        for flight in self.flights.values():
+            if flight.leader:
+                flight.finish()
+        if self._claimed_dates:
+            _release_claims(self.user_id, self._claimed_dates)
+            self._claimed_dates = []
+
+
+def begin_many(user_id, dates) -> FlightPlan:
+    """
+    Bắt đầu (hoặc tham gia) lượt tạo thực đơn cho nhiều ngày của 1 user.
+
+    Returns:
+        FlightPlan: flights[ngày].leader=True nếu request này được quyền tạo ngày đó
+    """
+    flights = {}
+    futures = {}  # ngày chưa có request nào trong process đang tạo -> cần claim DB
+    with _lock:
+        for menu_date in dates:
+            key = (user_id, menu_date)
+            future = _flights.get(key)
+            if future is not None:
+                flights[menu_date] = Flight(key, future, leader=False)
+                continue
+            future = Future()
+            _flights[key] = future
+            futures[menu_date] = future
+
+    try:
+        won = _claim_many(user_id, list(futures))
+    except Exception as e:
+        with _lock:
+            for menu_date in futures:
+                _flights.pop((user_id, menu_date), None)
+        for future in futures.values():
+            future.set_exception(e)
+        raise
+
+    for menu_date, future in futures.items():
+        key = (user_id, menu_date)
+        if menu_date in won:
+            # Claim thuộc kế hoạch (claimed=False): FlightPlan.close() nhả chung 1 lần
+            flights[menu_date] = Flight(key, future, leader=True)
+        else:
+            flights[menu_date] = Flight(key, future, leader=False, claimed=None)
+    return FlightPlan(user_id, {menu_date: flights[menu_date] for menu_date in dates}, sorted(won))
+
+
+def _claim(user_id, menu_date):
+    """Thêm dòng claim cho (user_id, ngày). Trả về False nếu worker khác đang giữ"""
+    for _ in range(2):
+        try:
+            db.session.add(MenuGenerationClaim(
+                user_id=user_id,
+                date=menu_date,
+                owner=_owner_id(),
+                claimed_at=datetime.utcnow()
+            ))
+            db.session.commit()
+            return True
+        except IntegrityError:
+            db.session.rollback()
+
+        # Claim quá cũ (worker chết giữa chừng) -> xóa rồi thử lại 1 lần
+        stale_before = datetime.utcnow() - timedelta(seconds=current_app.config.get('SINGLE_FLIGHT_STALE_SECONDS', 180))
+        removed = MenuGenerationClaim.query.filter(
+            MenuGenerationClaim.user_id == user_id,
+            MenuGenerationClaim.date == menu_date,
+            MenuGenerationClaim.claimed_at < stale_before
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        if not removed:
+            return False
+    return False
+
+
+def _dialect_insert(table):
+    dialect = postgresql if db.session.get_bind().dialect.name == 'postgresql' else sqlite
+    return dialect.insert(table)
+
+
+def _insert_claims(user_id, dates, claimed_at):
+    """1 INSERT nhiều dòng (bỏ qua ngày đã có claim) + 1 SELECT -> các ngày vừa giành được"""
+    owner = _owner_id()
+    db.session.execute(_dialect_insert(MenuGenerationClaim.__table__).values([
+        {'user_id': user_id, 'date': menu_date, 'owner': owner, 'claimed_at': claimed_at}
+        for menu_date in dates
+    ]).on_conflict_do_nothing())
+    won = {
+        menu_date for (menu_date,) in db.session.query(MenuGenerationClaim.date).filter(
+            MenuGenerationClaim.user_id == user_id,
+            MenuGenerationClaim.date.in_(dates),
+            MenuGenerationClaim.owner == owner,
+            MenuGenerationClaim.claimed_at == claimed_at
+        )
+    }
+    db.session.commit()
+    return won
+
+
+def _claim_many(user_id, dates):
+    """Claim nhiều ngày của 1 user. Trả về tập ngày giành được (ngày worker khác đang giữ thì không)"""
+    if not dates:
+        return set()
+    claimed_at = datetime.utcnow()
+    won = _insert_claims(user_id, dates, claimed_at)
+    lost = [menu_date for menu_date in dates if menu_date not in won]
+    if not lost:
+        return won
+
+    # Claim quá cũ (worker chết giữa chừng) -> xóa rồi thử lại 1 lần
+    stale_before = datetime.utcnow() - timedelta(seconds=current_app.config.get('SINGLE_FLIGHT_STALE_SECONDS', 180))
+    removed = MenuGenerationClaim.query.filter(
+        MenuGenerationClaim.user_id == user_id,
+        MenuGenerationClaim.date.in_(lost),
+        MenuGenerationClaim.claimed_at < stale_before
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    if removed:
+        won |= _insert_claims(user_id, lost, claimed_at)
+    return won
+
+
+def _release_claim(user_id, menu_date):
+    try:
+        db.session.rollback()
+        MenuGenerationClaim.query.filter_by(
+            user_id=user_id, date=menu_date, owner=_owner_id()
+        ).delete(synchronize_session=False)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"⚠️ Không thể nhả claim tạo thực đơn ({user_id}, {menu_date}): {e}")
+
+
+def _release_claims(user_id, dates):
+    try:
+        db.session.rollback()
+        MenuGenerationClaim.query.filter(
+            MenuGenerationClaim.user_id == user_id,
+            MenuGenerationClaim.date.in_(dates),
+            MenuGenerationClaim.owner == _owner_id()
+        ).delete(synchronize_session=False)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"⚠️ Không thể nhả claim tạo thực đơn ({user_id}, {len(dates)} ngày): {e}")
+
+
+def _wait_claim_released(user_id, menu_date, timeout):
+    deadline = time.monotonic() + timeout
+    interval = current_app.config.get('SINGLE_FLIGHT_POLL_INTERVAL', 0.5)
+    while True:
+        # Kết thúc transaction hiện tại để lần đọc sau thấy dữ liệu mới nhất
+        db.session.rollback()
+        active = db.session.query(MenuGenerationClaim.user_id).filter_by(
+            user_id=user_id, date=menu_date
+        ).first()
+        if active is None:
+            return
+        if time.monotonic() >= deadline:
+            raise TimeoutError("Hết thời gian chờ request khác tạo thực đơn")
+        time.sleep(interval)
+
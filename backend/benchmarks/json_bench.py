@@ -0,0 +1,113 @@
+# backend/benchmarks/json_bench.py
+"""
+Benchmark JSON provider của app (app/services/json_provider.py) so với provider mặc định của Flask.
+
+Chạy từ thư mục backend:
+    python benchmarks/json_bench.py
+    python benchmarks/json_bench.py --rows 1000 --rounds 200
+
+Payload mô phỏng 2 API:
+- /api/menu/all: danh sách {date, content, calories} (content lấy từ menu_corpus.json)
+- /api/weight/history: Row (id, weight, recorded_at) của SQLAlchemy
+  + cách cũ: dựng dict + isoformat() rồi jsonify bằng json stdlib
+  + cách mới: jsonify thẳng danh sách Row
+Kiểm tra 2 cách cho ra cùng dữ liệu JSON, in thời gian / lượt và tỉ lệ tăng tốc.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sqlalchemy as sa  # noqa: E402
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+from app.services.json_provider import FastJSONProvider, orjson  # noqa: E402
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'menu_corpus.json')
+
+
+def menus_payload(rows):
+    with open(CORPUS_PATH, 'r', encoding='utf-8') as f:
+        contents = [sample['content'] for sample in json.load(f)]
+    start = date(2025, 1, 1)
+    menus = [
+        {'date': str(start + timedelta(days=i)), 'content': contents[i % len(contents)], 'calories': 1800 + i % 400}
+        for i in range(rows)
+    ]
+    return {'menus': menus, 'count': len(menus)}
+
+
+def weight_rows(rows):
+    """Row thật của SQLAlchemy (SQLite trong RAM)"""
+    engine = sa.create_engine('sqlite://')
+    metadata = sa.MetaData()
+    logs = sa.Table(
+        'weight_logs', metadata,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('weight', sa.Float),
+        sa.Column('recorded_at', sa.DateTime),
+    )
+    metadata.create_all(engine)
+    start = datetime(2025, 1, 1, 7, 30)
+    with engine.begin() as conn:
+        conn.execute(logs.insert(), [
+            {'weight': 70 - i * 0.05, 'recorded_at': start + timedelta(days=i, seconds=i)} for i in range(rows)
+        ])
+        return conn.execute(sa.select(logs.c.id, logs.c.weight, logs.c.recorded_at).order_by(logs.c.id)).all()
+
+
+def history_dicts(rows):
+    """Cách cũ của /weight/history: dựng dict cho từng bản ghi"""
+    return {'history': [
+        {'id': row.id, 'weight': row.weight, 'recorded_at': row.recorded_at.isoformat()} for row in rows
+    ]}
+
+
+def timed(fn, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - started) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark JSON provider')
+    parser.add_argument('--rows', type=int, default=365, help='Số thực đơn / bản ghi cân nặng mỗi payload')
+    parser.add_argument('--rounds', type=int, default=300, help='Số lần encode mỗi trường hợp')
+    args = parser.parse_args()
+
+    if orjson is None:
+        print("⚠️ Chưa cài orjson - FastJSONProvider đang dùng json stdlib, kết quả sẽ không khác biệt")
+
+    app = Flask(__name__)
+    stdlib = DefaultJSONProvider(app)
+    fast = FastJSONProvider(app)
+
+    menus = menus_payload(args.rows)
+    rows = weight_rows(args.rows)
+    cases = [
+        ('/api/menu/all', lambda: stdlib.response(menus), lambda: fast.response(menus)),
+        ('/api/weight/history', lambda: stdlib.response(history_dicts(rows)), lambda: fast.response({'history': rows})),
+    ]
+
+    failed = False
+    with app.app_context():
+        for name, old, new in cases:
+            old_body, new_body = old().get_data(), new().get_data()
+            if json.loads(old_body) != json.loads(new_body):
+                print(f"❌ {name}: JSON khác nhau giữa 2 provider")
+                failed = True
+                continue
+            old_time, new_time = timed(old, args.rounds), timed(new, args.rounds)
+            print(f"⏱️ {name} ({args.rows} dòng, {len(new_body) / 1024:.0f} KB): "
+                  f"stdlib {old_time * 1000:.2f} ms, nhanh {new_time * 1000:.2f} ms -> x{old_time / new_time:.1f}")
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+# backend/benchmarks/menu_parser_bench.py
+"""
+Benchmark bộ đọc thực đơn (app/services/menu_parser.py) trên bộ mẫu câu trả lời AI đã ghi lại.
+
+Chạy từ thư mục backend:
+    python benchmarks/menu_parser_bench.py
+    python benchmarks/menu_parser_bench.py --rounds 5000 --min-per-sec 20000
+
+- Kiểm tra kết quả đọc của từng mẫu (bữa, số món, tổng calo) khớp giá trị mong đợi
+- Đo số thực đơn đọc được mỗi giây (không dùng cache của parse_menu)
+Trả về exit code 1 nếu sai kết quả hoặc tốc độ thấp hơn --min-per-sec.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.menu_parser import parse_menu  # noqa: E402
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'menu_corpus.json')
+
+
+def check_corpus(corpus):
+    """So kết quả đọc với giá trị mong đợi. Trả về danh sách lỗi"""
+    errors = []
+    for sample in corpus:
+        parsed = parse_menu.__wrapped__(sample['content'])
+        expected = sample['expected']
+        actual = {
+            'meals': [meal.meal_type for meal in parsed.meals],
+            'dishes': len(parsed.dishes),
+            'total': parsed.total_calories
+        }
+        if actual != expected:
+            errors.append(f"{sample['name']}: mong đợi {expected}, nhận {actual}")
+    return errors
+
+
+def run_benchmark(corpus, rounds):
+    """Đọc toàn bộ corpus `rounds` lần, trả về số thực đơn/giây"""
+    contents = [sample['content'] for sample in corpus]
+    parse = parse_menu.__wrapped__  # bỏ qua lru_cache để đo đúng chi phí đọc
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for content in contents:
+            parse(content)
+    elapsed = time.perf_counter() - started
+    return rounds * len(contents) / elapsed, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark bộ đọc thực đơn')
+    parser.add_argument('--rounds', type=int, default=2000, help='Số lần đọc toàn bộ corpus')
+    parser.add_argument('--min-per-sec', type=float, default=0, help='Ngưỡng tối thiểu (thực đơn/giây)')
+    args = parser.parse_args()
+
+    with open(CORPUS_PATH, 'r', encoding='utf-8') as f:
+        corpus = json.load(f)
+
+    errors = check_corpus(corpus)
+    for error in errors:
+        print(f"❌ {error}")
+    if not errors:
+        print(f"✅ {len(corpus)} mẫu đọc đúng")
+
+    per_sec, elapsed = run_benchmark(corpus, args.rounds)
+    print(f"⏱️ {args.rounds * len(corpus)} lượt đọc trong {elapsed:.2f}s -> {per_sec:,.0f} thực đơn/giây")
+
+    if args.min_per_sec and per_sec < args.min_per_sec:
+        print(f"❌ Chậm hơn ngưỡng {args.min_per_sec:,.0f} thực đơn/giây")
+        return 1
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+# backend/benchmarks/menu_search_bench.py
+"""
+Benchmark tìm kiếm thực đơn (app/services/menu_search.py) trên SQLite FTS5.
+
+Chạy từ thư mục backend:
+    python benchmarks/menu_search_bench.py
+    python benchmarks/menu_search_bench.py --menus 1000000 --max-ms 50
+
+- Dựng chỉ mục menu_search cho --menus thực đơn giả (món lấy từ danh mục món mặc định,
+  365 thực đơn / user) trong file SQLite tạm
+- Đo thời gian tìm của user (/api/menu/search) và của admin (mọi user) với từ khóa có/không dấu
+Trả về exit code 1 nếu p95 của trường hợp nào chậm hơn --max-ms.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from app import db  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.models.menu import DailyMenu  # noqa: E402
+from app.services.dish_catalog import DEFAULT_DISHES  # noqa: E402
+from app.services.menu_search import ensure_search_index, index_rows, search_terms, _match_ids  # noqa: E402
+
+MENUS_PER_USER = 365
+QUERIES = ['phở bò', 'pho', 'bun bo hue', 'cá kho', 'đậu', 'xoi ga', 'com tam suon', 'chao', 'thịt nướng', 'trứng']
+
+
+def fake_menu(rng):
+    dishes = rng.sample(DEFAULT_DISHES, 8)
+    lines = []
+    for title, part in (('Bữa sáng 🌅', dishes[:2]), ('Bữa trưa 🌞', dishes[2:5]), ('Bữa tối 🌙', dishes[5:])):
+        lines.append(title)
+        lines.extend(f"- {name} ({portion}{unit}) - {kcal} kcal" for name, _, _, portion, unit, kcal, *_ in part)
+        lines.append('')
+    lines.append(f"Tổng calo: {sum(dish[5] for dish in dishes)} kcal")
+    return '\n'.join(lines)
+
+
+def build_index(total, rng, batch_size=10000):
+    start = date(2020, 1, 1)
+    for offset in range(0, total, batch_size):
+        index_rows([
+            (menu_id, menu_id // MENUS_PER_USER + 1, start + timedelta(days=menu_id % MENUS_PER_USER), fake_menu(rng))
+            for menu_id in range(offset + 1, min(offset + batch_size, total) + 1)
+        ])
+        db.session.commit()
+
+
+def timed(fn, rounds):
+    times = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+    times.sort()
+    return times[len(times) // 2], times[int(len(times) * 0.95)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark tìm kiếm thực đơn (FTS5)')
+    parser.add_argument('--menus', type=int, default=200000, help='Số thực đơn trong chỉ mục')
+    parser.add_argument('--rounds', type=int, default=50, help='Số lần tìm mỗi trường hợp')
+    parser.add_argument('--max-ms', type=float, default=50, help='Ngưỡng p95 (ms)')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmp, 'search.db')}"
+        db.init_app(app)
+        with app.app_context():
+            # Chỉ cần bảng daily_menus (trigger của chỉ mục) và users (khóa ngoại của nó)
+            db.metadata.create_all(db.engine, tables=[User.__table__, DailyMenu.__table__])
+            ensure_search_index()
+
+            started = time.perf_counter()
+            build_index(args.menus, rng)
+            print(f"⏳ Dựng chỉ mục {args.menus} thực đơn: {time.perf_counter() - started:.1f}s")
+
+            users = max(1, args.menus // MENUS_PER_USER)
+            failed = False
+            for q in QUERIES:
+                terms = search_terms(q)
+                user_p50, user_p95 = timed(lambda: _match_ids(terms, rng.randint(1, users), 20), args.rounds)
+                admin_p50, admin_p95 = timed(lambda: _match_ids(terms, None, 1000), args.rounds)
+                print(f"⏱️ '{q}': user p50 {user_p50:.2f} ms / p95 {user_p95:.2f} ms, "
+                      f"admin p50 {admin_p50:.2f} ms / p95 {admin_p95:.2f} ms")
+                if max(user_p95, admin_p95) > args.max_ms:
+                    print(f"❌ '{q}': chậm hơn {args.max_ms} ms")
+                    failed = True
+            db.session.remove()
+            db.engine.dispose()
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,6 +3,8 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+basedir = os.path.abspath(os.path.dirname(__file__))
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-key'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
@@ -13,3 +15,64 @@ class Config:
     SESSION_COOKIE_SECURE = False  # False for HTTP (development)
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_NAME = 'session'
+
+    # Cache câu trả lời AI (LRU + TTL trong RAM, tầng đĩa SQLite còn sau khi khởi động lại)
+    AI_CACHE_MAX_ENTRIES = int(os.environ.get('AI_CACHE_MAX_ENTRIES', 512))
+    AI_CACHE_TTL = int(os.environ.get('AI_CACHE_TTL', 6 * 3600))  # giây
+    AI_CACHE_DISK_ENABLED = os.environ.get('AI_CACHE_DISK_ENABLED', '1') == '1'
+    AI_CACHE_PATH = os.environ.get('AI_CACHE_PATH') or os.path.join(basedir, 'instance', 'ai_cache.sqlite3')
+
+    # Số lời gọi AI song song tối đa cho mỗi request tạo thực đơn nhiều ngày
+    AI_MAX_CONCURRENCY = int(os.environ.get('AI_MAX_CONCURRENCY', 3))
+
+    # Chế độ tạo thực đơn mặc định: 'batch' (1 lời gọi AI cho cả kế hoạch), 'per_day'
+    # hoặc 'local' (bộ giải cục bộ từ danh mục món, không gọi AI)
+    MENU_GENERATION_MODE = os.environ.get('MENU_GENERATION_MODE', 'batch')
+    # Lệnh `flask pregenerate-menus`: số user xử lý song song
+    PREGENERATE_WORKERS = int(os.environ.get('PREGENERATE_WORKERS', 4))
+
+    # Tạo trước thực đơn ban đêm cho user hay mở dashboard (chỉ bật ở 1 process, hoặc dùng `flask prewarm-menus` từ cron)
+    PREWARM_ENABLED = os.environ.get('PREWARM_ENABLED', '0') == '1'
+    PREWARM_HOUR = int(os.environ.get('PREWARM_HOUR', 2))  # giờ chạy (giờ máy chủ)
+    PREWARM_ACTIVE_DAYS = int(os.environ.get('PREWARM_ACTIVE_DAYS', 3))  # user mở dashboard trong N ngày gần đây
+    PREWARM_AI_BUDGET = int(os.environ.get('PREWARM_AI_BUDGET', 200))  # số lời gọi AI tối đa mỗi đêm
+
+    # Hàng đợi job tạo thực đơn chạy nền (bảng menu_jobs)
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))  # số worker thread mỗi process
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))  # hết lượt -> dead letter
+    JOB_RETRY_BASE_SECONDS = float(os.environ.get('JOB_RETRY_BASE_SECONDS', 5))
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 2))
+    JOB_STALE_SECONDS = int(os.environ.get('JOB_STALE_SECONDS', 600))  # job 'running' quá lâu -> chạy lại
+
+    # Backend AI: 'gemini' (Google Gemini qua REST) hoặc 'local' (offline, tất định - dùng cho dev/test/load-test)
+    AI_PROVIDER = os.environ.get('AI_PROVIDER', 'gemini')
+    GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
+    GEMINI_MODEL = os.environ.get('GEMINI_MODEL', 'models/gemma-3-1b-it')
+    AI_HTTP_POOL_SIZE = int(os.environ.get('AI_HTTP_POOL_SIZE', 10))  # kết nối keep-alive tới Gemini mỗi worker
+    AI_LOCAL_LATENCY_MS = int(os.environ.get('AI_LOCAL_LATENCY_MS', 0))  # độ trễ giả lập của backend local
+    AI_LOCAL_LATENCY_JITTER_MS = int(os.environ.get('AI_LOCAL_LATENCY_JITTER_MS', 0))
+
+    # Giới hạn tần suất gọi AI (token bucket trong mỗi worker): toàn cục + theo user
+    AI_RATE_LIMIT_ENABLED = os.environ.get('AI_RATE_LIMIT_ENABLED', '1') == '1'
+    AI_RATE_GLOBAL_PER_MINUTE = float(os.environ.get('AI_RATE_GLOBAL_PER_MINUTE', 60))
+    AI_RATE_GLOBAL_BURST = int(os.environ.get('AI_RATE_GLOBAL_BURST', 20))
+    AI_RATE_USER_PER_MINUTE = float(os.environ.get('AI_RATE_USER_PER_MINUTE', 6))
+    AI_RATE_USER_BURST = int(os.environ.get('AI_RATE_USER_BURST', 10))
+    AI_RATE_MAX_WAIT = float(os.environ.get('AI_RATE_MAX_WAIT', 10))  # chờ lâu hơn -> 429 + Retry-After
+    AI_RATE_MAX_WAITERS = int(os.environ.get('AI_RATE_MAX_WAITERS', 20))  # số lời gọi được xếp hàng chờ
+    MENU_MAX_DAYS = int(os.environ.get('MENU_MAX_DAYS', 14))  # số ngày tối đa mỗi lần POST /generate
+    MENU_VARIETY_DAYS = int(os.environ.get('MENU_VARIETY_DAYS', 3))  # tránh lặp món đã dùng trong N ngày gần đây
+    MENU_SEARCH_ADMIN_LIMIT = int(os.environ.get('MENU_SEARCH_ADMIN_LIMIT', 1000))  # số kết quả tối đa khi admin tìm thực đơn
+
+    # Single-flight tạo thực đơn theo (user, ngày): request trùng chờ kết quả của request đang chạy
+    SINGLE_FLIGHT_WAIT_SECONDS = float(os.environ.get('SINGLE_FLIGHT_WAIT_SECONDS', 90))
+    SINGLE_FLIGHT_STALE_SECONDS = int(os.environ.get('SINGLE_FLIGHT_STALE_SECONDS', 180))  # claim cũ hơn -> coi như worker đã chết
+    SINGLE_FLIGHT_POLL_INTERVAL = float(os.environ.get('SINGLE_FLIGHT_POLL_INTERVAL', 0.5))
+
+    # Nén response JSON/text/static (brotli nếu đã cài gói brotli, không thì gzip)
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', '1') == '1'
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))  # byte - nhỏ hơn thì gửi nguyên
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+
+    # Cho phép đọc /metrics từ máy khác (mặc định chỉ localhost)
+    METRICS_ALLOW_REMOTE = os.environ.get('METRICS_ALLOW_REMOTE', '0') == '1'
@@ -90,9 +90,18 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # menu_search (FTS5 + bảng phụ của nó / tsvector) do app/services/menu_search.py quản lý,
+    # không có trong metadata -> autogenerate bỏ qua thay vì sinh lệnh drop_table
+    def include_name(name, type_, parent_names):
+        if type_ == 'table':
+            return not (name or '').startswith('menu_search')
+        return True
+
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    if conf_args.get("include_name") is None:
+        conf_args["include_name"] = include_name
 
     connectable = get_engine()
 
@@ -0,0 +1,56 @@
+"""Add menu_jobs table for background menu generation
+
+Revision ID: 3f1c2a7d9b10
+Revises: 90a0385ded17
+Create Date: 2026-10-18 08:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a7d9b10'
+down_revision = '90a0385ded17'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    # `flask db upgrade` chạy create_app() -> db.create_all() đã tạo sẵn bảng mới theo model
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if _has_table('menu_jobs'):
+        return
+
+    op.create_table('menu_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=30), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('run_after', sa.DateTime(), nullable=False),
+    sa.Column('locked_by', sa.String(length=100), nullable=True),
+    sa.Column('total_days', sa.Integer(), nullable=True),
+    sa.Column('progress', sa.Text(), nullable=True),
+    sa.Column('result', sa.Text(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('menu_jobs', schema=None) as batch_op:
+        batch_op.create_index('ix_menu_jobs_status_run_after', ['status', 'run_after'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('menu_jobs', schema=None) as batch_op:
+        batch_op.drop_index('ix_menu_jobs_status_run_after')
+
+    op.drop_table('menu_jobs')
@@ -0,0 +1,39 @@
+"""Add menu_generation_claims table for single-flight menu generation
+
+Revision ID: 7b2e4c91d5a3
+Revises: 3f1c2a7d9b10
+Create Date: 2026-10-18 10:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b2e4c91d5a3'
+down_revision = '3f1c2a7d9b10'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    # `flask db upgrade` chạy create_app() -> db.create_all() đã tạo sẵn bảng mới theo model
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if _has_table('menu_generation_claims'):
+        return
+
+    op.create_table('menu_generation_claims',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('owner', sa.String(length=100), nullable=False),
+    sa.Column('claimed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'date')
+    )
+
+
+def downgrade():
+    op.drop_table('menu_generation_claims')
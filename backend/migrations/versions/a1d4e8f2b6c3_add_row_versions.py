@@ -0,0 +1,33 @@
+"""Add version column to daily_menus and weight_logs (ETag)
+
+Revision ID: a1d4e8f2b6c3
+Revises: f3c7d9e5a2b1
+Create Date: 2026-10-18 19:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1d4e8f2b6c3'
+down_revision = 'f3c7d9e5a2b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Dòng cũ nhận version 0; lần ghi tiếp theo sẽ đặt version mới (micro-giây hiện tại)
+    with op.batch_alter_table('daily_menus', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'))
+
+    with op.batch_alter_table('weight_logs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('weight_logs', schema=None) as batch_op:
+        batch_op.drop_column('version')
+
+    with op.batch_alter_table('daily_menus', schema=None) as batch_op:
+        batch_op.drop_column('version')
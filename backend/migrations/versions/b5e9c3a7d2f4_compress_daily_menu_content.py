@@ -0,0 +1,75 @@
+"""Store daily_menus.content compressed (zlib)
+
+Revision ID: b5e9c3a7d2f4
+Revises: a1d4e8f2b6c3
+Create Date: 2026-10-18 20:10:00.000000
+
+"""
+import zlib
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e9c3a7d2f4'
+down_revision = 'a1d4e8f2b6c3'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+COMPRESSION_LEVEL = 6
+
+menus = sa.table(
+    'daily_menus',
+    sa.column('id', sa.Integer),
+    sa.column('content', sa.Text),
+    sa.column('content_compressed', sa.LargeBinary),
+)
+
+
+def _copy(bind, source, target, convert):
+    """Chép source -> target theo lô (keyset theo id) để không tải cả bảng vào RAM"""
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(menus.c.id, menus.c[source])
+            .where(menus.c.id > last_id)
+            .order_by(menus.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        bind.execute(
+            menus.update().where(menus.c.id == sa.bindparam('row_id')).values({target: sa.bindparam('value')}),
+            [{'row_id': row_id, 'value': convert(value or '')} for row_id, value in rows]
+        )
+        last_id = rows[-1][0]
+
+
+def upgrade():
+    with op.batch_alter_table('daily_menus', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_compressed', sa.LargeBinary(), nullable=True))
+
+    _copy(op.get_bind(), 'content', 'content_compressed',
+          lambda text: zlib.compress(text.encode('utf-8'), COMPRESSION_LEVEL))
+
+    with op.batch_alter_table('daily_menus', schema=None) as batch_op:
+        batch_op.drop_column('content')
+        batch_op.alter_column('content_compressed', new_column_name='content',
+                              existing_type=sa.LargeBinary(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('daily_menus', schema=None) as batch_op:
+        batch_op.alter_column('content', new_column_name='content_compressed',
+                              existing_type=sa.LargeBinary(), nullable=True)
+
+    with op.batch_alter_table('daily_menus', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content', sa.Text(), nullable=True))
+
+    _copy(op.get_bind(), 'content_compressed', 'content',
+          lambda data: zlib.decompress(data).decode('utf-8') if data else '')
+
+    with op.batch_alter_table('daily_menus', schema=None) as batch_op:
+        batch_op.drop_column('content_compressed')
+        batch_op.alter_column('content', existing_type=sa.Text(), nullable=False)
@@ -0,0 +1,47 @@
+"""Add dishes table (local Vietnamese dish catalog)
+
+Revision ID: c4d8e2f1a6b7
+Revises: 7b2e4c91d5a3
+Create Date: 2026-10-18 13:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d8e2f1a6b7'
+down_revision = '7b2e4c91d5a3'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    # `flask db upgrade` chạy create_app() -> db.create_all() đã tạo sẵn bảng mới theo model
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if _has_table('dishes'):
+        return
+
+    op.create_table('dishes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.Column('meal_types', sa.String(length=50), nullable=False),
+    sa.Column('category', sa.String(length=20), nullable=False),
+    sa.Column('portion_size', sa.Integer(), nullable=False),
+    sa.Column('unit', sa.String(length=10), nullable=False),
+    sa.Column('calories', sa.Integer(), nullable=False),
+    sa.Column('protein', sa.Float(), nullable=True),
+    sa.Column('carbs', sa.Float(), nullable=True),
+    sa.Column('fat', sa.Float(), nullable=True),
+    sa.Column('allergens', sa.String(length=200), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('dishes')
@@ -0,0 +1,43 @@
+"""Add menu_search full-text index (SQLite FTS5 / PostgreSQL tsvector + GIN)
+
+Existing menus are indexed with `flask rebuild-search-index` after upgrading.
+
+Revision ID: c7a2f5d8e3b9
+Revises: b5e9c3a7d2f4
+Create Date: 2026-10-18 21:30:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7a2f5d8e3b9'
+down_revision = 'b5e9c3a7d2f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            "CREATE TABLE IF NOT EXISTS menu_search ("
+            "menu_id INTEGER PRIMARY KEY REFERENCES daily_menus(id) ON DELETE CASCADE, "
+            "user_id INTEGER NOT NULL, date DATE NOT NULL, body TEXT NOT NULL, tsv TSVECTOR NOT NULL)"
+        )
+        op.execute("CREATE INDEX IF NOT EXISTS ix_menu_search_tsv ON menu_search USING GIN (tsv)")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_menu_search_user_date ON menu_search (user_id, date)")
+    else:
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS menu_search USING fts5("
+            "body, owner, date UNINDEXED, prefix='2 3 4')"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS daily_menus_search_delete AFTER DELETE ON daily_menus "
+            "BEGIN DELETE FROM menu_search WHERE rowid = old.id; END"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        op.execute("DROP TRIGGER IF EXISTS daily_menus_search_delete")
+    op.execute("DROP TABLE IF EXISTS menu_search")
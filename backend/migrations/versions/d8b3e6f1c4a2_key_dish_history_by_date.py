@@ -0,0 +1,66 @@
+"""Key dish_history by (user, date, dish) instead of (user, dish)
+
+Each old row keeps only its last use; run `flask rebuild-dish-history` after upgrading
+to restore every earlier use from menu_items.
+
+Revision ID: d8b3e6f1c4a2
+Revises: c7a2f5d8e3b9
+Create Date: 2026-10-18 23:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8b3e6f1c4a2'
+down_revision = 'c7a2f5d8e3b9'
+branch_labels = None
+depends_on = None
+
+
+def _columns(name):
+    # `flask db upgrade` chạy create_app() -> db.create_all() có thể đã tạo bảng theo model mới
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns(name)}
+
+
+def upgrade():
+    if 'date' in _columns('dish_history'):
+        return
+
+    op.create_table('dish_history_new',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('name_key', sa.String(length=200), nullable=False),
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'date', 'name_key')
+    )
+    op.execute(
+        "INSERT INTO dish_history_new (user_id, date, name_key, name) "
+        "SELECT user_id, last_used, name_key, name FROM dish_history"
+    )
+    with op.batch_alter_table('dish_history', schema=None) as batch_op:
+        batch_op.drop_index('ix_dish_history_user_id_last_used')
+    op.drop_table('dish_history')
+    op.rename_table('dish_history_new', 'dish_history')
+
+
+def downgrade():
+    op.create_table('dish_history_old',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('name_key', sa.String(length=200), nullable=False),
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.Column('last_used', sa.Date(), nullable=False),
+    sa.Column('times_used', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'name_key')
+    )
+    op.execute(
+        "INSERT INTO dish_history_old (user_id, name_key, name, last_used, times_used) "
+        "SELECT user_id, name_key, MIN(name), MAX(date), COUNT(*) FROM dish_history GROUP BY user_id, name_key"
+    )
+    op.drop_table('dish_history')
+    op.rename_table('dish_history_old', 'dish_history')
+    with op.batch_alter_table('dish_history', schema=None) as batch_op:
+        batch_op.create_index('ix_dish_history_user_id_last_used', ['user_id', 'last_used'], unique=False)
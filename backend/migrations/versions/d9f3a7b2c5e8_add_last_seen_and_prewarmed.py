@@ -0,0 +1,34 @@
+"""Add users.last_seen_at and daily_menus.prewarmed
+
+Revision ID: d9f3a7b2c5e8
+Revises: c4d8e2f1a6b7
+Create Date: 2026-10-18 15:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9f3a7b2c5e8'
+down_revision = 'c4d8e2f1a6b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_seen_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_users_last_seen_at'), ['last_seen_at'], unique=False)
+
+    with op.batch_alter_table('daily_menus', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('prewarmed', sa.Boolean(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('daily_menus', schema=None) as batch_op:
+        batch_op.drop_column('prewarmed')
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_last_seen_at'))
+        batch_op.drop_column('last_seen_at')
@@ -0,0 +1,65 @@
+"""Add menu_meals and menu_items tables (structured menu content)
+
+Existing menus are split with `flask backfill-menu-items` after upgrading.
+
+Revision ID: e2b6c8d4f1a9
+Revises: d9f3a7b2c5e8
+Create Date: 2026-10-18 16:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b6c8d4f1a9'
+down_revision = 'd9f3a7b2c5e8'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    # `flask db upgrade` chạy create_app() -> db.create_all() đã tạo sẵn bảng mới theo model
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if not _has_table('menu_meals'):
+        op.create_table('menu_meals',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('menu_id', sa.Integer(), nullable=False),
+        sa.Column('meal_type', sa.String(length=20), nullable=False),
+        sa.Column('title', sa.String(length=100), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('total_calories', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['menu_id'], ['daily_menus.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('menu_meals', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_menu_meals_menu_id'), ['menu_id'], unique=False)
+            batch_op.create_index('ix_menu_meals_menu_id_meal_type', ['menu_id', 'meal_type'], unique=False)
+
+    if not _has_table('menu_items'):
+        op.create_table('menu_items',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('meal_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=200), nullable=False),
+        sa.Column('portion', sa.String(length=50), nullable=True),
+        sa.Column('calories', sa.Integer(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['meal_id'], ['menu_meals.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('menu_items', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_menu_items_meal_id'), ['meal_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('menu_items', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_menu_items_meal_id'))
+    op.drop_table('menu_items')
+
+    with op.batch_alter_table('menu_meals', schema=None) as batch_op:
+        batch_op.drop_index('ix_menu_meals_menu_id_meal_type')
+        batch_op.drop_index(batch_op.f('ix_menu_meals_menu_id'))
+    op.drop_table('menu_meals')
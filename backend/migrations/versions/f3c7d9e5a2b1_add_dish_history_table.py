@@ -0,0 +1,46 @@
+"""Add dish_history table (per-user recent dish index)
+
+Existing menus are indexed with `flask rebuild-dish-history` after upgrading.
+
+Revision ID: f3c7d9e5a2b1
+Revises: e2b6c8d4f1a9
+Create Date: 2026-10-18 17:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3c7d9e5a2b1'
+down_revision = 'e2b6c8d4f1a9'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    # `flask db upgrade` chạy create_app() -> db.create_all() đã tạo sẵn bảng mới theo model
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if _has_table('dish_history'):
+        return
+
+    op.create_table('dish_history',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('name_key', sa.String(length=200), nullable=False),
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.Column('last_used', sa.Date(), nullable=False),
+    sa.Column('times_used', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'name_key')
+    )
+    with op.batch_alter_table('dish_history', schema=None) as batch_op:
+        batch_op.create_index('ix_dish_history_user_id_last_used', ['user_id', 'last_used'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('dish_history', schema=None) as batch_op:
+        batch_op.drop_index('ix_dish_history_user_id_last_used')
+    op.drop_table('dish_history')
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""Script test backend AI offline (LocalMenuProvider) - không cần server, không cần API key"""
+from datetime import date, timedelta
+from app.services.ai_providers import LocalMenuProvider
+from app.services.menu_parser import parse_menu
+
+USER_INFO = "- Calo khuyến nghị: 1800 kcal/ngày\n- Dị ứng/Hạn chế: không có\n"
+
+
+def batch_prompt(num_days):
+    start = date(2026, 1, 1)
+    day_list = ''.join(
+        f"- NGÀY {n}: {(start + timedelta(days=n - 1)).strftime('%d/%m/%Y')}\n" for n in range(1, num_days + 1)
+    )
+    return f"🍽️ NHIỆM VỤ: Tạo thực đơn dinh dưỡng cho {num_days} ngày sau:\n{day_list}\n{USER_INFO}"
+
+
+def test_batch_14_days():
+    """Gộp 14 ngày: mỗi bữa chỉ có 15 món -> phải lấy lại món cũ thay vì lỗi"""
+    reply = LocalMenuProvider().generate(batch_prompt(14), timeout=5)
+    days = reply.split('===== NGÀY ')[1:]
+    assert len(days) == 14, f"Có {len(days)} ngày, cần 14"
+    for day in days:
+        menu = parse_menu(day.split('=====', 1)[1])
+        assert len(menu.meals) == 3 and all(len(meal.dishes) == 2 for meal in menu.meals)
+
+
+def test_avoids_used_dishes():
+    """Món trong đoạn "món đã dùng" của prompt (build_used_dishes) không được lặp lại"""
+    from app.routes.menu_routes import build_used_dishes
+
+    provider = LocalMenuProvider()
+    prompt = f"🍽️ NHIỆM VỤ: Tạo thực đơn cho ngày 01/01/2026\n{USER_INFO}"
+    used = [dish.name for meal in parse_menu(provider.generate(prompt, timeout=5)).meals for dish in meal.dishes]
+    reply = provider.generate(prompt + build_used_dishes(used), timeout=5)
+    repeated = {dish.name for meal in parse_menu(reply).meals for dish in meal.dishes} & set(used)
+    assert not repeated, f"Lặp lại món đã dùng: {repeated}"
+
+
+if __name__ == "__main__":
+    try:
+        test_batch_14_days()
+        test_avoids_used_dishes()
+        print("✅ Hoàn thành test!")
+    except Exception as e:
+        print(f"❌ Lỗi: {e}")
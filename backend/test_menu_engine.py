@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""Script test bộ tạo thực đơn cục bộ (menu_engine) - không cần server, không cần database"""
+# Món giả chỉ có các thuộc tính menu_engine đọc (không dựng model Dish -> không cần app)
+from types import SimpleNamespace as Dish
+from app.services.dish_catalog import DEFAULT_DISHES
+from app.services.menu_engine import build_menu, parse_allergies, _is_allergic
+
+
+def catalog():
+    return [
+        Dish(id=index, name=name, meal_types=meals, category=category, portion_size=portion, unit=unit,
+             calories=kcal, protein=protein, carbs=carbs, fat=fat, allergens=allergens)
+        for index, (name, meals, category, portion, unit, kcal, protein, carbs, fat, allergens)
+        in enumerate(DEFAULT_DISHES, start=1)
+    ]
+
+
+def test_allergy_whole_words():
+    """Dị ứng 'các loại hạt' không được loại món cá ('cá' chỉ là chuỗi con của 'các')"""
+    fish = Dish(name='Cá kho tộ', allergens='cá')
+    assert not _is_allergic(fish, parse_allergies('Các loại hạt'))
+    assert _is_allergic(fish, parse_allergies('Tôm, cá'))
+    assert _is_allergic(Dish(name='Xôi lạc', allergens='đậu phộng'), parse_allergies('đậu'))
+
+
+def test_build_menu_keeps_fish():
+    """Dị ứng không liên quan -> món cá vẫn có thể được chọn; dị ứng cá -> không còn món cá"""
+    dishes = catalog()
+    fish = {dish.name for dish in dishes if dish.allergens == 'cá'}
+    allowed = set()
+    for seed in range(20):
+        content, _ = build_menu(dishes, 1800, 'các loại hạt', seed=seed)
+        allowed |= {name for name in fish if name in content}
+        content, _ = build_menu(dishes, 1800, 'cá', seed=seed)
+        assert not any(name in content for name in fish), f"Có món cá khi dị ứng cá:\n{content}"
+    assert allowed, "Dị ứng 'các loại hạt' đã loại hết món cá"
+
+
+if __name__ == "__main__":
+    try:
+        test_allergy_whole_words()
+        test_build_menu_keeps_fish()
+        print("✅ Hoàn thành test!")
+    except Exception as e:
+        print(f"❌ Lỗi: {e}")
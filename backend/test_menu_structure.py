@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Script test sửa 1 bữa trong nội dung thực đơn (splice_meal) - không cần server, không cần database"""
+from types import SimpleNamespace
+from app.services.menu_parser import parse_menu
+from app.services.menu_structure import splice_meal
+
+MENU = """Bữa sáng 🌅
+- Phở bò (1 tô) - 450 kcal
+- Trà đá (1 ly) - 0 kcal
+
+Bữa trưa 🌞
+- Cơm trắng (1 bát) - 260 kcal
+- Canh chua cá lóc (1 bát)
+- Thịt kho trứng (150g) - 380 kcal
+
+Bữa tối 🌙
+- Bún chả (1 phần) - 550 kcal
+
+Tổng calo: 1640 kcal
+
+💡 Lưu ý: Uống đủ 2 lít nước mỗi ngày."""
+
+
+def meal(meal_type, title, *items):
+    return SimpleNamespace(meal_type=meal_type, title=title, items=[
+        SimpleNamespace(name=name, portion=portion, calories=calories) for name, portion, calories in items
+    ])
+
+
+def test_edit_one_meal_keeps_other_lines():
+    """Sửa bữa sáng: dòng không tách được của bữa khác và lời khuyên cuối vẫn còn"""
+    breakfast = meal('breakfast', 'Bữa sáng 🌅', ('Xôi gà', '1 gói', 500))
+    content = splice_meal(MENU, breakfast, 1690)
+    assert '- Xôi gà (1 gói) - 500 kcal' in content
+    assert 'Phở bò' not in content and 'Trà đá' not in content
+    assert '- Canh chua cá lóc (1 bát)' in content
+    assert content.endswith('💡 Lưu ý: Uống đủ 2 lít nước mỗi ngày.')
+    assert parse_menu(content).total_calories == 1690
+    assert [len(m.dishes) for m in parse_menu(content).meals] == [1, 2, 1]
+
+
+def test_edit_missing_meal_keeps_order():
+    """Bữa chưa có trong nội dung -> chèn đúng thứ tự, trước bữa sau nó"""
+    content = MENU.replace('Bữa trưa 🌞\n- Cơm trắng (1 bát) - 260 kcal\n- Canh chua cá lóc (1 bát)\n'
+                           '- Thịt kho trứng (150g) - 380 kcal\n\n', '')
+    lunch = meal('lunch', 'Bữa trưa 🌞', ('Cơm tấm sườn', '1 đĩa', 600))
+    content = splice_meal(content, lunch, 1600)
+    assert [m.meal_type for m in parse_menu(content).meals] == ['breakfast', 'lunch', 'dinner']
+    assert parse_menu(content).total_calories == 1600
+
+
+if __name__ == "__main__":
+    try:
+        test_edit_one_meal_keeps_other_lines()
+        test_edit_missing_meal_keeps_order()
+        print("✅ Hoàn thành test!")
+    except Exception as e:
+        print(f"❌ Lỗi: {e}")
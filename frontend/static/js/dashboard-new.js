@@ -91,8 +91,8 @@ function formatDateForAPI(date) {
 
 async function loadStatistics() {
     try {
-        // Load total menus count
-        const menusResponse = await fetch(`${API_BASE_URL}/api/menu/all`, {
+        // Load total menus count (chỉ cần ngày để đếm và tính streak)
+        const menusResponse = await fetch(`${API_BASE_URL}/api/menu/all?fields=date`, {
             credentials: 'include'
         });
         
@@ -250,6 +250,37 @@ async function loadUserInfo() {
     }
 }
 
+// Cache thực đơn theo ngày (YYYY-MM-DD -> thực đơn | null), nạp cả tuần trước/sau
+// trong 1 lần gọi /api/menu/range để chuyển ngày không phải gọi lại server
+const menuCache = new Map();
+const MENU_PREFETCH_DAYS = 7;
+
+function invalidateMenuCache() {
+    menuCache.clear();
+}
+
+async function fetchMenuRange(date) {
+    const from = new Date(date);
+    from.setDate(from.getDate() - MENU_PREFETCH_DAYS);
+    const to = new Date(date);
+    to.setDate(to.getDate() + MENU_PREFETCH_DAYS);
+
+    const response = await fetch(
+        `${API_BASE_URL}/api/menu/range?from=${formatDateForAPI(from)}&to=${formatDateForAPI(to)}&shape=full`,
+        { credentials: 'include' }
+    );
+    if (!response.ok) {
+        return response;
+    }
+
+    const data = await response.json();
+    for (const day = new Date(from); day <= to; day.setDate(day.getDate() + 1)) {
+        menuCache.set(formatDateForAPI(day), null);
+    }
+    data.menus.forEach(menu => menuCache.set(menu.date, menu));
+    return response;
+}
+
 async function loadMenuByDate(date) {
     const dateStr = date.toISOString().split('T')[0];
     
@@ -259,25 +290,27 @@ async function loadMenuByDate(date) {
     document.getElementById('menuContainer').style.display = 'none';
 
     try {
-        const response = await fetch(`${API_BASE_URL}/api/menu/by-date?date=${dateStr}`, {
-            credentials: 'include'
-        });
+        if (!menuCache.has(dateStr)) {
+            const response = await fetchMenuRange(date);
+            if (response.status === 401) {
+                window.location.href = '/login.html';
+                return;
+            } else if (!response.ok) {
+                throw new Error('Failed to load menu');
+            }
+        }
 
-        if (response.ok) {
-            const data = await response.json();
+        const data = menuCache.get(dateStr);
+        if (data) {
             displayMenu(data, date);
             // Có thực đơn rồi -> ẩn nút "Tạo thực đơn mới"
             toggleCreateMenuButton(false);
-        } else if (response.status === 404) {
+        } else {
             // No menu for this date
             document.getElementById('menuLoading').style.display = 'none';
             document.getElementById('emptyState').style.display = 'block';
             // Chưa có thực đơn -> hiện nút "Tạo thực đơn mới"
             toggleCreateMenuButton(true);
-        } else if (response.status === 401) {
-            window.location.href = '/login.html';
-        } else {
-            throw new Error('Failed to load menu');
         }
     } catch (error) {
         console.error('Error loading menu:', error);
@@ -502,6 +535,12 @@ async function handleMenuFormSubmit(e) {
     document.getElementById('menuContainer').style.display = 'none';
 
     try {
+        // 1 ngày: stream thực đơn qua SSE để hiển thị ngay khi AI bắt đầu trả lời
+        if (numDays === 1) {
+            await generateMenuStream(formData);
+            return;
+        }
+
         const response = await fetch(`${API_BASE_URL}/api/menu/generate`, {
             method: 'POST',
             headers: {
@@ -521,33 +560,17 @@ async function handleMenuFormSubmit(e) {
             const data = JSON.parse(responseText);
             console.log('Menu generated:', data);
             
-            // Handle multi-day generation response
-            if (data.summary) {
-                const { created, skipped, failed } = data.summary;
-                let message = `Đã tạo ${created} thực đơn`;
-                if (skipped > 0) message += `, bỏ qua ${skipped} ngày đã có thực đơn`;
-                if (failed > 0) message += `, ${failed} ngày thất bại`;
-                alert(message);
-                
-                // Update user info and reload current date
-                await loadUserInfo();
-                await loadMenuByDate(currentDate);
-            } else {
-                // Single day generation
-                const menuData = {
-                    date: data.date,
-                    content: data.menu_content || data.content,
-                    calories: data.total_calories || 0
-                };
-                
-                // Update user info display
-                await loadUserInfo();
-                
-                // Display the new menu
-                currentDate = new Date(menuData.date);
-                setDateInput(currentDate);
-                displayMenu(menuData, currentDate);
-            }
+            // Multi-day generation response (1 ngày đã đi qua generateMenuStream)
+            const { created, skipped, failed } = data.summary;
+            let message = `Đã tạo ${created} thực đơn`;
+            if (skipped > 0) message += `, bỏ qua ${skipped} ngày đã có thực đơn`;
+            if (failed > 0) message += `, ${failed} ngày thất bại`;
+            alert(message);
+            
+            // Update user info and reload current date
+            invalidateMenuCache();
+            await loadUserInfo();
+            await loadMenuByDate(currentDate);
         } else if (response.status === 401) {
             window.location.href = '/login.html';
         } else {
@@ -563,6 +586,81 @@ async function handleMenuFormSubmit(e) {
     }
 }
 
+// Tạo thực đơn 1 ngày qua Server-Sent Events: hiển thị từng đoạn AI trả về
+async function generateMenuStream(formData) {
+    const response = await fetch(`${API_BASE_URL}/api/menu/generate-stream`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        credentials: 'include',
+        body: JSON.stringify(formData)
+    });
+
+    if (response.status === 401) {
+        window.location.href = '/login.html';
+        return;
+    }
+    if (!response.ok || !response.body) {
+        // Lỗi trước khi stream (vd: 429 vượt giới hạn tần suất) trả JSON {error, retry_after}
+        const errorData = await response.json().catch(() => ({}));
+        console.error('API Error:', errorData);
+        throw new Error(errorData.error || 'Failed to generate menu');
+    }
+
+    const preview = document.getElementById('progressText');
+    preview.style.whiteSpace = 'pre-wrap';
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let streamedText = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Mỗi sự kiện SSE kết thúc bằng 1 dòng trống
+        let separator;
+        while ((separator = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, separator);
+            buffer = buffer.slice(separator + 2);
+
+            let eventName = 'message';
+            let dataStr = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event:')) eventName = line.slice(6).trim();
+                else if (line.startsWith('data:')) dataStr += line.slice(5).trim();
+            });
+            const payload = dataStr ? JSON.parse(dataStr) : {};
+
+            if (eventName === 'chunk') {
+                streamedText += payload.text;
+                preview.textContent = streamedText;
+            } else if (eventName === 'error') {
+                throw new Error(payload.error);
+            } else if (eventName === 'done') {
+                // Update user info display
+                invalidateMenuCache();
+                await loadUserInfo();
+
+                // Display the new menu
+                currentDate = new Date(payload.date);
+                setDateInput(currentDate);
+                displayMenu({
+                    date: payload.date,
+                    content: payload.menu_content,
+                    calories: payload.calories || 0
+                }, currentDate);
+                return;
+            }
+        }
+    }
+
+    throw new Error('Kết nối bị ngắt trước khi tạo xong thực đơn');
+}
+
 async function deleteCurrentMenu() {
     // Xác nhận trước khi xóa
     if (!confirm(`Bạn có chắc chắn muốn xóa thực đơn ngày ${formatDateVN(currentDate)}?\n\nHành động này không thể hoàn tác!`)) {
@@ -579,6 +677,7 @@ async function deleteCurrentMenu() {
         
         if (response.ok) {
             const responseData = await response.json().catch(() => ({}));
+            invalidateMenuCache();
             
             // Hiển thị thông báo thành công
             if (typeof window.showNotification === 'function') {
@@ -896,6 +995,7 @@ async function handleEditMealSubmit(e) {
             closeEditMealModal();
 
             // Reload menu to show updated data
+            invalidateMenuCache();
             await loadMenuByDate(currentDate);
 
         } else {